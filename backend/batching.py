@@ -0,0 +1,89 @@
+"""
+Batch splitting
+Splits each branch-semester group into batches of near-equal size instead of slicing off
+`max_students_per_batch` at a time, and packs small remainders from several groups into
+shared batches when the exam's lab allows mixed groups
+"""
+
+import os
+from typing import Dict, List, Tuple
+
+# Groups whose balanced split would fill less than this share of the seats give up their
+# remainder to a shared batch (only in labs that allow mixed groups)
+MERGE_BELOW = float(os.getenv("BATCH_MERGE_BELOW", "0.75"))
+
+
+def load_labs(conn) -> Dict[str, Dict]:
+    """lab_no -> {'seats', 'allow_mixed'} for every lab with configured seats"""
+    return {
+        row['lab_no']: {'seats': row['seats'], 'allow_mixed': bool(row['allow_mixed'])}
+        for row in conn.execute("SELECT lab_no, seats, allow_mixed FROM labs")
+    }
+
+
+def lab_capacity(max_students_per_batch: int, lab: Dict = None) -> int:
+    """Batch size limit: the requested maximum, capped by the lab's seats when known"""
+    if lab and lab.get('seats'):
+        return min(max_students_per_batch, lab['seats'])
+    return max_students_per_batch
+
+
+def balanced_split(students: List, capacity: int) -> List[List]:
+    """Fewest batches of at most `capacity`, with sizes differing by at most one (75 at 13 -> 13,13,13,12,12,12)"""
+    if not students:
+        return []
+    count = -(-len(students) // capacity)
+    size, extra = divmod(len(students), count)
+    batches = []
+    start = 0
+    for index in range(count):
+        end = start + size + (1 if index < extra else 0)
+        batches.append(students[start:end])
+        start = end
+    return batches
+
+
+def split_groups(groups: Dict[str, List], capacity: int, merge: bool = False) -> List[Tuple[str, List]]:
+    """
+    (group label, students) batches for every group
+    With `merge`, a group that would split poorly keeps only full batches and its remainder is
+    packed first-fit decreasing with other groups' remainders; a shared batch is labelled
+    with every group in it ("CSE-3+ECE-3"). A remainder left on its own is folded back into a
+    balanced split of its group.
+    """
+    if capacity < 1:
+        raise ValueError("max_students_per_batch must be at least 1")
+
+    full = {}
+    leftovers = []
+    for key, students in groups.items():
+        if not students:
+            continue
+        fill = len(students) / (-(-len(students) // capacity) * capacity)
+        if merge and fill < MERGE_BELOW:
+            cut = len(students) // capacity * capacity
+            full[key] = balanced_split(students[:cut], capacity)
+            leftovers.append((key, students[cut:]))
+        else:
+            full[key] = balanced_split(students, capacity)
+
+    # Largest remainders first, each into the first shared batch with room
+    shared = []
+    for key, rest in sorted(leftovers, key=lambda item: -len(item[1])):
+        for keys, members in shared:
+            if len(members) + len(rest) <= capacity:
+                keys.append(key)
+                members.extend(rest)
+                break
+        else:
+            shared.append(([key], list(rest)))
+
+    for keys, members in shared:
+        if len(keys) == 1:
+            # Nobody to share with: rebalance the group as a whole instead
+            key = keys[0]
+            full[key] = balanced_split(groups[key], capacity)
+
+    batches = [(key, batch) for key, group_batches in full.items() for batch in group_batches]
+    batches.extend(("+".join(keys), members) for keys, members in shared if len(keys) > 1)
+    return batches
@@ -0,0 +1,782 @@
+"""
+Benchmark Script
+Measures API latency and checks query plans against a throwaway database of synthetic data
+Usage: python benchmark.py <benchmark> (requires httpx for the FastAPI test client)
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import statistics
+
+import database
+
+from tests.helpers import (
+    BRANCHES, INDEXED_QUERIES, backend_scenario, postgres_url, roster_csv, seed_schedules, seed_students,
+    use_temporary_database
+)
+
+
+EXAM_SET_SLOTS = [
+    {"slot_name": "Slot 1", "start_time": "09:00", "end_time": "11:00"},
+    {"slot_name": "Slot 2", "start_time": "11:30", "end_time": "13:30"},
+    {"slot_name": "Slot 3", "start_time": "14:30", "end_time": "16:30"},
+]
+
+
+def seed_exam_set(conn, students=4000, exams=40):
+    """Students plus `exams` exams over 12 labs with overlapping December windows; returns (labs, exam_groups)"""
+    import random
+
+    seed_students(conn, students)
+    groups = sorted({f"{branch}-{semester}" for branch, semester in conn.execute(
+        "SELECT DISTINCT branch, semester FROM students")})
+
+    rng = random.Random(11)
+    labs = [f"L{i}" for i in range(1, 13)]
+    exam_groups = {}
+    for i in range(exams):
+        first = rng.randint(1, 10)
+        cursor = conn.execute("""
+            INSERT INTO exams (subject_code, subject_name, lab_no, date_start, date_end,
+                               examiner_internal, examiner_external)
+            VALUES (?, 'Bench Lab', ?, ?, ?, 'Internal', 'External')
+        """, (f"CS{i:03d}", labs[i % len(labs)], f"2025-12-{first:02d}", f"2025-12-{first + rng.randint(3, 9):02d}"))
+        exam_groups[cursor.lastrowid] = rng.sample(groups, rng.randint(2, 5))
+    conn.commit()
+    return labs, exam_groups
+
+
+def time_call(func, repeat):
+    """Return (median, p95) latency of `func` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def bench_schedules():
+    """GET /api/schedules latency against the number of schedules"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    print(f"{'schedules':>10} {'median ms':>10} {'p95 ms':>10}")
+
+    for schedule_count in (10, 50, 100, 250, 500, 1000):
+        use_temporary_database()
+        conn = sqlite3.connect(database.DATABASE_NAME)
+        reg_nos = seed_students(conn, 3000)
+        seed_schedules(conn, schedule_count, 13, reg_nos)
+        conn.close()
+
+        median, p95 = time_call(lambda: client.get("/api/schedules"), repeat=20)
+        print(f"{schedule_count:>10} {median:>10.2f} {p95:>10.2f}")
+
+
+def bench_upload():
+    """POST /api/students/upload latency against roster size"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    print(f"{'rows':>10} {'median ms':>10} {'p95 ms':>10}")
+
+    for count in (1000, 5000, 20000, 50000):
+        use_temporary_database()
+        content = roster_csv(count)
+        upload = lambda: client.post("/api/students/upload", files={"file": ("students.csv", content, "text/csv")})
+        median, p95 = time_call(upload, repeat=5)
+        print(f"{count:>10} {median:>10.2f} {p95:>10.2f}")
+
+
+def bench_concurrency():
+    """Latency of a cheap endpoint while PDF exports run concurrently against a live server"""
+    import socket
+    import threading
+    import httpx
+    import uvicorn
+    from main import app
+
+    use_temporary_database()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    reg_nos = seed_students(conn, 3000)
+    seed_schedules(conn, 300, 13, reg_nos)
+    conn.close()
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+
+    def exports(stop):
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            while not stop.is_set():
+                client.get("/api/export/pdf")
+
+    print(f"{'exporters':>10} {'median ms':>10} {'p99 ms':>10}")
+    with httpx.Client(base_url=base_url) as client:
+        for exporters in (0, 1, 4):
+            stop = threading.Event()
+            workers = [threading.Thread(target=exports, args=(stop,)) for _ in range(exporters)]
+            for worker in workers:
+                worker.start()
+            time.sleep(0.2)
+
+            samples = []
+            for _ in range(200):
+                start = time.perf_counter()
+                client.get("/api/health")
+                samples.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.005)
+
+            stop.set()
+            for worker in workers:
+                worker.join()
+            samples.sort()
+            print(f"{exporters:>10} {statistics.median(samples):>10.2f} {samples[int(len(samples) * 0.99) - 1]:>10.2f}")
+
+    server.should_exit = True
+
+
+def query_collision(conn, reg_no, date, exclude_schedule_id=None, interval=(0, 24 * 60)):
+    """Query-based collision check, used as the reference answer"""
+    query = """
+        SELECT COUNT(*) FROM schedule_students ss
+        JOIN schedules s ON ss.schedule_id = s.schedule_id
+        WHERE ss.reg_no = ? AND s.date = ?
+          AND COALESCE(s.start_minute, 0) < ? AND COALESCE(s.end_minute, 1440) > ?
+    """
+    params = [reg_no, date, interval[1], interval[0]]
+    if exclude_schedule_id:
+        query += " AND s.schedule_id != ?"
+        params.append(exclude_schedule_id)
+    return conn.execute(query, params).fetchone()[0] > 0
+
+
+def bench_occupancy():
+    """Consistency of the occupancy index with the query-based answer, and lookup cost"""
+    import random
+    from fastapi.testclient import TestClient
+    from main import app
+    from occupancy import occupancy
+    from scheduler import generate_schedules, check_collision
+
+    use_temporary_database()
+    occupancy.invalidate()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    reg_nos = seed_students(conn, 1200)
+    seed_schedules(conn, 40, 13, reg_nos)
+
+    exam_ids = [seed_schedules(conn, 0, 0, reg_nos) for _ in range(30)]
+    client = TestClient(app)
+    rng = random.Random(7)
+    dates = [f"2025-11-{day:02d}" for day in range(1, 8)]
+    slots = [
+        {"slot_name": "Slot 1", "start_time": "09:30", "end_time": "12:30"},
+        {"slot_name": "Slot 2", "start_time": "13:30", "end_time": "16:30"},
+    ]
+    intervals = [(0, 1440), (570, 750), (810, 990), (700, 850), (1000, 1100)]
+
+    # Mix of generate, move-student and delete, checking the index after every step
+    mismatches = 0
+    for step in range(60):
+        action = rng.choice(["generate", "move", "move", "delete"])
+        date = rng.choice(dates)
+        schedule_ids = [row[0] for row in conn.execute("SELECT schedule_id FROM schedules")]
+
+        if action == "generate":
+            generate_schedules(exam_ids.pop(), date, rng.sample(slots, rng.choice([1, 2])),
+                               rng.choice([10, 13, 25]))
+        elif action == "delete" and schedule_ids:
+            client.delete(f"/api/schedules/{rng.choice(schedule_ids)}")
+        elif action == "move" and len(schedule_ids) > 1:
+            from_id, to_id = rng.sample(schedule_ids, 2)
+            member = conn.execute("SELECT reg_no FROM schedule_students WHERE schedule_id = ?", (from_id,)).fetchone()
+            if member:
+                client.put("/api/schedules/move-student", json={
+                    "student_reg_no": member[0], "from_schedule_id": from_id, "to_schedule_id": to_id
+                })
+
+        for _ in range(50):
+            reg_no, date = rng.choice(reg_nos), rng.choice(dates)
+            exclude = rng.choice(schedule_ids + [None]) if schedule_ids else None
+            interval = rng.choice(intervals)
+            expected = query_collision(conn, reg_no, date, exclude, interval)
+            if check_collision(reg_no, date, exclude, interval=interval) != expected:
+                mismatches += 1
+
+    stale_dates = occupancy.verify(conn)
+    print(f"checks disagreeing with the query: {mismatches}; dates out of sync: {stale_dates or 'none'}")
+
+    samples = [(rng.choice(reg_nos), rng.choice(dates)) for _ in range(5000)]
+    for label, check in (("query", lambda r, d: query_collision(conn, r, d)),
+                         ("index", lambda r, d: check_collision(r, d, conn=conn))):
+        start = time.perf_counter()
+        for reg_no, date in samples:
+            check(reg_no, date)
+        print(f"{label}: {(time.perf_counter() - start) / len(samples) * 1e6:.2f} µs per check")
+
+    conn.close()
+    sys.exit(1 if mismatches or stale_dates else 0)
+
+
+def bench_indexes():
+    """EXPLAIN QUERY PLAN for the hot lookups; fails if an expected index is not used"""
+    use_temporary_database()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    reg_nos = seed_students(conn, 3000)
+    seed_schedules(conn, 200, 13, reg_nos)
+    conn.execute("ANALYZE")
+
+    failures = 0
+    for label, query, params, index in INDEXED_QUERIES:
+        plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+        used = any(index in step for step in plan)
+        failures += not used
+        print(f"{'ok  ' if used else 'FAIL'} {label}: expected {index}")
+        for step in plan:
+            print(f"       {step}")
+
+    conn.close()
+    sys.exit(1 if failures else 0)
+
+
+def bench_engine():
+    """Global engine on thousands of students and dozens of exams per optimizer, checking every constraint"""
+    from engine import generate_all, load_snapshot, plan
+    from occupancy import occupancy
+
+    use_temporary_database()
+    occupancy.invalidate()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    labs, exam_groups = seed_exam_set(conn)
+    slots = EXAM_SET_SLOTS
+    capacities = {lab: 24 + 2 * index for index, lab in enumerate(labs)}
+
+    # Each optimizer planned against the same snapshot, without writing
+    conn.row_factory = sqlite3.Row
+    snapshot = load_snapshot(conn)
+    conn.row_factory = None
+    for method in ("greedy", "dsatur", "anneal"):
+        start = time.perf_counter()
+        planned = plan(snapshot, slots, 30, capacities, exam_groups, optimizer=method, time_budget=2.0, seed=1)
+        elapsed = (time.perf_counter() - start) * 1000
+        days = {}
+        for placement in planned['schedules']:
+            for student in placement['students']:
+                days[(student['reg_no'], placement['date'])] = days.get((student['reg_no'], placement['date']), 0) + 1
+        stats = planned['stats']
+        print(f"{method:>7}: {stats['students_placed']} placed, {stats['students_unplaceable']} unplaceable, "
+              f"{stats['cells_used']} cells, {sum(n - 1 for n in days.values())} same-day extra, {elapsed:.0f} ms")
+
+    start = time.perf_counter()
+    result = generate_all(None, slots, 30, capacities, exam_groups, optimizer="anneal", time_budget=2.0, seed=1)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"written with anneal: {len(result['schedules'])} schedules in {elapsed:.0f} ms")
+    print(f"unplaceable batches: {len(result['unplaceable'])}; invalid exams: {result['errors'] or 'none'}")
+
+    # Every constraint checked back against what was written
+    lab_of = dict(conn.execute("SELECT exam_id, lab_no FROM exams"))
+    rows = conn.execute("""
+        SELECT s.schedule_id, s.exam_id, s.date, s.start_minute, s.end_minute, s.total_students
+        FROM schedules s
+    """).fetchall()
+    cells, oversized = {}, 0
+    for schedule_id, exam_id, date, start_minute, end_minute, total in rows:
+        cells.setdefault((lab_of[exam_id], date), []).append((start_minute, end_minute))
+        oversized += total > capacities[lab_of[exam_id]]
+    lab_clashes = sum(
+        a[0] < b[1] and b[0] < a[1]
+        for intervals in cells.values()
+        for i, a in enumerate(intervals) for b in intervals[i + 1:]
+    )
+    student_clashes = conn.execute("""
+        SELECT COUNT(*) FROM schedule_students x
+        JOIN schedules a ON a.schedule_id = x.schedule_id
+        JOIN schedule_students y ON y.reg_no = x.reg_no AND y.schedule_id > x.schedule_id
+        JOIN schedules b ON b.schedule_id = y.schedule_id
+        WHERE a.date = b.date AND a.start_minute < b.end_minute AND b.start_minute < a.end_minute
+    """).fetchone()[0]
+    windows = conn.execute("""
+        SELECT COUNT(*) FROM schedules s JOIN exams e ON e.exam_id = s.exam_id
+        WHERE s.date < e.date_start OR s.date > e.date_end
+    """).fetchone()[0]
+    print(f"lab double-bookings: {lab_clashes}; student overlaps: {student_clashes}; "
+          f"over capacity: {oversized}; outside window: {windows}")
+
+
+def bench_batching():
+    """Slot utilisation of naive slicing versus balanced and merged batching"""
+    import random
+    from batching import split_groups
+    from occupancy import occupancy
+    from scheduler import generate_schedules
+
+    def naive(groups, capacity):
+        return [(key, students[i:i + capacity])
+                for key, students in groups.items() for i in range(0, len(students), capacity)]
+
+    def report(label, batches, capacity):
+        sizes = [len(students) for _, students in batches]
+        used = sum(sizes) / (len(sizes) * capacity)
+        print(f"  {label:>9}: {len(sizes):4d} batches, smallest {min(sizes):3d}, "
+              f"under half full {sum(size < capacity / 2 for size in sizes):3d}, utilisation {used:.1%}")
+
+    rng = random.Random(5)
+    for capacity in (13, 20, 30):
+        groups = {f"G{i}": list(range(rng.randint(3, 90))) for i in range(48)}
+        print(f"48 groups of 3-90 students, {capacity} seats")
+        report("naive", naive(groups, capacity), capacity)
+        report("balanced", split_groups(groups, capacity), capacity)
+        report("merged", split_groups(groups, capacity, merge=True), capacity)
+
+    # End to end: one exam through generate_schedules, before and after configuring the lab
+    use_temporary_database()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    seed_students(conn, 1000)
+    slots = [
+        {"slot_name": "Slot 1", "start_time": "09:30", "end_time": "12:30"},
+        {"slot_name": "Slot 2", "start_time": "13:30", "end_time": "16:30"},
+    ]
+    print("generate_schedules, 1000 students, 30 per batch")
+    for label, lab in (("no lab", None), ("16 seats", (16, 0)), ("mixed", (16, 1))):
+        if lab:
+            conn.execute("INSERT OR REPLACE INTO labs (lab_no, seats, allow_mixed) VALUES ('L1', ?, ?)", lab)
+            conn.commit()
+        exam_id = seed_schedules(conn, 0, 0, [])
+        result = generate_schedules(exam_id, "2025-11-03", slots, 30)
+        capacity = lab[0] if lab else 30
+        report(label, [(s['group'], s['students']) for s in result['schedules']], capacity)
+        conn.execute("DELETE FROM schedule_students")
+        conn.execute("DELETE FROM schedules")
+        conn.commit()
+        occupancy.invalidate()
+
+
+def bench_reschedule():
+    """Incremental roster changes on a large schedule versus regenerating it"""
+    from occupancy import occupancy
+    from scheduler import generate_schedules, reschedule
+
+    use_temporary_database()
+    occupancy.invalidate()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    reg_nos = seed_students(conn, 10000)
+    exam_id = seed_schedules(conn, 0, 0, [])
+    slots = [
+        {"slot_name": "Slot 1", "start_time": "09:30", "end_time": "12:30"},
+        {"slot_name": "Slot 2", "start_time": "13:30", "end_time": "16:30"},
+    ]
+
+    start = time.perf_counter()
+    generated = generate_schedules(exam_id, "2025-11-03", slots, 30)
+    print(f"generate: {len(generated['schedules'])} schedules in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    before = set(conn.execute("SELECT schedule_id, reg_no FROM schedule_students"))
+
+    # Five students leave, five join
+    conn.executemany("DELETE FROM students WHERE reg_no = ?", [(reg_no,) for reg_no in reg_nos[100:105]])
+    conn.executemany("INSERT INTO students (reg_no, name, branch, semester) VALUES (?, ?, ?, ?)",
+                     [(f"MES23Y{i:06d}", f"Joiner {i}", BRANCHES[i % len(BRANCHES)], 1 + i % 8) for i in range(5)])
+    conn.commit()
+
+    joiners = [f"MES23Y{i:06d}" for i in range(5)]
+    runs = (
+        ("roster diff, dry run", dict(dry_run=True)),
+        ("explicit changes, dry run", dict(add=joiners, remove=reg_nos[100:105], dry_run=True)),
+        ("explicit changes", dict(add=joiners, remove=reg_nos[100:105])),
+    )
+    for label, options in runs:
+        start = time.perf_counter()
+        result = reschedule(exam_id, "2025-11-03", 30, **options)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{label}: {len(result['removed'])} removed, {len(result['added'])} added, "
+              f"{len(result['new_schedules'])} new schedules in {elapsed:.1f} ms")
+
+    after = set(conn.execute("SELECT schedule_id, reg_no FROM schedule_students"))
+    moved = {reg_no for _, reg_no in before - after} - set(reg_nos[100:105])
+    stale_totals = conn.execute("""
+        SELECT COUNT(*) FROM schedules s
+        WHERE total_students != (SELECT COUNT(*) FROM schedule_students ss WHERE ss.schedule_id = s.schedule_id)
+    """).fetchone()[0]
+    print(f"students moved: {len(moved)}; stale totals: {stale_totals}; "
+          f"index out of sync: {occupancy.verify(conn) or 'none'}")
+
+
+def bench_whatif():
+    """A grid of engine configurations evaluated in one process and in the worker pool"""
+    from engine import load_snapshot
+    from whatif import WHATIF_WORKERS, expand_grid, evaluate_grid
+
+    use_temporary_database()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    labs, exam_groups = seed_exam_set(conn)
+    conn.row_factory = sqlite3.Row
+    snapshot = load_snapshot(conn)
+
+    slot_sets = [EXAM_SET_SLOTS, EXAM_SET_SLOTS[:2], [
+        {"slot_name": "Morning", "start_time": "09:00", "end_time": "12:00"},
+        {"slot_name": "Afternoon", "start_time": "13:30", "end_time": "16:30"},
+    ]]
+    variants = expand_grid([20, 25, 30, 40], slot_sets, [{}], [1, 2])
+    options = {"exam_groups": exam_groups, "optimizer": "dsatur"}
+
+    rankings = {}
+    for workers in (1, max(2, WHATIF_WORKERS)):
+        start = time.perf_counter()
+        rankings[workers] = evaluate_grid(snapshot, variants, options, workers=workers)
+        print(f"{len(variants)} variants, {workers} worker(s): {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"({os.cpu_count()} CPUs)")
+
+    sequential, parallel = rankings.values()
+    same = [(v["cost"], v["metrics"]) for v in sequential] == [(v["cost"], v["metrics"]) for v in parallel]
+    print(f"rankings identical: {same}")
+    for variant in sequential[:3]:
+        print(f"  cost {variant['cost']:>9}: batch {variant['max_students_per_batch']}, "
+              f"slot set {variant['slot_set']}, seed {variant['seed']} -> {variant['metrics']}")
+
+
+def legacy_csv(conn):
+    """The pre-streaming CSV export: GROUP_CONCAT rows built into one string, then copied to bytes"""
+    import io
+    import csv
+
+    rows = conn.execute("""
+        SELECT s.date, s.time_slot, e.subject_name, e.subject_code, e.lab_no,
+               GROUP_CONCAT(st.reg_no, ', ') as students, s.total_students
+        FROM schedules s
+        JOIN exams e ON s.exam_id = e.exam_id
+        LEFT JOIN schedule_students ss ON s.schedule_id = ss.schedule_id
+        LEFT JOIN students st ON ss.reg_no = st.reg_no
+        GROUP BY s.schedule_id ORDER BY s.date, s.time_slot, s.schedule_id
+    """).fetchall()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Date', 'Time Slot', 'Subject', 'Lab', 'Students', 'Total'])
+    for row in rows:
+        writer.writerow([row['date'], row['time_slot'], f"{row['subject_code']} - {row['subject_name']}",
+                         row['lab_no'], row['students'] or '', row['total_students']])
+    return io.BytesIO(output.getvalue().encode()).getvalue()
+
+
+def bench_export():
+    """Peak memory and time of the streaming CSV export against the buffered one"""
+    import tracemalloc
+    from fastapi.testclient import TestClient
+    from main import app
+    from csv_export import iter_schedule_csv
+
+    client = TestClient(app)
+    print(f"{'schedules':>10} {'format':>8} {'MB out':>8} {'ms':>8} {'peak MB':>8} {'buffered peak MB':>17}")
+
+    for schedule_count in (1000, 5000, 20000):
+        use_temporary_database()
+        conn = sqlite3.connect(database.DATABASE_NAME)
+        reg_nos = seed_students(conn, 20000)
+        seed_schedules(conn, schedule_count, 25, reg_nos)
+        conn.row_factory = sqlite3.Row
+
+        tracemalloc.start()
+        legacy = legacy_csv(conn)
+        legacy_peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        conn.close()
+
+        for format in ("grouped", "long"):
+            tracemalloc.start()
+            size = sum(len(chunk) for chunk in iter_schedule_csv(format=format))
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            response = client.get("/api/export/csv", params={"format": format})
+            elapsed = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200 and len(response.content) == size
+            if format == "grouped":
+                assert response.content == legacy, "grouped export differs from the buffered export"
+            print(f"{schedule_count:>10} {format:>8} {size / 2**20:>8.1f} {elapsed:>8.0f} {peak:>8.1f} "
+                  f"{legacy_peak if format == 'grouped' else float('nan'):>17.1f}")
+
+
+def bench_pdf():
+    """PDF render time in one pass and split across render workers, and whether every student is listed"""
+    import io
+    import re
+    from concurrent.futures import ProcessPoolExecutor
+    from pypdf import PdfReader
+    from main import fetch_pdf_rows
+    from executors import RENDER_WORKERS
+    from pdf_export import group_sections, plan_parts, render_sections, merge_pdfs
+
+    workers = max(2, RENDER_WORKERS)
+    print(f"{'schedules':>10} {'pages':>6} {'one pass ms':>12} {'parallel ms':>12} {'parts':>6} {'roster complete':>16}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for schedule_count in (100, 500, 2000):
+            use_temporary_database()
+            conn = sqlite3.connect(database.DATABASE_NAME)
+            reg_nos = seed_students(conn, 20000)
+            seed_schedules(conn, schedule_count, 30, reg_nos)
+            expected = {row[0] for row in conn.execute("SELECT DISTINCT reg_no FROM schedule_students")}
+            conn.close()
+            rows = fetch_pdf_rows()
+
+            start = time.perf_counter()
+            single = render_sections(group_sections(rows))
+            one_pass = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            parts = plan_parts(rows, workers)
+            rendered = list(pool.map(render_sections, parts, [index == 0 for index in range(len(parts))]))
+            merged = merge_pdfs(rendered) if len(rendered) > 1 else rendered[0]
+            parallel = (time.perf_counter() - start) * 1000
+
+            pages = [len(PdfReader(io.BytesIO(pdf)).pages) for pdf in (single, merged)]
+            text = "".join(page.extract_text() for page in PdfReader(io.BytesIO(merged)).pages)
+            listed = set(re.findall(r"MES23X\d{6}", text))
+            print(f"{schedule_count:>10} {'/'.join(map(str, pages)):>6} {one_pass:>12.0f} {parallel:>12.0f} "
+                  f"{len(parts):>6} {str(listed == expected):>16}")
+    print(f"({os.cpu_count()} CPUs)")
+
+
+def bench_exportcache():
+    """Export download latency: first build, cached copy, 304 revalidation, and after a write"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from export_cache import export_cache
+
+    use_temporary_database()
+    export_cache.directory = tempfile.mkdtemp(prefix="lab_scheduler_exports_")
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    reg_nos = seed_students(conn, 5000)
+    seed_schedules(conn, 300, 20, reg_nos)
+    conn.close()
+
+    print(f"{'export':>8} {'build ms':>9} {'cached ms':>10} {'304 ms':>7} {'after write':>12}")
+    with TestClient(app) as client:
+        for path in ("/api/export/csv", "/api/export/pdf"):
+            start = time.perf_counter()
+            first = client.get(path)
+            built = (time.perf_counter() - start) * 1000
+            etag = first.headers["etag"]
+
+            cached, _ = time_call(lambda: client.get(path), repeat=10)
+            revalidated, _ = time_call(lambda: client.get(path, headers={"If-None-Match": etag}), repeat=10)
+            assert client.get(path).content == first.content
+            assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+            client.delete(f"/api/schedules/{1 + path.endswith('pdf')}")
+            stale = client.get(path, headers={"If-None-Match": etag})
+            status = "rebuilt" if stale.status_code == 200 and stale.headers["etag"] != etag else "STALE"
+            print(f"{path.rsplit('/', 1)[1]:>8} {built:>9.1f} {cached:>10.1f} {revalidated:>7.1f} {status:>12}")
+    print(export_cache.stats())
+
+
+def bench_responsecache():
+    """GET /api/schedules latency uncached, from the response cache, and as a 304 revalidation"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from response_cache import response_cache
+
+    client = TestClient(app)
+    print(f"{'schedules':>10} {'uncached ms':>12} {'cached ms':>10} {'304 ms':>8}")
+
+    for schedule_count in (100, 500, 1000):
+        use_temporary_database()
+        conn = sqlite3.connect(database.DATABASE_NAME)
+        reg_nos = seed_students(conn, 3000)
+        seed_schedules(conn, schedule_count, 13, reg_nos)
+        conn.close()
+
+        response_cache.enabled = False
+        uncached, _ = time_call(lambda: client.get("/api/schedules"), repeat=20)
+        response_cache.enabled = True
+        response_cache.clear()
+        etag = client.get("/api/schedules").headers["etag"]
+        cached, _ = time_call(lambda: client.get("/api/schedules"), repeat=20)
+        revalidated, _ = time_call(lambda: client.get("/api/schedules", headers={"If-None-Match": etag}), repeat=20)
+        print(f"{schedule_count:>10} {uncached:>12.2f} {cached:>10.2f} {revalidated:>8.2f}")
+    print(response_cache.stats())
+
+
+def bench_search():
+    """GET /api/students/search latency per match tier at 100k students, against fetching the whole list"""
+    import random
+    from fastapi.testclient import TestClient
+    from main import app
+
+    use_temporary_database()
+    rng = random.Random(7)
+    syllables = "ka ri an ja li me ra sh vi nu de pa th om as go ku ha ir fa ti ma ze na pr iy sn ee ar ju".split()
+
+    def word():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize()
+
+    rows = [(f"MES{20 + (i // 7) % 5}{BRANCHES[i % len(BRANCHES)]}{i:06d}", f"{word()} {word()}",
+             BRANCHES[i % len(BRANCHES)], 1 + i % 8) for i in range(100_000)]
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    conn.executemany("INSERT INTO students (reg_no, name, branch, semester) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    from response_cache import response_cache
+    from search import search_students
+
+    client = TestClient(app)
+    response_cache.enabled = False
+    full, _ = time_call(lambda: client.get("/api/students"), repeat=5)
+    size = len(client.get("/api/students").content)
+    print(f"whole list (what the search box used to filter): {full:.1f} ms, {size / 1024:.0f} KiB")
+
+    first, last = rows[4242][1].split()
+    queries = {
+        "reg_no prefix": "MES22ECE0",
+        "name prefix": first[:4],
+        "substring": last[1:5],
+        "two terms": f"{first[:3]} {last[:3]}",
+        "typo": first[:2] + first[3:] + " " + last,
+    }
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    print(f"{'query':>14} {'q':>22} {'search ms':>10} {'request ms':>11} {'hits':>5}  first match")
+    for label, query in queries.items():
+        direct, _ = time_call(lambda: search_students(conn, query), repeat=50)
+        request, _ = time_call(lambda: client.get("/api/students/search", params={"q": query}), repeat=50)
+        results = client.get("/api/students/search", params={"q": query}).json()
+        top = f"{results[0]['name']} ({results[0]['match']})" if results else "-"
+        print(f"{label:>14} {query!r:>22} {direct:>10.2f} {request:>11.2f} {len(results):>5}  {top}")
+    conn.close()
+
+
+def bench_encoding():
+    """Bytes on the wire and encode time of GET /api/schedules per representation and content coding"""
+    import compact
+    from main import load_schedules
+
+    use_temporary_database()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    reg_nos = seed_students(conn, 3000)
+    seed_schedules(conn, 1000, 13, reg_nos)  # each student sits in four or five slots
+    conn.close()
+    content = load_schedules()
+
+    codings = [None, "gzip"] + (["br"] if compact.brotli is not None else [])
+    print(f"{'representation':>46} {'coding':>8} {'bytes':>9} {'ratio':>6} {'encode ms':>10}")
+    baseline = None
+    for media_type in compact.media_types():
+        for coding in codings:
+            render = compact.renderer(media_type, coding)
+            encode_ms, _ = time_call(lambda: render(content), repeat=10)
+            size = len(render(content))
+            baseline = baseline or size
+            print(f"{media_type:>46} {coding or 'identity':>8} {size:>9} {size / baseline:>6.2f} {encode_ms:>10.1f}")
+    if compact.msgpack is None:
+        print("(install msgpack for the MessagePack representation)")
+
+
+def bench_serialize():
+    """Uncached GET /api/students and /api/schedules: latency, then a profile of one request each"""
+    import cProfile
+    import pstats
+    from fastapi.testclient import TestClient
+    from main import app, load_students, load_schedules
+    from response_cache import response_cache, render_json
+
+    use_temporary_database()
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    reg_nos = seed_students(conn, 20000)
+    seed_schedules(conn, 1000, 13, reg_nos)
+    conn.close()
+
+    client = TestClient(app)
+    response_cache.enabled = False
+    headers = {"Accept-Encoding": "identity"}
+    for path in ("/api/students", "/api/schedules"):
+        median, p95 = time_call(lambda: client.get(path, headers=headers), repeat=10)
+        size = len(client.get(path, headers=headers).content)
+        print(f"{path}: median {median:.1f} ms, p95 {p95:.1f} ms, {size / 1024:.0f} KiB")
+
+    # The handlers run on the DB pool, out of the profiler's sight, so profile their work directly
+    for name, load in (("students", load_students), ("schedules", load_schedules)):
+        profiler = cProfile.Profile()
+        profiler.runcall(lambda: render_json(load()))
+        print(f"\nload_{name} + render_json, top functions by own time:")
+        pstats.Stats(profiler).sort_stats("tottime").print_stats(6)
+
+
+def bench_backends():
+    """The same API scenario on SQLite and PostgreSQL: per-step latency and whether the results agree"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from occupancy import occupancy
+    from response_cache import response_cache
+
+    url = postgres_url()
+    if url is None:
+        print("Set DATABASE_URL to a PostgreSQL database (or install pgserver) to compare backends")
+        sys.exit(1)
+    if database.DATABASE_URL != url:
+        # A fresh database: the scenario expects ids from 1
+        import psycopg2
+        with psycopg2.connect(url) as conn, conn.cursor() as cursor:
+            cursor.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+
+    runs = {}
+    with TestClient(app) as client:
+        for backend in ("sqlite", "postgresql"):
+            database.DATABASE_URL = url if backend == "postgresql" else ""
+            if backend == "sqlite":
+                use_temporary_database()
+            else:
+                database.init_database()
+            occupancy.invalidate()
+            response_cache.clear()
+            runs[backend] = backend_scenario(client)
+    database.close_pool()
+
+    print(f"{'step':<24} {'sqlite ms':>10} {'postgres ms':>12} {'results':>8}")
+    mismatches = 0
+    for (name, sqlite_ms, expected), (_, postgres_ms, actual) in zip(runs["sqlite"], runs["postgresql"]):
+        same = expected == actual
+        mismatches += not same
+        print(f"{name:<24} {sqlite_ms:>10.1f} {postgres_ms:>12.1f} {'same' if same else 'DIFFER':>8}")
+    if mismatches:
+        print(f"{mismatches} step(s) returned different results")
+        sys.exit(1)
+
+
+BENCHMARKS = {
+    "schedules": bench_schedules,
+    "indexes": bench_indexes,
+    "upload": bench_upload,
+    "concurrency": bench_concurrency,
+    "occupancy": bench_occupancy,
+    "engine": bench_engine,
+    "batching": bench_batching,
+    "reschedule": bench_reschedule,
+    "whatif": bench_whatif,
+    "export": bench_export,
+    "pdf": bench_pdf,
+    "exportcache": bench_exportcache,
+    "responsecache": bench_responsecache,
+    "search": bench_search,
+    "encoding": bench_encoding,
+    "serialize": bench_serialize,
+    "backends": bench_backends,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmark.py [{'|'.join(BENCHMARKS)}]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]]()
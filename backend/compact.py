@@ -0,0 +1,142 @@
+"""
+Compact representations of list responses
+GET /api/schedules repeats every student's name, branch and semester in each slot they sit in.
+Clients that ask for it through the Accept header get the columnar form instead: one students
+table and one schedules table, column by column, with each roster a list of indexes into the
+students table. It can be sent as JSON or, when the msgpack package is installed, MessagePack.
+
+Bodies are also compressed for clients that accept it (brotli when the brotli package is
+installed, else gzip). Compression is done here, once per cached body, rather than by a
+middleware that would recompress every cache hit and buffer the streaming endpoints.
+"""
+
+import gzip
+from typing import Callable, Dict, List, Optional, Tuple
+
+from response_cache import render_json
+
+try:
+    import msgpack
+except ImportError:  # optional: compact MessagePack responses
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional: br content coding
+    brotli = None
+
+JSON = "application/json"
+COMPACT_JSON = "application/vnd.lab-scheduler.compact+json"
+COMPACT_MSGPACK = "application/vnd.lab-scheduler.compact+msgpack"
+COMPACT_FORMAT = "schedules-columnar/1"
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def media_types() -> List[str]:
+    """Representations of GET /api/schedules this server can produce"""
+    types = [JSON, COMPACT_JSON]
+    if msgpack is not None:
+        types.append(COMPACT_MSGPACK)
+    return types
+
+
+def _preferences(header: Optional[str]) -> List[Tuple[str, float]]:
+    """(value, q) pairs of an Accept or Accept-Encoding header, in the order listed"""
+    preferences = []
+    for part in (header or "").split(","):
+        value, *parameters = [item.strip() for item in part.split(";")]
+        if not value:
+            continue
+        q = 1.0
+        for parameter in parameters:
+            name, _, number = parameter.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        preferences.append((value.lower(), q))
+    return preferences
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """
+    The representation to send for an Accept header: the offered type with the highest q,
+    the first listed on ties; wildcards stand for plain JSON, so existing clients are unaffected
+    """
+    offered = media_types()
+    scores = {}
+    for value, q in _preferences(accept):
+        if value in ("*/*", "application/*"):
+            value = JSON
+        if value in offered and q > 0:
+            scores.setdefault(value, q)
+    if not scores:
+        return JSON
+    return max(scores, key=scores.get)
+
+
+def negotiate_coding(accept_encoding: Optional[str]) -> Optional[str]:
+    """'br', 'gzip' or None (identity) for an Accept-Encoding header"""
+    accepted = {value: q for value, q in _preferences(accept_encoding) if q > 0}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compact_schedules(schedules: List[Dict]) -> Dict:
+    """Columnar schedules with rosters as indexes into a shared students table"""
+    students = {"reg_no": [], "name": [], "branch": [], "semester": []}
+    index = {}
+    columns = list(schedules[0]) if schedules else []
+    table = {column: [] for column in columns}
+
+    for schedule in schedules:
+        for column in columns:
+            if column != "students":
+                table[column].append(schedule[column])
+        if "students" in table:
+            roster = []
+            for student in schedule["students"]:
+                position = index.get(student["reg_no"])
+                if position is None:
+                    position = index[student["reg_no"]] = len(index)
+                    for column in students:
+                        students[column].append(student[column])
+                roster.append(position)
+            table["students"].append(roster)
+
+    compact = {"format": COMPACT_FORMAT, "schedules": table}
+    if "students" in table:
+        compact["students"] = students
+    return compact
+
+
+def compact_content(content):
+    """compact_schedules for a schedule list or for the items of one page of it"""
+    if isinstance(content, dict):
+        return {**content, "items": compact_schedules(content["items"])}
+    return compact_schedules(content)
+
+
+def compress(body: bytes, coding: Optional[str]) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def renderer(media_type: str, coding: Optional[str] = None) -> Callable[[object], bytes]:
+    """Content -> response body bytes in `media_type`, compressed with `coding`"""
+    if media_type == COMPACT_MSGPACK:
+        encode = lambda content: msgpack.packb(compact_content(content))
+    elif media_type == COMPACT_JSON:
+        encode = lambda content: render_json(compact_content(content))
+    else:
+        encode = render_json
+    return lambda content: compress(encode(content), coding)
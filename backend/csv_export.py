@@ -0,0 +1,197 @@
+"""
+CSV export streaming
+Rows are read from the cursor a chunk at a time and encoded as they arrive, so neither the
+query result nor the finished file is ever held in memory whole. Batches are read a page at a
+time on a pooled connection that is released before the page is sent, so a slow client never
+keeps a connection checked out.
+"""
+
+import io
+import os
+import csv
+from typing import Iterator, Optional, Tuple
+
+from database import get_db_connection, ordered_join
+
+FORMATS = ("grouped", "long")
+CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+PAGE_BATCHES = int(os.getenv("EXPORT_PAGE_BATCHES", "200"))
+CHUNK_BYTES = 64 * 1024
+
+HEADERS = {
+    "grouped": ['Date', 'Time Slot', 'Subject', 'Lab', 'Students', 'Total'],
+    "long": ['Date', 'Time Slot', 'Subject', 'Lab', 'Reg No', 'Name', 'Branch', 'Semester'],
+}
+
+
+def _filters(date: str = None, exam_id: int = None):
+    clause = ""
+    params = []
+
+    if date:
+        clause += " AND s.date = ?"
+        params.append(date)
+
+    if exam_id:
+        clause += " AND s.exam_id = ?"
+        params.append(exam_id)
+
+    return clause, params
+
+
+# Export order, which pages resume from
+EXPORT_KEY = ("s.date", "s.time_slot", "s.schedule_id")
+
+
+def _key_bound(operator: str) -> str:
+    return f" AND ({', '.join(EXPORT_KEY)}) {operator} (?, ?, ?)"
+
+
+def export_queries(date: str = None, exam_id: int = None, format: str = "grouped", join: str = "CROSS JOIN",
+                   after: Optional[Tuple] = None, through: Optional[Tuple] = None):
+    """
+    (batches query, batches params, students query, students params), both in export order,
+    with `join` from database.ordered_join
+    Batch details are read once per batch rather than repeated on every student row; the
+    students query yields (schedule_id, reg_no, ...) and the two are merged while streaming.
+    `after` and `through` are EXPORT_KEY values bounding a page: batches past `after`
+    (append a LIMIT), and students of batches past `after` up to and including `through`
+    """
+    clause, params = _filters(date, exam_id)
+    if after is not None:
+        clause += _key_bound(">")
+        params += list(after)
+    order = " ORDER BY s.date, s.time_slot, s.schedule_id"
+
+    batches = """
+        SELECT
+            s.schedule_id,
+            s.date,
+            s.time_slot,
+            e.subject_name,
+            e.subject_code,
+            e.lab_no,
+            s.total_students
+        FROM schedules s
+        JOIN exams e ON s.exam_id = e.exam_id
+        WHERE 1=1
+    """ + clause + order
+
+    student_clause, student_params = clause, params
+    if through is not None:
+        student_clause += _key_bound("<=")
+        student_params = params + list(through)
+
+    # Grouped lines list only students still on the roster, as the export always has
+    columns = "ss.schedule_id, st.reg_no" if format == "grouped" else \
+        "ss.schedule_id, ss.reg_no, st.name, st.branch, st.semester"
+    # An ordered join keeps schedules as the outer loop, so rows come off idx_schedules_date
+    # already ordered by date and only each day's part needs sorting
+    students = f"""
+        SELECT {columns}
+        FROM schedules s
+        JOIN exams e ON s.exam_id = e.exam_id
+        {join} schedule_students ss ON s.schedule_id = ss.schedule_id
+        LEFT JOIN students st ON ss.reg_no = st.reg_no
+        WHERE 1=1
+    """ + student_clause + order + ", ss.reg_no"
+    return batches, params, students, student_params
+
+
+def _fetch(cursor, size: int):
+    """Rows of an executed cursor, read `size` at a time"""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _grouped_line(batch, students):
+    return [
+        batch['date'],
+        batch['time_slot'],
+        f"{batch['subject_code']} - {batch['subject_name']}",
+        batch['lab_no'],
+        ', '.join(reg_no for _, reg_no in students if reg_no),
+        batch['total_students'],
+    ]
+
+
+def _long_lines(batch, students):
+    prefix = [batch['date'], batch['time_slot'], f"{batch['subject_code']} - {batch['subject_name']}", batch['lab_no']]
+    if not students:
+        return [prefix + ['', '', '', '']]
+    return [
+        prefix + [reg_no, name or '', branch or '', semester if semester is not None else '']
+        for _, reg_no, name, branch, semester in students
+    ]
+
+
+def iter_schedule_csv(date: str = None, exam_id: int = None, format: str = "grouped",
+                      chunk_rows: Optional[int] = None, page_batches: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Encoded CSV in pieces of roughly CHUNK_BYTES, reading the cursors `chunk_rows` rows at a time
+    Each page of `page_batches` batches is read on its own pooled connection, released before
+    any of it is yielded. A write landing between pages shows in the later ones only; the
+    export cache keys the file on the versions read before the first page, which no request
+    made after that write asks for
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown CSV format '{format}'; expected one of {', '.join(FORMATS)}")
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    page_batches = page_batches or PAGE_BATCHES
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    writer.writerow(HEADERS[format])
+
+    after = None
+    while True:
+        pieces = []
+        with get_db_connection() as conn:
+            join = ordered_join(conn)
+            batches_query, params, _, _ = export_queries(date, exam_id, format, join, after)
+            batches = conn.execute(batches_query + " LIMIT ?", params + [page_batches]).fetchall()
+            if not batches:
+                break
+            last = batches[-1]
+            through = (last['date'], last['time_slot'], last['schedule_id'])
+            _, _, students_query, student_params = export_queries(date, exam_id, format, join, after, through)
+
+            # Plain tuples: this cursor carries one row per student
+            student_cursor = conn.cursor()
+            student_cursor.row_factory = None
+            student_cursor.execute(students_query, student_params)
+            students = _fetch(student_cursor, chunk_rows)
+            pending = next(students, None)
+
+            for batch in batches:
+                members = []
+                while pending is not None and pending[0] == batch['schedule_id']:
+                    members.append(pending)
+                    pending = next(students, None)
+
+                if format == "grouped":
+                    writer.writerow(_grouped_line(batch, members))
+                else:
+                    writer.writerows(_long_lines(batch, members))
+                if buffer.tell() >= CHUNK_BYTES:
+                    pieces.append(drain())
+            student_cursor.close()
+
+        # The connection is back in the pool before the client is waited on
+        yield from pieces
+        if len(batches) < page_batches:
+            break
+        after = through
+
+    if buffer.tell():
+        yield drain()
@@ -1,11 +1,163 @@
+import os
+import queue
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 from datetime import datetime
 
-DATABASE_NAME = "lab_scheduler.db"
+from timeslots import parse_time_slot
+
+# DATABASE_URL picks the backend: with a PostgreSQL URL every connection comes from
+# database_postgres's pooled engine; otherwise the app runs on the SQLite file DATABASE_NAME
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+DATABASE_NAME = DATABASE_URL[len("sqlite:///"):] if DATABASE_URL.startswith("sqlite:///") else "lab_scheduler.db"
+
+# Parsed statements kept per connection (sqlite3's cached_statements; translations for PostgreSQL)
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "512"))
+
+# pg_advisory_xact_lock key standing in for SQLite's database-wide write lock (begin_write)
+WRITE_LOCK_KEY = 0x1AB5C4ED
+
+# Connection pool settings (override through environment variables)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+# PRAGMAs applied to every pooled connection
+CONNECTION_PRAGMAS = {
+    "journal_mode": os.getenv("DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "cache_size": int(os.getenv("DB_CACHE_SIZE", "-20000")),  # negative = KiB
+    "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+def backfill_slot_minutes(conn):
+    """Parse existing time_slot text into start_minute/end_minute"""
+    rows = conn.execute("SELECT schedule_id, time_slot FROM schedules").fetchall()
+    updates = []
+    for schedule_id, time_slot in rows:
+        interval = parse_time_slot(time_slot)
+        if interval:
+            updates.append((interval[0], interval[1], schedule_id))
+    conn.executemany("UPDATE schedules SET start_minute = ?, end_minute = ? WHERE schedule_id = ?", updates)
+
+STUDENT_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS students_fts_insert AFTER INSERT ON students BEGIN
+        INSERT INTO students_fts (rowid, reg_no, name) VALUES (new.rowid, new.reg_no, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS students_fts_delete AFTER DELETE ON students BEGIN
+        INSERT INTO students_fts (students_fts, rowid, reg_no, name) VALUES ('delete', old.rowid, old.reg_no, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS students_fts_update AFTER UPDATE OF reg_no, name ON students BEGIN
+        INSERT INTO students_fts (students_fts, rowid, reg_no, name) VALUES ('delete', old.rowid, old.reg_no, old.name);
+        INSERT INTO students_fts (rowid, reg_no, name) VALUES (new.rowid, new.reg_no, new.name);
+    END
+    """,
+]
+
+def create_student_search(conn):
+    """
+    Trigram FTS5 index over student reg_nos and names (search.py), kept in step by triggers
+    Skipped when SQLite is built without FTS5 or the trigram tokenizer (before 3.34); search
+    then falls back to LIKE scans
+    """
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+                reg_no, name, content='students', content_rowid='rowid', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError:
+        return
+    for trigger in STUDENT_SEARCH_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
+
+# Versioned schema migrations, tracked with PRAGMA user_version.
+# Steps are SQL strings or callables taking the connection.
+# Append new steps; never edit or reorder a step that has shipped.
+MIGRATIONS = [
+    # 1: indexes for collision checks, per-date scans and export joins
+    [
+        "CREATE INDEX IF NOT EXISTS idx_schedule_students_reg_no ON schedule_students (reg_no, schedule_id)",
+        "CREATE INDEX IF NOT EXISTS idx_schedule_students_schedule_id ON schedule_students (schedule_id, reg_no)",
+        "CREATE INDEX IF NOT EXISTS idx_schedules_date ON schedules (date, schedule_id)",
+        "CREATE INDEX IF NOT EXISTS idx_schedules_exam_id ON schedules (exam_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_students_branch_semester ON students (branch, semester, reg_no)",
+    ],
+    # 2: background job table (jobs.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            params TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)",
+    ],
+    # 3: numeric slot bounds (minutes since midnight) for time-aware collision checks
+    [
+        "ALTER TABLE schedules ADD COLUMN start_minute INTEGER",
+        "ALTER TABLE schedules ADD COLUMN end_minute INTEGER",
+        backfill_slot_minutes,
+    ],
+    # 4: per-lab seat counts and whether a lab may host batches mixing groups (batching.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS labs (
+            lab_no TEXT PRIMARY KEY,
+            seats INTEGER NOT NULL,
+            allow_mixed INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    ],
+    # 5: per-table data versions, bumped with every write, that export and response caches key on (versions.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO data_versions (name) VALUES ('students'), ('exams'), ('schedules'), ('labs')",
+        "INSERT OR IGNORE INTO data_versions (name, version) VALUES ('epoch', abs(random() % 2147483647))",
+    ],
+    # 6: keyset pagination of schedules in list order (GET /api/schedules?limit=)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_schedules_date_slot ON schedules (date, time_slot, schedule_id)",
+    ],
+    # 7: student search by reg_no or name (GET /api/students/search)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_students_name ON students (name COLLATE NOCASE)",
+        create_student_search,
+    ],
+]
+
+def uses_postgres() -> bool:
+    return DATABASE_URL.startswith("postgresql")
 
 def init_database():
     """Initialize the database with required tables"""
+    if uses_postgres():
+        from database_postgres import init_database as init_postgres
+        init_postgres(get_pool().engine)
+        return
+    
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
     
@@ -57,14 +209,288 @@ def init_database():
     """)
     
     conn.commit()
+    
+    apply_migrations(conn)
     conn.close()
 
+def apply_migrations(conn):
+    """Apply every migration newer than the database's user_version, one transaction each"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN")
+        try:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+class SQLiteConnection(sqlite3.Connection):
+    dialect = "sqlite"
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of sqlite3 connections
+    Connections are health-checked on checkout and recycled after `recycle` seconds
+    """
+    
+    dialect = "sqlite"
+    
+    def __init__(self, database: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT,
+                 recycle: float = POOL_RECYCLE, pragmas: dict = None):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pragmas = CONNECTION_PRAGMAS if pragmas is None else pragmas
+        
+        self._idle = queue.LifoQueue()  # LIFO keeps the warmest connections in use
+        self._created_at = {}
+        self._open = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_health_checks": 0,
+        }
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False,
+                               factory=SQLiteConnection, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        
+        with self._lock:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        return conn
+    
+    def _close(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a connection and give its slot back to the pool"""
+        self._close(conn)
+        with self._lock:
+            self._open -= 1
+    
+    def _replace(self, conn: sqlite3.Connection, reason: str) -> sqlite3.Connection:
+        """Close a stale or broken connection and open a new one in its slot"""
+        self._close(conn)
+        with self._lock:
+            self._stats[reason] += 1
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._open -= 1
+            raise
+    
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, opening one if the pool is not full"""
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            self._stats["checkouts"] += 1
+        
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._open < self.size
+                if can_open:
+                    self._open += 1
+            
+            if can_open:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                    raise
+            
+            with self._lock:
+                self._stats["waits"] += 1
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise sqlite3.OperationalError("Timed out waiting for a database connection")
+        
+        if time.monotonic() - self._created_at.get(id(conn), 0) > self.recycle:
+            return self._replace(conn, "recycled")
+        
+        if not self._is_healthy(conn):
+            return self._replace(conn, "failed_health_checks")
+        
+        return conn
+    
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, discarding any uncommitted work"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+    
+    def close(self):
+        """Close every idle connection; connections still checked out close on release"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+    
+    def stats(self) -> dict:
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "database": self.database,
+                "size": self.size,
+                "open": self._open,
+                "idle": idle,
+                "in_use": self._open - idle,
+                **self._stats,
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    Return the pool for the current DATABASE_URL / DATABASE_NAME, replacing it if they changed
+    A ConnectionPool for SQLite, or a database_postgres.PostgresPool with the same interface
+    """
+    global _pool
+    database = DATABASE_URL if uses_postgres() else DATABASE_NAME
+    with _pool_lock:
+        if _pool is None or _pool.database != database:
+            if _pool is not None:
+                _pool.close()
+            if uses_postgres():
+                from database_postgres import PostgresPool
+                _pool = PostgresPool(database)
+            else:
+                _pool = ConnectionPool(database)
+        return _pool
+
+def close_pool():
+    """Close all pooled connections (e.g. before deleting the database file)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+def get_pool_stats() -> dict:
+    """Connection pool statistics for health reporting"""
+    return get_pool().stats()
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
+    """Context manager for pooled database connections"""
+    pool = get_pool()
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+def fetch_dicts(cursor) -> list:
+    """
+    The cursor's remaining rows as plain dicts, built from tuples rather than through
+    sqlite3.Row; leaves the cursor returning tuples
+    """
+    cursor.row_factory = None
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+# ==================== Dialect helpers ====================
+# The SQL elsewhere is written for both backends; the few statements that differ live here.
+
+def dialect(handle) -> str:
+    """'sqlite' or 'postgresql' for a connection or one of its cursors (plain sqlite3 ones included)"""
+    return getattr(getattr(handle, "connection", handle), "dialect", "sqlite")
+
+def begin_write(handle):
+    """
+    Start a transaction holding the database's write lock until commit or rollback, so what
+    was checked inside it still holds when the write lands
+    SQLite's BEGIN IMMEDIATE; a transaction-scoped advisory lock on PostgreSQL
+    """
+    if dialect(handle) == "postgresql":
+        handle.execute("SELECT pg_advisory_xact_lock(?)", (WRITE_LOCK_KEY,))
+    else:
+        handle.execute("BEGIN IMMEDIATE")
+
+def ordered_join(handle) -> str:
+    """
+    Join keyword that keeps the left table as the outer loop: SQLite's CROSS JOIN, which its
+    planner never reorders; a plain JOIN on PostgreSQL, which rejects CROSS JOIN ... ON
+    """
+    if dialect(handle) == "postgresql":
+        return "JOIN"
+    return "CROSS JOIN"
+
+def reserve_ids(cursor, table: str, column: str, count: int) -> range:
+    """
+    `count` consecutive ids for `table` above every id handed out so far, which its own
+    id generation will not hand out again; call inside begin_write so no other writer takes them
+    """
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    last_id = cursor.fetchone()[0]
+    
+    if dialect(cursor) == "postgresql":
+        cursor.execute("SELECT pg_get_serial_sequence(?, ?)", (table, column))
+        sequence = cursor.fetchone()[0]
+        cursor.execute(f"SELECT last_value, is_called FROM {sequence}")
+        last_value, is_called = cursor.fetchone()
+        if is_called and last_value > last_id:
+            last_id = last_value
+        cursor.execute("SELECT setval(?, ?)", (sequence, last_id + count))
+    else:
+        # Explicit ids move sqlite_sequence on by themselves
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        if row and row[0] > last_id:
+            last_id = row[0]
+    
+    return range(last_id + 1, last_id + 1 + count)
+
+def reset_ids(cursor, table: str, column: str):
+    """Restart `table`'s id generation from 1 (once it is empty)"""
+    if dialect(cursor) == "postgresql":
+        cursor.execute("SELECT setval(pg_get_serial_sequence(?, ?), 1, false)", (table, column))
+    else:
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
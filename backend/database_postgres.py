@@ -2,10 +2,21 @@
 Database configuration that supports both SQLite (local) and PostgreSQL (production)
 """
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Date, ForeignKey, Text
+import functools
+from sqlalchemy import create_engine, Column, Integer, String, Date, ForeignKey, Text, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 
+from timeslots import parse_time_slot
+from database import STATEMENT_CACHE_SIZE
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    import psycopg2.extras
+except ImportError:  # only needed to run the app against PostgreSQL
+    psycopg2 = None
+
 # Get database URL from environment variable, default to SQLite for local dev
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./lab_scheduler.db")
 
@@ -13,27 +24,35 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./lab_scheduler.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Create engine with appropriate settings
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
-else:
-    # PostgreSQL settings
-    engine = create_engine(
-        DATABASE_URL,
+def make_engine(url: str):
+    """Engine with appropriate settings for the URL's backend"""
+    if url.startswith("sqlite"):
+        return create_engine(
+            url,
+            connect_args={"check_same_thread": False}
+        )
+    # PostgreSQL settings; the runtime layer below is written against psycopg2, which
+    # SQLAlchemy 2.1 no longer picks by default for a bare postgresql:// URL
+    if url.startswith("postgresql://"):
+        url = url.replace("postgresql://", "postgresql+psycopg2://", 1)
+    return create_engine(
+        url,
         pool_pre_ping=True,
         pool_size=10,
         max_overflow=20
     )
 
+engine = make_engine(DATABASE_URL)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # SQLAlchemy Models
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (
+        Index("idx_students_branch_semester", "branch", "semester", "reg_no"),
+    )
     
     reg_no = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -56,11 +75,17 @@ class Exam(Base):
 
 class Schedule(Base):
     __tablename__ = "schedules"
+    __table_args__ = (
+        Index("idx_schedules_date", "date", "schedule_id"),
+        Index("idx_schedules_exam_id", "exam_id", "date"),
+    )
     
     schedule_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    exam_id = Column(Integer, ForeignKey("exams.exam_id"), nullable=False)
+    exam_id = Column(Integer, ForeignKey("exams.exam_id", ondelete="CASCADE"), nullable=False)
     date = Column(Date, nullable=False)
     time_slot = Column(String, nullable=False)
+    start_minute = Column(Integer)
+    end_minute = Column(Integer)
     total_students = Column(Integer, nullable=False)
     
     exam = relationship("Exam", back_populates="schedules")
@@ -68,17 +93,160 @@ class Schedule(Base):
 
 class ScheduleStudent(Base):
     __tablename__ = "schedule_students"
+    __table_args__ = (
+        Index("idx_schedule_students_reg_no", "reg_no", "schedule_id"),
+        Index("idx_schedule_students_schedule_id", "schedule_id", "reg_no"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    schedule_id = Column(Integer, ForeignKey("schedules.schedule_id"), nullable=False)
-    reg_no = Column(String, ForeignKey("students.reg_no"), nullable=False)
+    schedule_id = Column(Integer, ForeignKey("schedules.schedule_id", ondelete="CASCADE"), nullable=False)
+    reg_no = Column(String, ForeignKey("students.reg_no", ondelete="CASCADE"), nullable=False)
     
     schedule = relationship("Schedule", back_populates="schedule_students")
     student = relationship("Student")
 
-def init_database():
+def backfill_slot_minutes(conn):
+    """Parse existing time_slot text into start_minute/end_minute"""
+    rows = conn.execute(text("SELECT schedule_id, time_slot FROM schedules")).all()
+    updates = []
+    for schedule_id, time_slot in rows:
+        interval = parse_time_slot(time_slot)
+        if interval:
+            updates.append({"start": interval[0], "end": interval[1], "schedule_id": schedule_id})
+    if updates:
+        conn.execute(text("""
+            UPDATE schedules SET start_minute = :start, end_minute = :end
+            WHERE schedule_id = :schedule_id
+        """), updates)
+
+def create_student_search(conn):
+    """
+    Prefix and trigram indexes for student search by reg_no or name (search.py); PostgreSQL only
+    text_pattern_ops keeps prefix matches (LIKE 'x%') on an index under any collation
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_students_reg_no_pattern ON students (reg_no text_pattern_ops)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_students_name ON students (lower(name) text_pattern_ops)"))
+    # pg_trgm ships with the contrib modules, which not every server has; substring search then scans
+    if conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is None:
+        return
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_students_reg_no_trgm ON students USING gin (reg_no gin_trgm_ops)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_students_name_trgm ON students USING gin (name gin_trgm_ops)"))
+
+# Versioned schema migrations for databases created before the models above changed,
+# tracked in the schema_version table. Steps are SQL strings or callables taking the
+# connection. Append new steps; never edit a shipped one.
+MIGRATIONS = [
+    # 1: indexes for collision checks, per-date scans and export joins
+    [
+        "CREATE INDEX IF NOT EXISTS idx_schedule_students_reg_no ON schedule_students (reg_no, schedule_id)",
+        "CREATE INDEX IF NOT EXISTS idx_schedule_students_schedule_id ON schedule_students (schedule_id, reg_no)",
+        "CREATE INDEX IF NOT EXISTS idx_schedules_date ON schedules (date, schedule_id)",
+        "CREATE INDEX IF NOT EXISTS idx_schedules_exam_id ON schedules (exam_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_students_branch_semester ON students (branch, semester, reg_no)",
+    ],
+    # 2: background job table (jobs.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            params TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)",
+    ],
+    # 3: numeric slot bounds (minutes since midnight) for time-aware collision checks
+    [
+        "ALTER TABLE schedules ADD COLUMN IF NOT EXISTS start_minute INTEGER",
+        "ALTER TABLE schedules ADD COLUMN IF NOT EXISTS end_minute INTEGER",
+        backfill_slot_minutes,
+    ],
+    # 4: per-lab seat counts and whether a lab may host batches mixing groups (batching.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS labs (
+            lab_no TEXT PRIMARY KEY,
+            seats INTEGER NOT NULL,
+            allow_mixed INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    ],
+    # 5: per-table data versions, bumped with every write, that export and response caches key on (versions.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        INSERT INTO data_versions (name) VALUES ('students'), ('exams'), ('schedules'), ('labs')
+        ON CONFLICT (name) DO NOTHING
+        """,
+        """
+        INSERT INTO data_versions (name, version) VALUES ('epoch', floor(random() * 2147483647))
+        ON CONFLICT (name) DO NOTHING
+        """,
+    ],
+    # 6: keyset pagination of schedules in list order (GET /api/schedules?limit=)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_schedules_date_slot ON schedules (date, time_slot, schedule_id)",
+    ],
+    # 7: student search by reg_no or name (GET /api/students/search)
+    [
+        create_student_search,
+    ],
+    # 8: deleting a student, exam or schedule takes its dependent rows with it; the delete
+    # endpoints remove them first (and update the occupancy index), so this is a backstop
+    # for deletes made outside the API
+    [
+        "ALTER TABLE schedules DROP CONSTRAINT IF EXISTS schedules_exam_id_fkey",
+        """
+        ALTER TABLE schedules ADD CONSTRAINT schedules_exam_id_fkey
+        FOREIGN KEY (exam_id) REFERENCES exams (exam_id) ON DELETE CASCADE
+        """,
+        "ALTER TABLE schedule_students DROP CONSTRAINT IF EXISTS schedule_students_schedule_id_fkey",
+        """
+        ALTER TABLE schedule_students ADD CONSTRAINT schedule_students_schedule_id_fkey
+        FOREIGN KEY (schedule_id) REFERENCES schedules (schedule_id) ON DELETE CASCADE
+        """,
+        "ALTER TABLE schedule_students DROP CONSTRAINT IF EXISTS schedule_students_reg_no_fkey",
+        """
+        ALTER TABLE schedule_students ADD CONSTRAINT schedule_students_reg_no_fkey
+        FOREIGN KEY (reg_no) REFERENCES students (reg_no) ON DELETE CASCADE
+        """,
+    ],
+]
+
+def apply_migrations(bind=None):
+    """Apply every migration newer than the recorded schema version, one transaction each"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+        version = conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+    
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        with bind.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": number})
+
+def init_database(bind=None):
     """Initialize the database with all tables"""
-    Base.metadata.create_all(bind=engine)
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    apply_migrations(bind)
     print("✅ Database tables created successfully!")
 
 def get_db():
@@ -88,3 +256,179 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# ==================== Runtime access ====================
+# With a PostgreSQL DATABASE_URL, database.get_db_connection hands out connections from the
+# engine's pool wrapped to behave like the sqlite3 connections the rest of the code is written
+# against: ? placeholders, rows readable by name or position, lastrowid, DATE columns as text.
+
+EXECUTEMANY_PAGE_SIZE = 1000
+
+if psycopg2 is not None:
+    # ISO date strings, as SQLite returns them, rather than datetime.date
+    DATE_AS_TEXT = psycopg2.extensions.new_type(psycopg2.extensions.DATE.values, "DATE_AS_TEXT",
+                                                lambda value, cursor: value)
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def translate(sql: str) -> str:
+    """sqlite3-style SQL in psycopg2's paramstyle: ? becomes %s outside quotes, % becomes %%"""
+    out = []
+    quote = None
+    for char in sql:
+        if char == "%":
+            out.append("%%")
+        elif quote:
+            out.append(char)
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+            out.append(char)
+        elif char == "?":
+            out.append("%s")
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+class Row(tuple):
+    """A result row readable by position or column name, like sqlite3.Row"""
+    __slots__ = ()
+    columns = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self.columns[key]
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return list(self.columns)
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def row_class(names: tuple) -> type:
+    return type("Row", (Row,), {"__slots__": (), "columns": {name: index for index, name in enumerate(names)}})
+
+
+class PostgresCursor:
+    """The part of sqlite3.Cursor the application uses, over a psycopg2 cursor"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.row_factory = connection.row_factory
+        self._cursor = connection.raw.cursor()
+
+    def execute(self, sql: str, params=()):
+        self._cursor.execute(translate(sql), tuple(params))
+        return self
+
+    def executemany(self, sql: str, rows):
+        psycopg2.extras.execute_batch(self._cursor, translate(sql), list(rows), page_size=EXECUTEMANY_PAGE_SIZE)
+        return self
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        """Id generated by the last INSERT on this connection's serial columns"""
+        with self.connection.raw.cursor() as cursor:
+            cursor.execute("SELECT lastval()")
+            return cursor.fetchone()[0]
+
+    def _rows(self, rows):
+        if self.row_factory is None or not rows:
+            return rows
+        make = row_class(tuple(column[0] for column in self._cursor.description))
+        return [make(row) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        return self._rows([row])[0]
+
+    def fetchmany(self, size: int = None):
+        return self._rows(self._cursor.fetchmany(size or self._cursor.arraysize))
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class PostgresConnection:
+    """The part of sqlite3.Connection the application uses, over a pooled psycopg2 connection"""
+
+    dialect = "postgresql"
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.row_factory = Row
+
+    def cursor(self) -> PostgresCursor:
+        return PostgresCursor(self)
+
+    def execute(self, sql: str, params=()) -> PostgresCursor:
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, rows) -> PostgresCursor:
+        return self.cursor().executemany(sql, rows)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.raw.dbapi_connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class PostgresPool:
+    """
+    database.ConnectionPool's interface over the engine's own connection pool
+    (pool_size plus max_overflow connections, pre-pinged on checkout)
+    """
+
+    dialect = "postgresql"
+
+    def __init__(self, url: str):
+        if psycopg2 is None:
+            raise RuntimeError("A PostgreSQL DATABASE_URL needs the psycopg2 package")
+        self.database = url
+        self.engine = engine if url == DATABASE_URL else make_engine(url)
+
+    def acquire(self) -> PostgresConnection:
+        raw = self.engine.raw_connection()
+        psycopg2.extensions.register_type(DATE_AS_TEXT, raw.dbapi_connection)
+        return PostgresConnection(raw)
+
+    def release(self, conn: PostgresConnection):
+        """Return the connection to the engine's pool, which rolls back uncommitted work"""
+        conn.raw.close()
+
+    def close(self):
+        self.engine.dispose()
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        return {
+            "database": self.engine.url.render_as_string(hide_password=True),
+            "size": pool.size(),
+            "open": pool.checkedin() + pool.checkedout(),
+            "idle": pool.checkedin(),
+            "in_use": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
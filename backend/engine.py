@@ -0,0 +1,371 @@
+"""
+Global scheduling engine
+Places the batches of a whole exam set across each exam's date_start..date_end window in one
+pass, respecting lab occupancy (one batch per lab per slot), the configured slots and
+student no-overlap. Batches that cannot be placed are reported rather than dropped.
+"""
+
+from collections import defaultdict, deque
+from datetime import date as Date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import get_db_connection, begin_write
+from scheduler import write_schedules
+from optimizer import DEFAULT_TIME_BUDGET, optimize
+from batching import load_labs, lab_capacity, split_groups
+from timeslots import WHOLE_DAY, parse_time_slot, format_time_slot, slot_interval
+from versions import TABLES, read_versions
+
+# Longest exam window the engine will expand into candidate dates
+MAX_WINDOW_DAYS = 366
+# Plans made before a generate_all commit that may be discarded because the data moved on
+PLAN_ATTEMPTS = 3
+
+
+def _overlaps(a, b) -> bool:
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def exam_dates(exam: Dict) -> List[str]:
+    """Every ISO date from date_start to date_end inclusive; raises ValueError for a bad window"""
+    start = Date.fromisoformat(str(exam['date_start']))
+    end = Date.fromisoformat(str(exam['date_end']))
+    if end < start:
+        raise ValueError("date_end is before date_start")
+    if (end - start).days >= MAX_WINDOW_DAYS:
+        raise ValueError(f"window is longer than {MAX_WINDOW_DAYS} days")
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+
+def load_snapshot(conn, exam_ids: Optional[List[int]] = None) -> Dict:
+    """
+    Read everything the planner needs in a handful of queries
+    Students grouped by branch-semester, lab seats, the exams with their candidate dates, and
+    the student/lab intervals already booked on those dates
+    """
+    students = conn.execute("""
+        SELECT reg_no, name, branch, semester
+        FROM students
+        ORDER BY branch, semester, reg_no
+    """).fetchall()
+
+    groups = {}
+    for student in students:
+        groups.setdefault(f"{student['branch']}-{student['semester']}", []).append(dict(student))
+
+    if exam_ids:
+        placeholders = ",".join("?" * len(exam_ids))
+        exam_rows = conn.execute(f"SELECT * FROM exams WHERE exam_id IN ({placeholders}) ORDER BY exam_id",
+                                 list(exam_ids)).fetchall()
+        missing = set(exam_ids) - {row['exam_id'] for row in exam_rows}
+    else:
+        exam_rows = conn.execute("SELECT * FROM exams ORDER BY exam_id").fetchall()
+        missing = set()
+
+    exams = []
+    errors = [f"Exam {exam_id}: not found" for exam_id in sorted(missing)]
+    for row in exam_rows:
+        exam = dict(row)
+        try:
+            exam['dates'] = exam_dates(exam)
+        except ValueError as e:
+            errors.append(f"Exam {exam['exam_id']}: {e}")
+            continue
+        exams.append(exam)
+
+    dates = sorted({d for exam in exams for d in exam['dates']})
+    student_busy = defaultdict(lambda: defaultdict(list))  # date -> reg_no -> [interval]
+    lab_busy = defaultdict(lambda: defaultdict(list))      # date -> lab_no -> [interval]
+    taking = defaultdict(set)                              # exam_id -> reg_nos already scheduled
+
+    if dates:
+        rows = conn.execute("""
+            SELECT s.schedule_id, s.exam_id, s.date, s.start_minute, s.end_minute, e.lab_no
+            FROM schedules s
+            JOIN exams e ON e.exam_id = s.exam_id
+            WHERE s.date BETWEEN ? AND ?
+        """, (dates[0], dates[-1])).fetchall()
+        wanted = set(dates)
+        schedules = {}
+        for row in rows:
+            if row['date'] in wanted:
+                interval = slot_interval(row['start_minute'], row['end_minute'])
+                schedules[row['schedule_id']] = (row['date'], interval)
+                lab_busy[row['date']][row['lab_no']].append(interval)
+
+        if schedules:
+            for schedule_id, reg_no in conn.execute("""
+                SELECT ss.schedule_id, ss.reg_no
+                FROM schedule_students ss
+                JOIN schedules s ON ss.schedule_id = s.schedule_id
+                WHERE s.date BETWEEN ? AND ?
+            """, (dates[0], dates[-1])):
+                if schedule_id in schedules:
+                    schedule_date, interval = schedules[schedule_id]
+                    student_busy[schedule_date][reg_no].append(interval)
+
+    if exams:
+        placeholders = ",".join("?" * len(exams))
+        for exam_id, reg_no in conn.execute(f"""
+            SELECT DISTINCT s.exam_id, ss.reg_no
+            FROM schedule_students ss
+            JOIN schedules s ON ss.schedule_id = s.schedule_id
+            WHERE s.exam_id IN ({placeholders})
+        """, [exam['exam_id'] for exam in exams]):
+            taking[exam_id].add(reg_no)
+
+    # Plain dicts so the snapshot can be pickled into worker processes (whatif.py)
+    return {
+        'groups': groups,
+        'labs': load_labs(conn),
+        'exams': exams,
+        'errors': errors,
+        'student_busy': {day: dict(students) for day, students in student_busy.items()},
+        'lab_busy': {day: dict(labs) for day, labs in lab_busy.items()},
+        'taking': dict(taking),
+    }
+
+
+class _Grid:
+    """Per-cell occupancy for one planning run: busy students, taken labs and batches placed"""
+
+    def __init__(self, snapshot: Dict, time_slots: List[Dict]):
+        self.labels = [format_time_slot(slot['start_time'], slot['end_time']) for slot in time_slots]
+        self.intervals = [parse_time_slot(label) or WHOLE_DAY for label in self.labels]
+        # Slots that overlap each other (including themselves) block each other
+        self.neighbours = [
+            [j for j, other in enumerate(self.intervals) if _overlaps(interval, other)]
+            for interval in self.intervals
+        ]
+
+        # Per-cell sets of busy students and busy labs, seeded from the existing schedules
+        self.busy = {}
+        self.lab_taken = {}
+        for exam in snapshot['exams']:
+            for day in exam['dates']:
+                if (day, 0) in self.busy:
+                    continue
+                booked = snapshot['student_busy'].get(day, {})
+                labs = snapshot['lab_busy'].get(day, {})
+                for index, interval in enumerate(self.intervals):
+                    self.busy[(day, index)] = {
+                        reg_no for reg_no, taken in booked.items()
+                        if any(_overlaps(interval, other) for other in taken)
+                    }
+                    self.lab_taken[(day, index)] = {
+                        lab_no for lab_no, taken in labs.items()
+                        if any(_overlaps(interval, other) for other in taken)
+                    }
+        self.load = defaultdict(int)  # cell -> batches placed by this run
+
+    def open_cells(self, batch: Dict) -> List[Tuple[str, int]]:
+        """Cells in the batch's window where its lab is still free"""
+        return [cell for cell in batch['cells'] if batch['lab_no'] not in self.lab_taken[cell]]
+
+    def clashing(self, batch: Dict, cell: Tuple[str, int]) -> List[Dict]:
+        cell_busy = self.busy[cell]
+        return [s for s in batch['students'] if s['reg_no'] in cell_busy]
+
+    def place(self, batch: Dict, cell: Tuple[str, int], members: List[Dict]) -> Dict:
+        day, index = cell
+        self.load[cell] += 1
+        for other in self.neighbours[index]:
+            self.lab_taken[(day, other)].add(batch['lab_no'])
+            self.busy[(day, other)].update(s['reg_no'] for s in members)
+        return {
+            'exam_id': batch['exam_id'],
+            'date': day,
+            'time_slot': self.labels[index],
+            'interval': self.intervals[index],
+            'batch_number': batch['batch_number'],
+            'group': batch['group'],
+            'total_students': len(members),
+            'students': members
+        }
+
+
+def build_batches(snapshot: Dict, slot_count: int, max_students_per_batch: int,
+                  lab_capacities: Optional[Dict[str, int]] = None,
+                  exam_groups: Optional[Dict[int, List[str]]] = None) -> List[Dict]:
+    """
+    Split each exam's students into balanced batches no larger than its lab's seats
+    `lab_capacities` overrides the seats in the labs table. Exams with the fewest candidate
+    cells come first so they get the pick of the shared cells.
+    """
+    lab_capacities = lab_capacities or {}
+    exam_groups = exam_groups or {}
+    batches = []
+
+    for exam in sorted(snapshot['exams'], key=lambda exam: (len(exam['dates']), exam['exam_id'])):
+        lab = dict(snapshot['labs'].get(exam['lab_no']) or {})
+        if lab_capacities.get(exam['lab_no']):
+            lab['seats'] = lab_capacities[exam['lab_no']]
+        capacity = lab_capacity(max_students_per_batch, lab)
+
+        already = snapshot['taking'].get(exam['exam_id'], set())
+        group_keys = exam_groups.get(exam['exam_id']) or list(snapshot['groups'])
+        cells = [(day, index) for day in exam['dates'] for index in range(slot_count)]
+        waiting = {
+            group_key: [s for s in snapshot['groups'].get(group_key, []) if s['reg_no'] not in already]
+            for group_key in group_keys
+        }
+
+        for number, (group_key, students) in enumerate(
+                split_groups(waiting, capacity, merge=bool(lab.get('allow_mixed'))), start=1):
+            batches.append({
+                'exam': exam,
+                'exam_id': exam['exam_id'],
+                'lab_no': exam['lab_no'],
+                'batch_number': number,
+                'group': group_key,
+                'students': students,
+                'cells': cells
+            })
+
+    return batches
+
+
+def plan(snapshot: Dict, time_slots: List[Dict], max_students_per_batch: int,
+         lab_capacities: Optional[Dict[str, int]] = None,
+         exam_groups: Optional[Dict[int, List[str]]] = None,
+         optimizer: str = "greedy", time_budget: Optional[float] = None, seed: int = 0,
+         max_iterations: Optional[int] = None) -> Dict:
+    """
+    Assign every exam's batches to (date, slot) cells without touching the database
+    A lab hosts at most one batch per cell and a batch is never larger than its lab's seats.
+    With an optimizer (see optimizer.METHODS) the batches are first placed as a whole from its
+    conflict-graph assignment. The greedy pass places the rest: each batch takes the clash-free
+    cell that has been used least so far, otherwise the least clashing cell, and its clashing
+    members are retried as a smaller batch. Students who clash everywhere are reported as unplaceable.
+    """
+    grid = _Grid(snapshot, time_slots)
+    batches = build_batches(snapshot, len(time_slots), max_students_per_batch, lab_capacities, exam_groups)
+    next_number = defaultdict(int)
+    for batch in batches:
+        next_number[batch['exam_id']] = max(next_number[batch['exam_id']], batch['batch_number'] + 1)
+
+    placed = []
+    unplaceable = []
+    queue = deque(batches)
+    optimizer_stats = None
+
+    if optimizer != "greedy":
+        # Cells where the lab is free and no member is already booked
+        domains = [
+            [cell for cell in grid.open_cells(batch) if not grid.clashing(batch, cell)]
+            for batch in batches
+        ]
+        cells, optimizer_stats = optimize(
+            domains,
+            [{s['reg_no'] for s in batch['students']} for batch in batches],
+            [batch['lab_no'] for batch in batches],
+            grid.neighbours,
+            method=optimizer,
+            time_budget=DEFAULT_TIME_BUDGET if time_budget is None else time_budget,
+            seed=seed,
+            max_iterations=max_iterations
+        )
+
+        # Anything the optimizer could not fit cleanly falls through to the greedy pass
+        queue = deque()
+        for batch, cell in zip(batches, cells):
+            if cell is not None and batch['lab_no'] not in grid.lab_taken[cell] and not grid.clashing(batch, cell):
+                placed.append(grid.place(batch, cell, batch['students']))
+            else:
+                queue.append(batch)
+
+    while queue:
+        batch = queue.popleft()
+        exam = batch['exam']
+        open_cells = grid.open_cells(batch)
+        if not open_cells:
+            unplaceable.append({
+                'exam_id': batch['exam_id'],
+                'batch_number': batch['batch_number'],
+                'group': batch['group'],
+                'students': [s['reg_no'] for s in batch['students']],
+                'reason': f"Lab {batch['lab_no']} has no free slot between {exam['date_start']} and {exam['date_end']}"
+            })
+            continue
+
+        # Fewest clashes, then the least used cell, then the earliest
+        best = min(open_cells, key=lambda cell: (len(grid.clashing(batch, cell)), grid.load[cell]))
+        clashing = grid.clashing(batch, best)
+        clashing_reg_nos = {s['reg_no'] for s in clashing}
+        free = [s for s in batch['students'] if s['reg_no'] not in clashing_reg_nos]
+
+        if not free:
+            unplaceable.append({
+                'exam_id': batch['exam_id'],
+                'batch_number': batch['batch_number'],
+                'group': batch['group'],
+                'students': [s['reg_no'] for s in batch['students']],
+                'reason': "Every student is busy in every free slot of the window"
+            })
+            continue
+
+        placed.append(grid.place(batch, best, free))
+
+        if clashing:
+            queue.append({**batch, 'batch_number': next_number[batch['exam_id']], 'students': clashing})
+            next_number[batch['exam_id']] += 1
+
+    return {
+        'schedules': placed,
+        'unplaceable': unplaceable,
+        'errors': list(snapshot['errors']),
+        'stats': {
+            'exams': len(snapshot['exams']),
+            'schedules': len(placed),
+            'students_placed': sum(p['total_students'] for p in placed),
+            'students_unplaceable': sum(len(u['students']) for u in unplaceable),
+            'cells_used': len(grid.load),
+            'optimizer': optimizer_stats,
+        }
+    }
+
+
+def generate_all(exam_ids: Optional[List[int]], time_slots: List[Dict], max_students_per_batch: int,
+                 lab_capacities: Optional[Dict[str, int]] = None,
+                 exam_groups: Optional[Dict[int, List[str]]] = None,
+                 optimizer: str = "greedy", time_budget: Optional[float] = None, seed: int = 0,
+                 max_iterations: Optional[int] = None,
+                 progress: Optional[Callable[[float, str], None]] = None) -> Dict:
+    """
+    Plan and write schedules for a set of exams (every exam when `exam_ids` is empty)
+    Planning (annealing included) runs on a snapshot without holding the write lock. The write
+    transaction then checks that nothing the plan read has changed since and commits it; if
+    something has, the exams are snapshotted and planned again, up to PLAN_ATTEMPTS times.
+    """
+    if progress is None:
+        progress = lambda fraction, message: None
+    # JSON job params carry mapping keys as strings
+    exam_groups = {int(exam_id): keys for exam_id, keys in (exam_groups or {}).items()}
+
+    for _ in range(PLAN_ATTEMPTS):
+        with get_db_connection() as conn:
+            # Read before the snapshot: any write the snapshot may have missed moves them
+            versions = read_versions(conn, *TABLES)
+            snapshot = load_snapshot(conn, exam_ids)
+        progress(0.2, f"Loaded {len(snapshot['exams'])} exams")
+
+        result = plan(snapshot, time_slots, max_students_per_batch, lab_capacities, exam_groups,
+                      optimizer, time_budget, seed, max_iterations)
+
+        with get_db_connection() as conn:
+            begin_write(conn)
+            if read_versions(conn, *TABLES) != versions:
+                progress(0.2, "Data changed while planning; discarding the plan")
+                continue
+            progress(0.7, f"Writing {len(result['schedules'])} schedules")
+
+            schedule_ids = write_schedules(conn, [
+                (p['exam_id'], p['date'], p['time_slot'], p['interval'], [s['reg_no'] for s in p['students']])
+                for p in result['schedules']
+            ])
+        for schedule_id, placement in zip(schedule_ids, result['schedules']):
+            placement['schedule_id'] = schedule_id
+            del placement['interval']
+        return result
+
+    raise RuntimeError(f"Students, exams, labs or schedules changed during each of {PLAN_ATTEMPTS} planning attempts")
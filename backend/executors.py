@@ -0,0 +1,67 @@
+"""
+Execution pools
+Blocking database I/O runs on a bounded thread pool and CPU-heavy rendering on a bounded
+process pool, so neither the event loop nor the GIL is tied up by a long export
+"""
+
+import os
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from database import POOL_SIZE
+
+DB_WORKERS = int(os.getenv("DB_WORKERS", str(POOL_SIZE)))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+# ReportLab layout is pure Python and holds the GIL, so threads would still stall request
+# handling; worker processes are spawned (not forked) to stay clear of the server's threads
+render_executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS,
+                                      mp_context=multiprocessing.get_context("spawn"))
+
+
+async def run_db(func, *args, **kwargs):
+    """Run blocking database work on the DB pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_render(func, *args, **kwargs):
+    """Run CPU-heavy rendering (PDF building) on the render pool; args must be picklable"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(render_executor, functools.partial(func, *args, **kwargs))
+
+
+async def iterate_db(iterator):
+    """
+    Drive a blocking iterator on the DB pool one item at a time, for streaming responses
+    The iterator is closed on the DB pool too, including when the client goes away mid-stream
+    """
+    done = object()
+    try:
+        while True:
+            item = await run_db(next, iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        await run_db(iterator.close)
+
+
+def db_bound(func):
+    """
+    Turn a blocking handler into an async one that runs on the DB pool
+    The wrapped signature is preserved so FastAPI still sees the handler's parameters
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
+
+
+def shutdown():
+    db_executor.shutdown(wait=False, cancel_futures=True)
+    render_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+"""
+Export cache
+Finished CSV and PDF exports kept on local disk under a content address: a hash of the export's
+parameters and the data versions of the tables it reads (versions.py). A write bumps a version,
+so files built from older data are never asked for again and age out of the size-bounded LRU.
+The same key (versions.version_key) doubles as the response ETag.
+"""
+
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Dict, Iterator, Optional
+
+from database import get_db_connection
+from versions import read_versions
+
+CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "lab_scheduler_exports"))
+MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # 0 disables the cache
+EXPORT_TABLES = ("schedules", "exams", "students")
+READ_CHUNK = 64 * 1024
+
+
+def export_versions() -> tuple:
+    """Versions of every table an export reads"""
+    with get_db_connection() as conn:
+        return read_versions(conn, *EXPORT_TABLES)
+
+
+class ExportCache:
+    """
+    Files named by key in one directory; reads refresh a file's mtime and writes evict the
+    least recently used files once the directory outgrows `max_bytes`
+    Files are written under a temporary name and renamed into place, so several server
+    processes can share the directory
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """
+        The cached export for `key`, opened for reading, or None on a miss
+        An open file stays readable even if it is evicted while being sent
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return file
+
+    def size(self, file: BinaryIO) -> int:
+        return os.fstat(file.fileno()).st_size
+
+    def read(self, file: BinaryIO) -> Iterator[bytes]:
+        """Chunks of an opened cache file, closing it when done"""
+        with file:
+            while True:
+                chunk = file.read(READ_CHUNK)
+                if not chunk:
+                    return
+                yield chunk
+
+    def put(self, key: str, data: bytes):
+        """Store a finished export"""
+        for _ in self.filling(key, iter([data])):
+            pass
+
+    def filling(self, key: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        Pass `chunks` through while writing them to the cache
+        The file only becomes visible once the last chunk is through; an export abandoned
+        midway (client gone, error) leaves nothing behind
+        """
+        if not self.enabled:
+            yield from chunks
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix=".partial-")
+        complete = False
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
+            os.replace(temporary, self._path(key))
+            complete = True
+        finally:
+            if not complete:
+                try:
+                    os.unlink(temporary)
+                except OSError:
+                    pass
+        self._evict()
+
+    def _evict(self):
+        """Delete least recently used files until the directory fits in max_bytes"""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+export_cache = ExportCache()
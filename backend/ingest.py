@@ -0,0 +1,150 @@
+"""
+Roster ingestion helpers
+Reads uploads in bounded chunks, validates them column-wise and writes valid rows in bulk
+"""
+
+import os
+from typing import BinaryIO, Callable, Iterator, List, Tuple
+import pandas as pd
+
+from database import get_db_connection
+from versions import bump_versions
+
+STUDENT_COLUMNS = ['reg_no', 'name', 'branch', 'semester']
+EXAM_COLUMNS = ['subject_code', 'subject_name', 'lab_no', 'date_start',
+                'date_end', 'examiner_internal', 'examiner_external']
+
+# Rows parsed, written and committed per step when ingesting an upload
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "5000"))
+
+
+def read_upload_chunks(file: BinaryIO, filename: str, text_columns: List[str],
+                       chunk_rows: int = UPLOAD_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Yield the upload as DataFrames of at most `chunk_rows` rows
+    CSV is parsed incrementally; Excel needs random access so it is read once and sliced
+    """
+    dtype = {column: str for column in text_columns}
+    file.seek(0)
+
+    if filename.endswith('.csv'):
+        yield from pd.read_csv(file, chunksize=chunk_rows, dtype=dtype)
+    else:
+        df = pd.read_excel(file, dtype=dtype)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+
+def _missing_reasons(df: pd.DataFrame, columns: List[str]) -> Tuple[pd.Series, pd.Series]:
+    """Flag rows with an empty required column and name the first one missing"""
+    missing = pd.Series(False, index=df.index)
+    reasons = pd.Series('', index=df.index, dtype=object)
+
+    for column in columns:
+        values = df[column]
+        column_missing = values.isna() | (values.astype(str).str.strip() == '')
+        reasons = reasons.mask(column_missing & ~missing, f"missing {column}")
+        missing |= column_missing
+
+    return missing, reasons
+
+
+def prepare_student_rows(df: pd.DataFrame) -> Tuple[List[tuple], List[str]]:
+    """
+    Validate and coerce a students DataFrame without iterating rows in Python
+    Returns (rows ready for INSERT, per-row error messages)
+    """
+    missing, reasons = _missing_reasons(df, ['reg_no', 'name', 'branch'])
+    text = {column: df[column].astype(str) for column in ['reg_no', 'name', 'branch']}
+
+    semester = pd.to_numeric(df['semester'], errors='coerce')
+    bad_semester = ~missing & (semester.isna() | (semester % 1 != 0))
+    reasons = reasons.mask(bad_semester, "semester must be a whole number")
+
+    invalid = missing | bad_semester
+    valid = ~invalid
+
+    rows = list(zip(
+        text['reg_no'][valid].tolist(),
+        text['name'][valid].tolist(),
+        text['branch'][valid].tolist(),
+        semester[valid].astype(int).tolist()
+    ))
+    errors = [
+        f"Row {reg_no}: {reason} (line {line})"
+        for line, reg_no, reason in zip(
+            (df.index[invalid] + 2).tolist(),  # header is line 1
+            df['reg_no'][invalid].tolist(),
+            reasons[invalid].tolist()
+        )
+    ]
+    return rows, errors
+
+
+def write_student_rows(cursor, rows: List[tuple]):
+    """
+    Insert or update students with a single executemany
+    An upsert rather than INSERT OR REPLACE: REPLACE deletes the old row without firing the
+    delete trigger that keeps the search index (students_fts) in step
+    """
+    cursor.executemany("""
+        INSERT INTO students (reg_no, name, branch, semester)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (reg_no) DO UPDATE SET
+            name = excluded.name, branch = excluded.branch, semester = excluded.semester
+    """, rows)
+    bump_versions(cursor, "students")
+
+
+def prepare_exam_rows(df: pd.DataFrame) -> Tuple[List[tuple], List[str]]:
+    """
+    Validate an exams DataFrame column-wise
+    Returns (rows ready for INSERT, per-row error messages)
+    """
+    missing, reasons = _missing_reasons(df, EXAM_COLUMNS)
+    valid = ~missing
+
+    rows = list(zip(*(df[column][valid].astype(str).tolist() for column in EXAM_COLUMNS)))
+    errors = [
+        f"Row: {reason} (line {line})"
+        for line, reason in zip((df.index[missing] + 2).tolist(), reasons[missing].tolist())
+    ]
+    return rows, errors
+
+
+def write_exam_rows(cursor, rows: List[tuple]):
+    """Insert exams with a single executemany"""
+    cursor.executemany("""
+        INSERT INTO exams (subject_code, subject_name, lab_no, date_start,
+                           date_end, examiner_internal, examiner_external)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    bump_versions(cursor, "exams")
+
+
+def ingest_chunks(chunks: Iterator[pd.DataFrame], prepare: Callable, write: Callable,
+                  noun: str) -> Iterator[dict]:
+    """
+    Validate, write and commit one chunk at a time
+    Yields a progress dict after every chunk and the endpoint's usual summary last. Each chunk
+    takes a pooled connection only while it is written, so a slow reader or upload holds none.
+    """
+    added = 0
+    processed = 0
+    errors = []
+
+    for chunk in chunks:
+        rows, chunk_errors = prepare(chunk)
+        with get_db_connection() as conn:
+            write(conn.cursor(), rows)
+            conn.commit()
+
+        added += len(rows)
+        processed += len(chunk)
+        errors.extend(chunk_errors)
+        yield {"rows_processed": processed, "added": added, "errors": len(errors)}
+
+    yield {
+        "message": f"Successfully uploaded {added} {noun}",
+        "errors": errors if errors else None
+    }
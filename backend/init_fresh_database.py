@@ -4,13 +4,14 @@ Run this script to create a completely new empty database
 """
 
 import os
-from database import init_database, DATABASE_NAME
+from database import init_database, close_pool, DATABASE_NAME
 
 def init_fresh_database():
     print("🚀 Creating fresh database...")
     
     # Remove old database if exists
     if os.path.exists(DATABASE_NAME):
+        close_pool()
         os.remove(DATABASE_NAME)
         print(f"🗑️  Removed old database: {DATABASE_NAME}")
     
@@ -0,0 +1,157 @@
+"""
+Background jobs
+Runs long operations (schedule generation) on a worker pool and records them in the jobs table
+"""
+
+import os
+import json
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from database import get_db_connection
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback once cancellation has been requested"""
+
+
+class JobManager:
+    """
+    In-process job queue backed by a thread pool
+    Live progress is kept in memory; status transitions and results are stored in the jobs table
+    so finished jobs stay retrievable
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._live = {}  # job_id -> {"status", "progress", "message"}
+        self._cancel_requested = set()
+
+    def _now(self) -> str:
+        return datetime.utcnow().isoformat(timespec="seconds")
+
+    def _record(self, job_id: str, status: str, result=None, error: str = None):
+        with get_db_connection() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?
+                WHERE job_id = ?
+            """, (status, json.dumps(result) if result is not None else None, error, self._now(), job_id))
+            conn.commit()
+
+    def recover(self):
+        """Fail jobs left queued or running by a previous process"""
+        with get_db_connection() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = ?, error = 'Interrupted by server restart', updated_at = ?
+                WHERE status IN (?, ?)
+            """, (FAILED, self._now(), QUEUED, RUNNING))
+            conn.commit()
+
+    def submit(self, kind: str, func: Callable, params: dict) -> str:
+        """
+        Queue `func(**params, progress=callback)` and return the new job id
+        The callback takes (fraction, message) and raises JobCancelled when the job is cancelled
+        """
+        job_id = uuid.uuid4().hex
+        now = self._now()
+
+        with get_db_connection() as conn:
+            conn.execute("""
+                INSERT INTO jobs (job_id, kind, status, params, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (job_id, kind, QUEUED, json.dumps(params), now, now))
+            conn.commit()
+
+        with self._lock:
+            self._live[job_id] = {"status": QUEUED, "progress": 0.0, "message": "Queued"}
+
+        self._executor.submit(self._run, job_id, func, params)
+        return job_id
+
+    def _set_live(self, job_id: str, **fields):
+        with self._lock:
+            self._live[job_id].update(fields)
+
+    def _run(self, job_id: str, func: Callable, params: dict):
+        def progress(fraction: float, message: str = ""):
+            if job_id in self._cancel_requested:
+                raise JobCancelled()
+            self._set_live(job_id, progress=round(fraction, 3), message=message)
+
+        try:
+            progress(0.0, "Starting")
+            self._set_live(job_id, status=RUNNING)
+            self._record(job_id, RUNNING)
+
+            result = func(**params, progress=progress)
+
+            self._record(job_id, COMPLETED, result=result)
+            self._set_live(job_id, status=COMPLETED, progress=1.0, message="Done")
+        except JobCancelled:
+            self._record(job_id, CANCELLED)
+            self._set_live(job_id, status=CANCELLED, message="Cancelled")
+        except Exception as e:
+            self._record(job_id, FAILED, error=str(e))
+            self._set_live(job_id, status=FAILED, message=str(e))
+        finally:
+            with self._lock:
+                self._live.pop(job_id, None)
+                self._cancel_requested.discard(job_id)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Request cancellation; a running job stops at its next progress checkpoint"""
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+
+        with self._lock:
+            if job_id in self._live:
+                self._cancel_requested.add(job_id)
+                self._live[job_id]["message"] = "Cancelling"
+        return self.get(job_id)
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[dict]:
+        """Job status, merged with live progress while the job is in flight"""
+        with get_db_connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            "job_id": row["job_id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": 1.0 if row["status"] == COMPLETED else 0.0,
+            "message": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+        with self._lock:
+            live = self._live.get(job_id)
+            if live is not None:
+                job.update(live)
+                job["cancel_requested"] = job_id in self._cancel_requested
+
+        if include_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_manager = JobManager()
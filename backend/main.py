@@ -1,21 +1,42 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse, ORJSONResponse
 from typing import List
-import pandas as pd
 import io
-import csv
+import asyncio
+import json
+import itertools
 from datetime import datetime
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 
-from database import init_database, get_db_connection
-from models import Student, Exam, ScheduleRequest, ScheduleStudentUpdate
-from scheduler import generate_schedules, check_collision
+from database import init_database, get_db_connection, get_pool_stats, fetch_dicts, dialect, begin_write
+from models import Student, Exam, Lab, ScheduleRequest, PreviewRequest, PlanCommit, RescheduleRequest, GlobalScheduleRequest, WhatIfRequest, ScheduleStudentUpdate
+from scheduler import (
+    generate_schedules, reschedule, check_collision, load_plan_snapshot, plan_schedules, commit_plan
+)
+from engine import generate_all
+from optimizer import METHODS as OPTIMIZER_METHODS
+from whatif import run_what_if, expand_grid, DEFAULT_WEIGHTS, MAX_VARIANTS, shutdown as shutdown_whatif
+from occupancy import occupancy
+from versions import bump_versions, version_key, etag_matches
+from timeslots import slot_interval
+from jobs import job_manager
+from executors import RENDER_WORKERS, db_bound, run_db, run_render, iterate_db, shutdown as shutdown_executors
+from csv_export import FORMATS as CSV_FORMATS, iter_schedule_csv
+from export_cache import export_cache, export_versions
+from response_cache import response_cache, orjson
+from compact import JSON, negotiate_media_type, negotiate_coding, renderer
+from pagination import (
+    MAX_LIMIT as MAX_PAGE_LIMIT, MAX_SCHEDULE_LIMIT, decode_cursor, keyset_clause, prefix_range, parse_fields, project, page_envelope
+)
+from search import DEFAULT_RESULTS as DEFAULT_SEARCH_RESULTS, MAX_RESULTS as MAX_SEARCH_RESULTS, search_students
+from pdf_export import plan_parts, render_sections, merge_pdfs
+from ingest import (
+    STUDENT_COLUMNS, EXAM_COLUMNS, read_upload_chunks, ingest_chunks,
+    prepare_student_rows, write_student_rows, prepare_exam_rows, write_exam_rows
+)
 
-app = FastAPI(title="Lab Exam Scheduler API")
+# orjson encodes the endpoints outside the response cache too, when it is installed
+app = FastAPI(title="Lab Exam Scheduler API", default_response_class=ORJSONResponse if orjson else JSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -24,6 +45,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 @app.on_event("startup")
@@ -31,10 +53,18 @@ async def startup_event():
     """Initialize database on startup"""
     try:
         init_database()
+        job_manager.recover()
         print("✅ Database initialized on startup")
     except Exception as e:
         print(f"⚠️  Database initialization warning: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the background job workers and execution pools"""
+    job_manager.shutdown()
+    shutdown_executors()
+    shutdown_whatif()
+
 # ==================== Health Check & Init Endpoints ====================
 
 @app.get("/")
@@ -47,7 +77,8 @@ async def root():
     }
 
 @app.get("/api/init-db")
-async def init_db_endpoint():
+@db_bound
+def init_db_endpoint():
     """
     FREE alternative to Shell: Initialize database via HTTP
     Visit this URL in browser after deployment to create tables
@@ -55,6 +86,7 @@ async def init_db_endpoint():
     """
     try:
         init_database()
+        occupancy.invalidate()
         return {
             "success": True,
             "message": "✅ Database tables created successfully!",
@@ -67,7 +99,8 @@ async def init_db_endpoint():
         }
 
 @app.get("/api/health")
-async def health_check():
+@db_bound
+def health_check():
     """Check if database is accessible"""
     try:
         with get_db_connection() as conn:
@@ -86,24 +119,144 @@ async def health_check():
                 "students": student_count,
                 "exams": exam_count,
                 "schedules": schedule_count
-            }
+            },
+            "pool": get_pool_stats(),
+            "export_cache": export_cache.stats()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counts of the list response cache and the export cache"""
+    return {
+        "responses": await run_db(response_cache.stats),
+        "exports": export_cache.stats(),
+    }
+
+def check_page_params(limit, cursor, key_size, max_limit=MAX_PAGE_LIMIT):
+    if limit is not None and not 1 <= limit <= max_limit:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {max_limit}")
+    if cursor is not None:
+        if limit is None:
+            raise HTTPException(status_code=400, detail="cursor requires limit")
+        try:
+            decode_cursor(cursor, key_size)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+async def cached_json(request: Request, name: str, tables: tuple, load, compact: bool = False, **params):
+    """
+    Serve a list endpoint through the response cache
+    Answers 304 when the client's ETag still matches the data versions of `tables`. The body is
+    compressed per Accept-Encoding and, with `compact`, may be the columnar form per Accept.
+    """
+    media_type = negotiate_media_type(request.headers.get("accept")) if compact else JSON
+    coding = negotiate_coding(request.headers.get("accept-encoding"))
+    body, etag = await run_db(response_cache.respond, name, tables, load,
+                              request.headers.get("if-none-match"), f"{media_type};{coding or 'identity'}",
+                              renderer(media_type, coding), **params)
+    # no-cache: clients keep the body but revalidate it on every poll
+    headers = {"ETag": etag, "Cache-Control": "no-cache",
+               "Vary": "Accept, Accept-Encoding" if compact else "Accept-Encoding"}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(body, media_type=media_type, headers=headers)
+
 # ==================== Student Endpoints ====================
 
+STUDENT_FIELDS = ("reg_no", "name", "branch", "semester")
+STUDENT_KEY = ("branch", "semester", "reg_no")
+
 @app.get("/api/students")
-async def get_students():
-    """Get all students"""
+async def get_students(request: Request, branch: str = None, semester: int = None,
+                       reg_no_prefix: str = None, fields: str = None, limit: int = None,
+                       cursor: str = None, include_total: bool = False):
+    """
+    Get students, optionally filtered
+    With `limit`, returns one page {items, next_cursor[, total]}; pass next_cursor back as
+    `cursor` for the next
+    """
+    check_page_params(limit, cursor, len(STUDENT_KEY))
+    try:
+        parse_fields(fields, STUDENT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return await cached_json(request, "students", ("students",), load_students,
+                             branch=branch, semester=semester, reg_no_prefix=reg_no_prefix,
+                             fields=fields, limit=limit, cursor=cursor, include_total=include_total)
+
+def load_students(branch: str = None, semester: int = None, reg_no_prefix: str = None, fields: str = None,
+                  limit: int = None, cursor: str = None, include_total: bool = False):
+    fields = parse_fields(fields, STUDENT_FIELDS)
+    filters = ""
+    params = []
+    
+    if branch:
+        filters += " AND branch = ?"
+        params.append(branch)
+    
+    if semester is not None:
+        filters += " AND semester = ?"
+        params.append(semester)
+    
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM students ORDER BY branch, semester, reg_no")
-        students = [dict(row) for row in cursor.fetchall()]
-    return students
+        if reg_no_prefix:
+            clause, clause_params = prefix_range("reg_no", reg_no_prefix, dialect(conn))
+            filters += clause
+            params.extend(clause_params)
+        
+        db_cursor = conn.cursor()
+        keyset, keyset_params = keyset_clause(STUDENT_KEY, cursor)
+        query = f"""
+            SELECT reg_no, name, branch, semester FROM students
+            WHERE 1=1 {filters} {keyset}
+            ORDER BY {", ".join(STUDENT_KEY)}
+        """
+        query_params = params + keyset_params
+        if limit:
+            query += " LIMIT ?"
+            query_params.append(limit + 1)
+        
+        db_cursor.execute(query, query_params)
+        students = fetch_dicts(db_cursor)
+        
+        next_key = None
+        if limit and len(students) > limit:
+            students = students[:limit]
+            next_key = [students[-1][column] for column in STUDENT_KEY]
+        
+        total = None
+        if limit and include_total:
+            db_cursor.execute(f"SELECT COUNT(*) FROM students WHERE 1=1 {filters}", params)
+            total = db_cursor.fetchone()[0]
+    
+    students = project(students, fields)
+    if not limit:
+        return students
+    return page_envelope(students, next_key, total)
+
+@app.get("/api/students/search")
+@db_bound
+def search_students_endpoint(q: str, limit: int = DEFAULT_SEARCH_RESULTS):
+    """
+    Students whose reg_no or name matches `q`, best first
+    reg_no and name prefixes rank ahead of substrings; near misses only show when nothing else matches
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q must not be empty")
+    if not 1 <= limit <= MAX_SEARCH_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SEARCH_RESULTS}")
+    
+    with get_db_connection() as conn:
+        return search_students(conn, q, limit)
 
 @app.post("/api/students")
-async def add_student(student: Student):
+@db_bound
+def add_student(student: Student):
     """Add a single student"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -112,76 +265,103 @@ async def add_student(student: Student):
                 INSERT INTO students (reg_no, name, branch, semester)
                 VALUES (?, ?, ?, ?)
             """, (student.reg_no, student.name, student.branch, student.semester))
+            bump_versions(cursor, "students")
             conn.commit()
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error adding student: {str(e)}")
     return {"message": "Student added successfully"}
 
 @app.post("/api/students/upload")
-async def upload_students(file: UploadFile = File(...)):
-    """Upload students via CSV/Excel"""
-    try:
-        content = await file.read()
+@db_bound
+def upload_students(file: UploadFile = File(...), stream: bool = False):
+    """
+    Upload students via CSV/Excel
+    The file is parsed and committed in chunks; with stream=true progress is sent as NDJSON
+    """
+    return ingest_upload(file, STUDENT_COLUMNS, ['reg_no', 'name', 'branch'],
+                         prepare_student_rows, write_student_rows, "students", stream)
+
+@app.delete("/api/students/{reg_no}")
+@db_bound
+def delete_student(reg_no: str):
+    """Delete a student, taking them off every schedule they are in"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        begin_write(cursor)
+        cursor.execute("SELECT schedule_id FROM schedule_students WHERE reg_no = ?", (reg_no,))
+        schedule_ids = [row[0] for row in cursor.fetchall()]
+        
+        cursor.execute("DELETE FROM schedule_students WHERE reg_no = ?", (reg_no,))
+        cursor.executemany("""
+            UPDATE schedules
+            SET total_students = (
+                SELECT COUNT(*) FROM schedule_students
+                WHERE schedule_id = schedules.schedule_id
+            )
+            WHERE schedule_id = ?
+        """, [(schedule_id,) for schedule_id in schedule_ids])
+        cursor.execute("DELETE FROM students WHERE reg_no = ?", (reg_no,))
+        bump_versions(cursor, "students")
         
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(content))
-        elif file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(io.BytesIO(content))
+        if schedule_ids:
+            bump_versions(cursor, "schedules")
+            with occupancy.committing(conn):
+                for schedule_id in schedule_ids:
+                    occupancy.remove_student(reg_no, schedule_id)
         else:
-            raise HTTPException(status_code=400, detail="File must be CSV or Excel")
+            conn.commit()
+    return {"message": "Student deleted successfully"}
+
+def ingest_upload(file: UploadFile, required_columns, text_columns, prepare, write, noun, stream):
+    """Shared chunked ingestion for the student and exam upload endpoints"""
+    if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
+        raise HTTPException(status_code=400, detail="File must be CSV or Excel")
+    
+    try:
+        chunks = read_upload_chunks(file.file, file.filename, text_columns)
+        first = next(chunks, None)
         
         # Validate required columns
-        required_columns = ['reg_no', 'name', 'branch', 'semester']
-        if not all(col in df.columns for col in required_columns):
+        if first is not None and not all(col in first.columns for col in required_columns):
+            chunks.close()
             raise HTTPException(status_code=400, detail=f"CSV must contain columns: {required_columns}")
         
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            added = 0
-            errors = []
-            
-            for _, row in df.iterrows():
-                try:
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO students (reg_no, name, branch, semester)
-                        VALUES (?, ?, ?, ?)
-                    """, (str(row['reg_no']), str(row['name']), str(row['branch']), int(row['semester'])))
-                    added += 1
-                except Exception as e:
-                    errors.append(f"Row {row['reg_no']}: {str(e)}")
-            
-            conn.commit()
+        if first is not None:
+            chunks = itertools.chain([first], chunks)
+        progress = ingest_chunks(chunks, prepare, write, noun)
         
-        return {
-            "message": f"Successfully uploaded {added} students",
-            "errors": errors if errors else None
-        }
+        if stream:
+            return StreamingResponse(
+                (json.dumps(step) + "\n" for step in progress),
+                media_type="application/x-ndjson"
+            )
+        
+        for summary in progress:
+            pass
+        return summary
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
-@app.delete("/api/students/{reg_no}")
-async def delete_student(reg_no: str):
-    """Delete a student"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM students WHERE reg_no = ?", (reg_no,))
-        conn.commit()
-    return {"message": "Student deleted successfully"}
-
 # ==================== Exam Endpoints ====================
 
 @app.get("/api/exams")
-async def get_exams():
+async def get_exams(request: Request):
     """Get all exams"""
+    return await cached_json(request, "exams", ("exams",), load_exams)
+
+def load_exams():
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM exams ORDER BY date_start")
-        exams = [dict(row) for row in cursor.fetchall()]
+        exams = fetch_dicts(cursor)
     return exams
 
 @app.post("/api/exams")
-async def add_exam(exam: Exam):
+@db_bound
+def add_exam(exam: Exam):
     """Add a single exam"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -192,140 +372,398 @@ async def add_exam(exam: Exam):
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (exam.subject_code, exam.subject_name, exam.lab_no, exam.date_start, 
                   exam.date_end, exam.examiner_internal, exam.examiner_external))
-            conn.commit()
             exam_id = cursor.lastrowid
+            bump_versions(cursor, "exams")
+            conn.commit()
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error adding exam: {str(e)}")
     return {"message": "Exam added successfully", "exam_id": exam_id}
 
 @app.post("/api/exams/upload")
-async def upload_exams(file: UploadFile = File(...)):
-    """Upload exams via CSV/Excel"""
-    try:
-        content = await file.read()
-        
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(content))
-        elif file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(io.BytesIO(content))
-        else:
-            raise HTTPException(status_code=400, detail="File must be CSV or Excel")
+@db_bound
+def upload_exams(file: UploadFile = File(...), stream: bool = False):
+    """
+    Upload exams via CSV/Excel
+    The file is parsed and committed in chunks; with stream=true progress is sent as NDJSON
+    """
+    return ingest_upload(file, EXAM_COLUMNS, EXAM_COLUMNS,
+                         prepare_exam_rows, write_exam_rows, "exams", stream)
+
+@app.delete("/api/exams/{exam_id}")
+@db_bound
+def delete_exam(exam_id: int):
+    """Delete an exam and its schedules"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        begin_write(cursor)
+        cursor.execute("SELECT schedule_id FROM schedules WHERE exam_id = ?", (exam_id,))
+        schedule_ids = [row[0] for row in cursor.fetchall()]
         
-        required_columns = ['subject_code', 'subject_name', 'lab_no', 'date_start', 
-                          'date_end', 'examiner_internal', 'examiner_external']
-        if not all(col in df.columns for col in required_columns):
-            raise HTTPException(status_code=400, detail=f"CSV must contain columns: {required_columns}")
+        cursor.execute("""
+            DELETE FROM schedule_students
+            WHERE schedule_id IN (SELECT schedule_id FROM schedules WHERE exam_id = ?)
+        """, (exam_id,))
+        cursor.execute("DELETE FROM schedules WHERE exam_id = ?", (exam_id,))
+        cursor.execute("DELETE FROM exams WHERE exam_id = ?", (exam_id,))
+        bump_versions(cursor, "exams")
         
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            added = 0
-            errors = []
-            
-            for _, row in df.iterrows():
-                try:
-                    cursor.execute("""
-                        INSERT INTO exams (subject_code, subject_name, lab_no, date_start, 
-                                         date_end, examiner_internal, examiner_external)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (str(row['subject_code']), str(row['subject_name']), str(row['lab_no']),
-                         str(row['date_start']), str(row['date_end']), 
-                         str(row['examiner_internal']), str(row['examiner_external'])))
-                    added += 1
-                except Exception as e:
-                    errors.append(f"Row: {str(e)}")
-            
+        if schedule_ids:
+            bump_versions(cursor, "schedules")
+            with occupancy.committing(conn):
+                for schedule_id in schedule_ids:
+                    occupancy.remove_schedule(schedule_id)
+        else:
             conn.commit()
-        
-        return {
-            "message": f"Successfully uploaded {added} exams",
-            "errors": errors if errors else None
-        }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+    return {"message": "Exam deleted successfully"}
 
-@app.delete("/api/exams/{exam_id}")
-async def delete_exam(exam_id: int):
-    """Delete an exam"""
+# ==================== Lab Endpoints ====================
+
+@app.get("/api/labs")
+@db_bound
+def get_labs():
+    """Get every lab used by an exam or given seats, with its seat count (null if unset)"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM exams WHERE exam_id = ?", (exam_id,))
+        cursor.execute("""
+            SELECT lab_no, seats, allow_mixed FROM labs
+            UNION
+            SELECT DISTINCT lab_no, CAST(NULL AS INTEGER), 0 FROM exams
+            WHERE lab_no NOT IN (SELECT lab_no FROM labs)
+            ORDER BY lab_no
+        """)
+        return [
+            {"lab_no": row["lab_no"], "seats": row["seats"], "allow_mixed": bool(row["allow_mixed"])}
+            for row in cursor.fetchall()
+        ]
+
+@app.put("/api/labs")
+@db_bound
+def save_lab(lab: Lab):
+    """Set a lab's seat count and whether it may mix groups in one batch"""
+    if lab.seats < 1:
+        raise HTTPException(status_code=400, detail="seats must be at least 1")
+    with get_db_connection() as conn:
+        conn.execute("""
+            INSERT INTO labs (lab_no, seats, allow_mixed)
+            VALUES (?, ?, ?)
+            ON CONFLICT (lab_no) DO UPDATE SET seats = excluded.seats, allow_mixed = excluded.allow_mixed
+        """, (lab.lab_no, lab.seats, int(lab.allow_mixed)))
+        bump_versions(conn, "labs")
         conn.commit()
-    return {"message": "Exam deleted successfully"}
+    return {"message": "Lab saved successfully"}
+
+@app.delete("/api/labs/{lab_no}")
+@db_bound
+def delete_lab(lab_no: str):
+    """Remove a lab's seat settings"""
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM labs WHERE lab_no = ?", (lab_no,))
+        bump_versions(conn, "labs")
+        conn.commit()
+    return {"message": "Lab deleted successfully"}
 
 # ==================== Schedule Endpoints ====================
 
-@app.post("/api/schedules/generate")
-async def create_schedule(request: ScheduleRequest):
-    """Generate schedules for an exam"""
-    time_slots = [slot.dict() for slot in request.time_slots]
-    result = generate_schedules(
+@app.post("/api/schedules/generate", status_code=202)
+@db_bound
+def create_schedule(request: ScheduleRequest):
+    """
+    Queue schedule generation for an exam
+    Returns a job id; poll /api/jobs/{job_id} and fetch /api/jobs/{job_id}/result when completed
+    """
+    params = {
+        "exam_id": request.exam_id,
+        "date": request.date,
+        "time_slots": [slot.dict() for slot in request.time_slots],
+        "max_students_per_batch": request.max_students_per_batch
+    }
+    job_id = job_manager.submit("generate_schedules", generate_schedules, params)
+    return job_manager.get(job_id)
+
+@app.post("/api/schedules/preview")
+@db_bound
+def preview_schedules(request: PreviewRequest):
+    """
+    Plan an exam's schedules for several candidate configurations without writing anything
+    Every candidate is planned from the same snapshot; POST one of the returned plans to
+    /api/schedules/commit to keep it
+    """
+    if any(candidate.max_students_per_batch < 1 for candidate in request.candidates):
+        raise HTTPException(status_code=400, detail="max_students_per_batch must be at least 1")
+    if any(not candidate.time_slots for candidate in request.candidates):
+        raise HTTPException(status_code=400, detail="Every candidate needs at least one time slot")
+    
+    with get_db_connection() as conn:
+        snapshot = load_plan_snapshot(conn, request.exam_id, request.date)
+    if not snapshot['student_count']:
+        raise HTTPException(status_code=404, detail="No students found")
+    
+    plans = []
+    for index, candidate in enumerate(request.candidates):
+        time_slots = [slot.dict() for slot in candidate.time_slots]
+        plan = plan_schedules(snapshot, time_slots, candidate.max_students_per_batch)
+        if request.metrics_only:
+            plan = {"metrics": plan["metrics"]}
+        plans.append({
+            "candidate": index,
+            "time_slots": time_slots,
+            "max_students_per_batch": candidate.max_students_per_batch,
+            **plan
+        })
+    return {"exam_id": request.exam_id, "date": request.date, "plans": plans}
+
+@app.post("/api/schedules/commit")
+@db_bound
+def commit_schedule_plan(plan: PlanCommit):
+    """
+    Persist a previewed plan atomically
+    It is checked against the current schedules first; a stale plan is rejected with 409
+    and the conflicting students
+    """
+    result = commit_plan(plan.dict())
+    if result.get("error") == "Exam not found":
+        raise HTTPException(status_code=404, detail=result["error"])
+    if result.get("error"):
+        raise HTTPException(status_code=409, detail=result)
+    return result
+
+@app.post("/api/schedules/reschedule")
+@db_bound
+def reschedule_exam(request: RescheduleRequest):
+    """
+    Apply roster changes to an exam's schedules on a date without regenerating them
+    Returns the diff (removed, added, new and deleted schedules); dry_run only computes it
+    """
+    if request.max_students_per_batch < 1:
+        raise HTTPException(status_code=400, detail="max_students_per_batch must be at least 1")
+    
+    result = reschedule(
         request.exam_id,
         request.date,
-        time_slots,
-        request.max_students_per_batch
+        request.max_students_per_batch,
+        [slot.dict() for slot in request.time_slots] if request.time_slots else None,
+        request.reg_nos,
+        request.add,
+        request.remove,
+        request.dry_run
     )
+    if result.get("error"):
+        raise HTTPException(status_code=404, detail=result["error"])
     return result
 
+@app.post("/api/schedules/generate-all", status_code=202)
+@db_bound
+def create_global_schedule(request: GlobalScheduleRequest):
+    """
+    Queue schedule generation for a set of exams across their whole date windows
+    The result lists placed schedules, unplaceable batches with a reason, and invalid exams
+    """
+    if request.max_students_per_batch < 1:
+        raise HTTPException(status_code=400, detail="max_students_per_batch must be at least 1")
+    if not request.time_slots:
+        raise HTTPException(status_code=400, detail="At least one time slot is required")
+    if request.optimizer != "greedy" and request.optimizer not in OPTIMIZER_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown optimizer '{request.optimizer}'")
+    
+    params = {
+        "exam_ids": request.exam_ids,
+        "time_slots": [slot.dict() for slot in request.time_slots],
+        "max_students_per_batch": request.max_students_per_batch,
+        "lab_capacities": request.lab_capacities,
+        "exam_groups": request.exam_groups,
+        "optimizer": request.optimizer,
+        "time_budget": request.time_budget,
+        "seed": request.seed,
+        "max_iterations": request.max_iterations
+    }
+    job_id = job_manager.submit("generate_all", generate_all, params)
+    return job_manager.get(job_id)
+
+@app.post("/api/schedules/what-if", status_code=202)
+@db_bound
+def create_what_if(request: WhatIfRequest):
+    """
+    Queue a parallel evaluation of a grid of global-engine configurations
+    Nothing is written; the job result ranks every variant by cost (see whatif.DEFAULT_WEIGHTS)
+    """
+    if not request.batch_sizes or any(size < 1 for size in request.batch_sizes):
+        raise HTTPException(status_code=400, detail="batch_sizes must be positive")
+    if not request.slot_sets or any(not slots for slots in request.slot_sets):
+        raise HTTPException(status_code=400, detail="Every slot set needs at least one time slot")
+    if request.optimizer != "greedy" and request.optimizer not in OPTIMIZER_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown optimizer '{request.optimizer}'")
+    unknown = set(request.weights or {}) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown cost weights: {', '.join(sorted(unknown))}")
+    
+    params = {
+        "exam_ids": request.exam_ids,
+        "batch_sizes": request.batch_sizes,
+        "slot_sets": [[slot.dict() for slot in slots] for slots in request.slot_sets],
+        "lab_assignments": request.lab_assignments,
+        "seeds": request.seeds,
+        "optimizer": request.optimizer,
+        "time_budget": request.time_budget,
+        "max_iterations": request.max_iterations,
+        "lab_capacities": request.lab_capacities,
+        "exam_groups": request.exam_groups,
+        "weights": request.weights
+    }
+    variants = len(expand_grid(request.batch_sizes, params["slot_sets"], request.lab_assignments, request.seeds))
+    if variants > MAX_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"{variants} variants requested; the limit is {MAX_VARIANTS}")
+    
+    job_id = job_manager.submit("what_if", run_what_if, params)
+    return job_manager.get(job_id)
+
+SCHEDULE_FIELDS = ("schedule_id", "exam_id", "date", "time_slot", "start_minute", "end_minute",
+                   "total_students", "subject_name", "subject_code", "lab_no", "students")
+SCHEDULE_KEY = ("s.date", "s.time_slot", "s.schedule_id")
+
 @app.get("/api/schedules")
-async def get_schedules(date: str = None, exam_id: int = None):
-    """Get schedules with optional filters"""
+async def get_schedules(request: Request, date: str = None, exam_id: int = None,
+                        date_from: str = None, date_to: str = None, fields: str = None,
+                        limit: int = None, cursor: str = None, include_total: bool = False):
+    """
+    Get schedules with optional filters
+    With `limit`, returns one page {items, next_cursor[, total]}; pass next_cursor back as
+    `cursor` for the next. `fields` picks the keys of each schedule; leaving out `students`
+    skips loading the rosters. Accept: application/vnd.lab-scheduler.compact+json (or +msgpack)
+    returns the columnar form described in compact.py.
+    """
+    check_page_params(limit, cursor, len(SCHEDULE_KEY), max_limit=MAX_SCHEDULE_LIMIT)
+    try:
+        parse_fields(fields, SCHEDULE_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return await cached_json(request, "schedules", ("schedules", "exams", "students"), load_schedules, compact=True,
+                             date=date, exam_id=exam_id, date_from=date_from, date_to=date_to,
+                             fields=fields, limit=limit, cursor=cursor, include_total=include_total)
+
+def schedule_filters(date: str = None, exam_id: int = None, date_from: str = None, date_to: str = None):
+    clause = ""
+    params = []
+    
+    if date:
+        clause += " AND s.date = ?"
+        params.append(date)
+    
+    if exam_id:
+        clause += " AND s.exam_id = ?"
+        params.append(exam_id)
+    
+    if date_from:
+        clause += " AND s.date >= ?"
+        params.append(date_from)
+    
+    if date_to:
+        clause += " AND s.date <= ?"
+        params.append(date_to)
+    
+    return clause, params
+
+def load_schedules(date: str = None, exam_id: int = None, date_from: str = None, date_to: str = None,
+                   fields: str = None, limit: int = None, cursor: str = None, include_total: bool = False):
+    fields = parse_fields(fields, SCHEDULE_FIELDS)
+    filters, filter_params = schedule_filters(date, exam_id, date_from, date_to)
+    
     with get_db_connection() as conn:
-        cursor = conn.cursor()
+        db_cursor = conn.cursor()
         
-        query = """
+        keyset, keyset_params = keyset_clause(SCHEDULE_KEY, cursor)
+        query = f"""
             SELECT s.*, e.subject_name, e.subject_code, e.lab_no
             FROM schedules s
             JOIN exams e ON s.exam_id = e.exam_id
-            WHERE 1=1
+            WHERE 1=1 {filters} {keyset}
+            ORDER BY {", ".join(SCHEDULE_KEY)}
         """
-        params = []
+        params = filter_params + keyset_params
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit + 1)
         
-        if date:
-            query += " AND s.date = ?"
-            params.append(date)
-        
-        if exam_id:
-            query += " AND s.exam_id = ?"
-            params.append(exam_id)
+        db_cursor.execute(query, params)
+        schedules = fetch_dicts(db_cursor)
         
-        query += " ORDER BY s.date, s.time_slot"
+        next_key = None
+        if limit and len(schedules) > limit:
+            schedules = schedules[:limit]
+            last = schedules[-1]
+            next_key = (last['date'], last['time_slot'], last['schedule_id'])
         
-        cursor.execute(query, params)
-        schedules = []
+        total = None
+        if limit and include_total:
+            db_cursor.execute(f"SELECT COUNT(*) FROM schedules s JOIN exams e ON s.exam_id = e.exam_id WHERE 1=1 {filters}",
+                              filter_params)
+            total = db_cursor.fetchone()[0]
         
-        for row in cursor.fetchall():
-            schedule = dict(row)
+        if fields is None or 'students' in fields:
+            # Get students for all selected schedules in one query and group them in memory
+            students_by_schedule = {schedule['schedule_id']: [] for schedule in schedules}
             
-            # Get students for this schedule
-            cursor.execute("""
-                SELECT s.* FROM students s
-                JOIN schedule_students ss ON s.reg_no = ss.reg_no
-                WHERE ss.schedule_id = ?
-                ORDER BY s.branch, s.reg_no
-            """, (schedule['schedule_id'],))
+            if schedules:
+                student_query = """
+                    SELECT ss.schedule_id, st.reg_no, st.name, st.branch, st.semester
+                    FROM schedule_students ss
+                    JOIN schedules s ON ss.schedule_id = s.schedule_id
+                    JOIN students st ON st.reg_no = ss.reg_no
+                    WHERE 1=1
+                """
+                if limit:
+                    # Just this page's schedules (limit keeps the list under SQLite's parameter cap)
+                    student_query += f" AND ss.schedule_id IN ({','.join('?' * len(schedules))})"
+                    student_params = [schedule['schedule_id'] for schedule in schedules]
+                else:
+                    student_query += filters
+                    student_params = filter_params
+                
+                student_query += " ORDER BY st.branch, st.reg_no"
+                
+                db_cursor.execute(student_query, student_params)
+                for schedule_id, reg_no, name, branch, semester in db_cursor.fetchall():
+                    students = students_by_schedule.get(schedule_id)
+                    if students is not None:
+                        students.append({
+                            'reg_no': reg_no,
+                            'name': name,
+                            'branch': branch,
+                            'semester': semester
+                        })
             
-            schedule['students'] = [dict(s) for s in cursor.fetchall()]
-            schedules.append(schedule)
+            for schedule in schedules:
+                schedule['students'] = students_by_schedule[schedule['schedule_id']]
     
-    return schedules
+    schedules = project(schedules, fields)
+    if not limit:
+        return schedules
+    return page_envelope(schedules, next_key, total)
 
 @app.put("/api/schedules/move-student")
-async def move_student(update: ScheduleStudentUpdate):
+@db_bound
+def move_student(update: ScheduleStudentUpdate):
     """Move a student from one schedule to another"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
         # Get date of destination schedule
-        cursor.execute("SELECT date FROM schedules WHERE schedule_id = ?", (update.to_schedule_id,))
+        cursor.execute("""
+            SELECT date, start_minute, end_minute FROM schedules WHERE schedule_id = ?
+        """, (update.to_schedule_id,))
         result = cursor.fetchone()
         if not result:
             raise HTTPException(status_code=404, detail="Destination schedule not found")
         
         date = result['date']
+        interval = slot_interval(result['start_minute'], result['end_minute'])
+        
+        # Hold the write lock from the collision check until the move is committed
+        begin_write(cursor)
+        occupancy.sync(conn)
         
         # Check for collision
-        if check_collision(update.student_reg_no, date, update.from_schedule_id):
+        if check_collision(update.student_reg_no, date, update.from_schedule_id, conn, interval):
             raise HTTPException(status_code=400, detail="Student already scheduled at this time")
         
         # Move student
@@ -334,6 +772,7 @@ async def move_student(update: ScheduleStudentUpdate):
             SET schedule_id = ? 
             WHERE schedule_id = ? AND reg_no = ?
         """, (update.to_schedule_id, update.from_schedule_id, update.student_reg_no))
+        moved = cursor.rowcount > 0
         
         # Update student counts
         cursor.execute("""
@@ -344,85 +783,142 @@ async def move_student(update: ScheduleStudentUpdate):
             )
             WHERE schedule_id IN (?, ?)
         """, (update.from_schedule_id, update.to_schedule_id))
+        bump_versions(cursor, "schedules")
         
-        conn.commit()
+        with occupancy.committing(conn):
+            if moved:
+                occupancy.move_student(update.student_reg_no, update.from_schedule_id,
+                                       update.to_schedule_id, date, interval)
     
     return {"message": "Student moved successfully"}
 
 @app.delete("/api/schedules/{schedule_id}")
-async def delete_schedule(schedule_id: int):
+@db_bound
+def delete_schedule(schedule_id: int):
     """Delete a schedule and its students"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM schedule_students WHERE schedule_id = ?", (schedule_id,))
         cursor.execute("DELETE FROM schedules WHERE schedule_id = ?", (schedule_id,))
-        conn.commit()
+        bump_versions(cursor, "schedules")
+        with occupancy.committing(conn):
+            occupancy.remove_schedule(schedule_id)
     return {"message": "Schedule deleted successfully"}
 
+# ==================== Job Endpoints ====================
+
+@app.get("/api/jobs/{job_id}")
+@db_bound
+def get_job(job_id: str):
+    """Get the status and progress of a background job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/result")
+@db_bound
+def get_job_result(job_id: str):
+    """Get the result of a finished background job"""
+    job = job_manager.get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
+
+@app.post("/api/jobs/{job_id}/cancel")
+@db_bound
+def cancel_job(job_id: str):
+    """Cancel a queued or running background job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 # ==================== Export Endpoints ====================
 
-@app.get("/api/export/csv")
-async def export_csv(date: str = None, exam_id: int = None):
-    """Export schedules to CSV"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT 
-                s.schedule_id,
-                s.date,
-                s.time_slot,
-                e.subject_name,
-                e.subject_code,
-                e.lab_no,
-                GROUP_CONCAT(st.reg_no, ', ') as students,
-                s.total_students
-            FROM schedules s
-            JOIN exams e ON s.exam_id = e.exam_id
-            LEFT JOIN schedule_students ss ON s.schedule_id = ss.schedule_id
-            LEFT JOIN students st ON ss.reg_no = st.reg_no
-            WHERE 1=1
-        """
-        params = []
-        
-        if date:
-            query += " AND s.date = ?"
-            params.append(date)
-        
-        if exam_id:
-            query += " AND s.exam_id = ?"
-            params.append(exam_id)
-        
-        query += " GROUP BY s.schedule_id ORDER BY s.date, s.time_slot"
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+def export_headers(filename: str, key: str) -> dict:
+    # no-cache: browsers keep the file but revalidate it with If-None-Match on every download
+    return {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "ETag": f'"{key}"',
+        "Cache-Control": "no-cache",
+    }
+
+async def cached_export(request: Request, key: str, filename: str, media_type: str):
+    """A 304 or the cached copy of the export `key`; None when it has to be built"""
+    headers = export_headers(filename, key)
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers={"ETag": headers["ETag"], "Cache-Control": "no-cache"})
     
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Date', 'Time Slot', 'Subject', 'Lab', 'Students', 'Total'])
+    cached = await run_db(export_cache.open, key)
+    if cached is None:
+        return None
+    return StreamingResponse(
+        iterate_db(export_cache.read(cached)),
+        media_type=media_type,
+        headers={**headers, "Content-Length": str(export_cache.size(cached))}
+    )
+
+@app.get("/api/export/csv")
+async def export_csv(request: Request, date: str = None, exam_id: int = None, format: str = "grouped"):
+    """
+    Export schedules to CSV, streamed as the cursor is read
+    format=grouped gives one line per batch with its students; format=long one line per student
+    Repeat downloads of unchanged data are served from the export cache
+    """
+    if format not in CSV_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown CSV format '{format}'; expected one of {', '.join(CSV_FORMATS)}")
     
-    for row in rows:
-        writer.writerow([
-            row['date'],
-            row['time_slot'],
-            f"{row['subject_code']} - {row['subject_name']}",
-            row['lab_no'],
-            row['students'] or '',
-            row['total_students']
-        ])
+    # Versions are read before the data: a write landing in between can only leave newer
+    # data under an older key, and the next download after it is a miss
+    key = version_key("csv", await run_db(export_versions), date=date, exam_id=exam_id, format=format)
+    cached = await cached_export(request, key, "schedule.csv", "text/csv")
+    if cached is not None:
+        return cached
     
-    output.seek(0)
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
+        iterate_db(export_cache.filling(key, iter_schedule_csv(date, exam_id, format))),
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=schedule.csv"}
+        headers=export_headers("schedule.csv", key)
     )
 
 @app.get("/api/export/pdf")
-async def export_pdf(date: str = None, exam_id: int = None):
-    """Export schedules to PDF"""
+async def export_pdf(request: Request, date: str = None, exam_id: int = None):
+    """
+    Export schedules to PDF, rendering runs of dates on the render pool in parallel when large
+    Repeat downloads of unchanged data are served from the export cache
+    """
+    key = version_key("pdf", await run_db(export_versions), date=date, exam_id=exam_id)
+    cached = await cached_export(request, key, "schedule.pdf", "application/pdf")
+    if cached is not None:
+        return cached
+    
+    rows = await run_db(fetch_pdf_rows, date, exam_id)
+    parts = plan_parts(rows, RENDER_WORKERS)
+    if len(parts) == 1:
+        pdf = await run_render(render_sections, parts[0])
+    else:
+        rendered = await asyncio.gather(*(
+            run_render(render_sections, part, index == 0) for index, part in enumerate(parts)
+        ))
+        pdf = await run_render(merge_pdfs, rendered)
+    await run_db(export_cache.put, key, pdf)
+    
+    return StreamingResponse(
+        io.BytesIO(pdf),
+        media_type="application/pdf",
+        headers=export_headers("schedule.pdf", key)
+    )
+
+def fetch_pdf_rows(date: str = None, exam_id: int = None):
+    """
+    Load the schedule rows shown in the PDF export: one per batch and branch-semester, its
+    students joined in reg_no order
+    The roster is joined here rather than with GROUP_CONCAT/string_agg, whose order SQLite
+    before 3.44 cannot be told
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
@@ -437,7 +933,7 @@ async def export_pdf(date: str = None, exam_id: int = None):
                 s.total_students,
                 st.branch,
                 st.semester,
-                GROUP_CONCAT(st.reg_no, ', ') as students
+                st.reg_no
             FROM schedules s
             JOIN exams e ON s.exam_id = e.exam_id
             LEFT JOIN schedule_students ss ON s.schedule_id = ss.schedule_id
@@ -454,60 +950,18 @@ async def export_pdf(date: str = None, exam_id: int = None):
             query += " AND s.exam_id = ?"
             params.append(exam_id)
         
-        query += " GROUP BY s.schedule_id, st.branch, st.semester ORDER BY s.date, s.time_slot"
+        query += " ORDER BY s.date, s.time_slot, s.schedule_id, st.branch, st.semester, st.reg_no"
         
         cursor.execute(query, params)
-        rows = cursor.fetchall()
-    
-    # Create PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4))
-    elements = []
-    
-    # Title
-    styles = getSampleStyleSheet()
-    title = Paragraph("<b>Lab Exam Schedule</b>", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 20))
-    
-    # Table data
-    data = [['Date', 'Time Slot', 'Subject', 'Lab', 'Branch/Sem', 'Students', 'Total']]
+        rows = fetch_dicts(cursor)
     
-    for row in rows:
-        data.append([
-            row['date'],
-            row['time_slot'],
-            f"{row['subject_code']}\n{row['subject_name']}",
-            row['lab_no'],
-            f"{row['branch']}-{row['semester']}" if row['branch'] else '',
-            row['students'][:50] + '...' if row['students'] and len(row['students']) > 50 else (row['students'] or ''),
-            str(row['total_students'])
-        ])
-    
-    # Create table
-    table = Table(data, colWidths=[60, 80, 120, 50, 70, 200, 40])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    
-    buffer.seek(0)
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=schedule.pdf"}
-    )
+    grouped = []
+    for _, group in itertools.groupby(rows, key=lambda row: (row['schedule_id'], row['branch'], row['semester'])):
+        group = list(group)
+        row = {key: value for key, value in group[0].items() if key != 'reg_no'}
+        row['students'] = ', '.join(member['reg_no'] for member in group if member['reg_no']) or None
+        grouped.append(row)
+    return grouped
 
 if __name__ == "__main__":
     import uvicorn
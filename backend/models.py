@@ -1,7 +1,9 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import date
 
+from optimizer import MAX_ITERATIONS, MAX_TIME_BUDGET
+
 class Student(BaseModel):
     reg_no: str
     name: str
@@ -18,6 +20,11 @@ class Exam(BaseModel):
     examiner_internal: str
     examiner_external: str
 
+class Lab(BaseModel):
+    lab_no: str
+    seats: int
+    allow_mixed: bool = False  # batches may mix branch-semester groups
+
 class TimeSlot(BaseModel):
     slot_name: str
     start_time: str
@@ -29,6 +36,62 @@ class ScheduleRequest(BaseModel):
     time_slots: List[TimeSlot]
     max_students_per_batch: int
 
+class PlanCandidate(BaseModel):
+    time_slots: List[TimeSlot]
+    max_students_per_batch: int
+
+class PreviewRequest(BaseModel):
+    exam_id: int
+    date: str
+    candidates: List[PlanCandidate]
+    metrics_only: bool = False  # leave out the schedules themselves
+
+class PlannedSchedule(BaseModel):
+    batch_number: Optional[int] = None
+    time_slot: str
+    group: Optional[str] = None
+    students: List[Student]
+
+class PlanCommit(BaseModel):
+    exam_id: int
+    date: str
+    schedules: List[PlannedSchedule]
+    unscheduled: List[Student] = []
+
+class RescheduleRequest(BaseModel):
+    exam_id: int
+    date: str
+    max_students_per_batch: int
+    time_slots: Optional[List[TimeSlot]] = None  # slots for new batches; the date's existing slots by default
+    add: Optional[List[str]] = None  # students joining
+    remove: Optional[List[str]] = None  # students leaving
+    reg_nos: Optional[List[str]] = None  # full roster to diff against when add/remove are not given; every student by default
+    dry_run: bool = False
+
+class GlobalScheduleRequest(BaseModel):
+    exam_ids: Optional[List[int]] = None  # None schedules every exam
+    time_slots: List[TimeSlot]
+    max_students_per_batch: int
+    lab_capacities: Optional[Dict[str, int]] = None  # lab_no -> seats
+    exam_groups: Optional[Dict[int, List[str]]] = None  # exam_id -> branch-semester keys; all students by default
+    optimizer: str = "greedy"  # greedy, dsatur or anneal
+    time_budget: Optional[float] = Field(None, ge=0, le=MAX_TIME_BUDGET)  # seconds for anneal; OPTIMIZER_TIME_BUDGET by default
+    max_iterations: Optional[int] = Field(None, ge=1, le=MAX_ITERATIONS)  # anneal for exactly this many steps instead
+    seed: int = 0
+
+class WhatIfRequest(BaseModel):
+    exam_ids: Optional[List[int]] = None  # None evaluates every exam
+    batch_sizes: List[int]
+    slot_sets: List[List[TimeSlot]]
+    lab_assignments: Optional[List[Dict[int, str]]] = None  # exam_id -> lab_no overrides per variant
+    seeds: List[int] = [0]
+    optimizer: str = "greedy"
+    time_budget: Optional[float] = Field(None, ge=0, le=MAX_TIME_BUDGET)
+    max_iterations: Optional[int] = Field(None, ge=1, le=MAX_ITERATIONS)
+    lab_capacities: Optional[Dict[str, int]] = None
+    exam_groups: Optional[Dict[int, List[str]]] = None
+    weights: Optional[Dict[str, float]] = None  # overrides for whatif.DEFAULT_WEIGHTS
+
 class Schedule(BaseModel):
     schedule_id: int
     exam_id: int
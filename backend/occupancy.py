@@ -0,0 +1,230 @@
+"""
+Occupancy index
+In-memory map of date -> reg_no -> sorted (start, end, schedule_id) intervals, so collision
+checks are a dict lookup plus a bisect instead of a JOIN COUNT per call. Dates are loaded
+lazily from the database and kept in step with every write that goes through generate,
+move-student and delete.
+
+Other writers (another worker, reset_database.py, a shared PostgreSQL database) are noticed
+through the 'schedules' data version (versions.py): `sync(conn)`, called once per request or
+transaction before its lookups, compares it with the version the index was built at and drops
+everything when they differ. Lookups without a connection sync on the one they take. A writer
+updating the index in `committing` adopts its own bump, so the index survives this process's
+writes.
+"""
+
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from database import get_db_connection
+from timeslots import WHOLE_DAY, slot_interval
+from versions import read_versions
+
+
+def _overlapping(intervals: list, start: int, end: int, exclude_schedule_id: int = None) -> bool:
+    """True if any (start, end, schedule_id) in the sorted list overlaps [start, end)"""
+    # Only intervals starting before `end` can overlap
+    cut = bisect.bisect_left(intervals, (end,))
+    return any(
+        interval_end > start and schedule_id != exclude_schedule_id
+        for _, interval_end, schedule_id in intervals[:cut]
+    )
+
+
+class OccupancyIndex:
+    def __init__(self):
+        # RLock so a writer can commit and update the index as one step
+        self.lock = threading.RLock()
+        self._dates = {}      # date -> {reg_no: sorted [(start, end, schedule_id)]}
+        self._schedules = {}  # schedule_id -> (date, start, end), for loaded dates
+        self._members = {}    # schedule_id -> set(reg_no), for loaded dates
+        self._version = None  # (epoch, schedules version) the loaded dates reflect
+
+    def sync(self, conn):
+        """
+        Drop every loaded date if the 'schedules' version moved since they were loaded
+        One query; call it once per request or transaction, before its lookups on `conn`
+        """
+        version = read_versions(conn, "schedules")
+        with self.lock:
+            self._sync(version)
+
+    def _sync(self, version: Tuple[int, ...]):
+        if version != self._version:
+            self._clear()
+            self._version = version
+
+    def _students_on(self, date: str, conn) -> Dict[str, list]:
+        """The date's reg_no -> intervals map, loaded on `conn` if needed; call holding the lock"""
+        students = self._dates.get(date)
+        if students is not None:
+            return students
+        if self._version is None:
+            self._sync(read_versions(conn, "schedules"))
+
+        students = self._dates[date] = {}
+        rows = conn.execute("""
+            SELECT s.schedule_id, s.start_minute, s.end_minute, ss.reg_no
+            FROM schedules s
+            LEFT JOIN schedule_students ss ON ss.schedule_id = s.schedule_id
+            WHERE s.date = ?
+        """, (date,)).fetchall()
+
+        for schedule_id, start_minute, end_minute, reg_no in rows:
+            if schedule_id not in self._schedules:
+                self._schedules[schedule_id] = (date, *slot_interval(start_minute, end_minute))
+                self._members[schedule_id] = set()
+            if reg_no is not None:
+                self._insert(schedule_id, reg_no)
+        return students
+
+    @contextmanager
+    def _reading(self, conn):
+        """
+        Yield a connection to look up on, holding the lock
+        Without `conn`, one is taken from the pool (before the lock, so waiting for the pool
+        never holds it) and synced, as nothing else in the call did
+        """
+        if conn is not None:
+            with self.lock:
+                yield conn
+            return
+        with get_db_connection() as own_conn:
+            self.sync(own_conn)
+            with self.lock:
+                yield own_conn
+
+    def _insert(self, schedule_id: int, reg_no: str):
+        date, start, end = self._schedules[schedule_id]
+        self._members[schedule_id].add(reg_no)
+        bisect.insort(self._dates[date].setdefault(reg_no, []), (start, end, schedule_id))
+
+    def _discard(self, schedule_id: int, reg_no: str):
+        date, start, end = self._schedules[schedule_id]
+        self._members[schedule_id].discard(reg_no)
+        intervals = self._dates[date].get(reg_no)
+        if intervals and (start, end, schedule_id) in intervals:
+            intervals.remove((start, end, schedule_id))
+            if not intervals:
+                del self._dates[date][reg_no]
+
+    def overlaps(self, reg_no: str, date: str, interval: Tuple[int, int] = WHOLE_DAY,
+                 exclude_schedule_id: int = None, conn=None) -> bool:
+        """True if the student has a schedule on `date` overlapping `interval` (minutes)"""
+        with self._reading(conn) as conn:
+            intervals = self._students_on(date, conn).get(reg_no)
+            return bool(intervals) and _overlapping(intervals, *interval, exclude_schedule_id)
+
+    def busy_during(self, date: str, interval: Tuple[int, int] = WHOLE_DAY, conn=None) -> Set[str]:
+        """Every reg_no with a schedule on `date` overlapping `interval`"""
+        start, end = interval
+        with self._reading(conn) as conn:
+            return {
+                reg_no for reg_no, intervals in self._students_on(date, conn).items()
+                if _overlapping(intervals, start, end)
+            }
+
+    def intervals_on(self, date: str, conn=None) -> Dict[str, List[Tuple[int, int]]]:
+        """Copy of every student's booked (start, end) intervals on `date`"""
+        with self._reading(conn) as conn:
+            return {
+                reg_no: [(start, end) for start, end, _ in intervals]
+                for reg_no, intervals in self._students_on(date, conn).items()
+            }
+
+    @contextmanager
+    def committing(self, conn):
+        """
+        Commit `conn` while holding the index lock; record index changes inside the block
+        Readers therefore never see the database and the index disagree
+        """
+        with self.lock:
+            try:
+                yield
+                # The writer bumped 'schedules' once; any other difference is someone else's write
+                epoch, version = read_versions(conn, "schedules")
+                if self._version is not None and self._version != (epoch, version - 1):
+                    self._clear()
+                self._version = (epoch, version)
+                conn.commit()
+            except Exception:
+                self.invalidate()
+                raise
+
+    def add_schedule(self, schedule_id: int, date: str, interval: Tuple[int, int], reg_nos: Iterable[str]):
+        with self.lock:
+            if date not in self._dates:
+                return  # not loaded yet; the next load reads it from the database
+            self._schedules[schedule_id] = (date, *interval)
+            self._members[schedule_id] = set()
+            for reg_no in reg_nos:
+                self._insert(schedule_id, reg_no)
+
+    def remove_schedule(self, schedule_id: int):
+        with self.lock:
+            if schedule_id not in self._schedules:
+                return
+            for reg_no in list(self._members[schedule_id]):
+                self._discard(schedule_id, reg_no)
+            del self._schedules[schedule_id]
+            del self._members[schedule_id]
+
+    def add_student(self, reg_no: str, schedule_id: int, date: str, interval: Tuple[int, int]):
+        with self.lock:
+            if date not in self._dates:
+                return
+            if schedule_id not in self._schedules:
+                self._schedules[schedule_id] = (date, *interval)
+                self._members[schedule_id] = set()
+            self._insert(schedule_id, reg_no)
+
+    def remove_student(self, reg_no: str, schedule_id: int):
+        with self.lock:
+            if schedule_id in self._schedules:
+                self._discard(schedule_id, reg_no)
+
+    def move_student(self, reg_no: str, from_schedule_id: int, to_schedule_id: int,
+                     to_date: str, to_interval: Tuple[int, int]):
+        with self.lock:
+            self.remove_student(reg_no, from_schedule_id)
+            self.add_student(reg_no, to_schedule_id, to_date, to_interval)
+
+    def _clear(self):
+        self._dates.clear()
+        self._schedules.clear()
+        self._members.clear()
+
+    def invalidate(self, date: Optional[str] = None):
+        """Drop one date (or everything) so it is reloaded from the database"""
+        with self.lock:
+            if date is None:
+                self._clear()
+                self._version = None
+                return
+            self._dates.pop(date, None)
+            for schedule_id in [sid for sid, entry in self._schedules.items() if entry[0] == date]:
+                del self._schedules[schedule_id]
+                del self._members[schedule_id]
+
+    def verify(self, conn) -> list:
+        """Compare every loaded date with the database; returns the dates that disagree"""
+        with self.lock:
+            mismatched = []
+            for date, students in self._dates.items():
+                rows = conn.execute("""
+                    SELECT ss.reg_no, s.start_minute, s.end_minute, ss.schedule_id
+                    FROM schedule_students ss
+                    JOIN schedules s ON ss.schedule_id = s.schedule_id
+                    WHERE s.date = ?
+                """, (date,)).fetchall()
+                expected = {}
+                for reg_no, start_minute, end_minute, schedule_id in rows:
+                    expected.setdefault(reg_no, []).append((*slot_interval(start_minute, end_minute), schedule_id))
+                if {reg_no: sorted(intervals) for reg_no, intervals in expected.items()} != students:
+                    mismatched.append(date)
+            return mismatched
+
+
+occupancy = OccupancyIndex()
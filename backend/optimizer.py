@@ -0,0 +1,249 @@
+"""
+Slot assignment optimizer
+Models batches as a conflict graph (two batches conflict when they share a student or a lab)
+and gives each batch a (date, slot) cell so that conflicting batches never sit in overlapping
+cells. DSatur colouring builds the starting assignment; simulated annealing then trades the
+number of cells used against how many exams a student sits on the same day.
+"""
+
+import os
+import math
+import time
+import heapq
+import random
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+METHODS = ("dsatur", "anneal")
+DEFAULT_TIME_BUDGET = float(os.getenv("OPTIMIZER_TIME_BUDGET", "2.0"))
+MAX_TIME_BUDGET = float(os.getenv("OPTIMIZER_MAX_TIME_BUDGET", "30.0"))  # cap on requested budgets
+MAX_ITERATIONS = int(os.getenv("OPTIMIZER_MAX_ITERATIONS", "5000000"))  # cap on requested iteration counts
+
+# Objective weights: hard violations dwarf the soft terms
+CONFLICT_WEIGHT = 1000     # per pair of conflicting batches in overlapping cells
+UNASSIGNED_WEIGHT = 500    # per batch left without a cell
+CELL_WEIGHT = 10           # per distinct cell in use
+SAME_DAY_WEIGHT = 1        # per extra exam a student sits on one day
+
+Cell = Tuple[str, int]  # (date, slot index)
+
+
+def conflict_graph(students: Sequence[Set[str]], labs: Sequence[str]) -> List[Set[int]]:
+    """Adjacency sets: batches sharing a student or a lab"""
+    members = defaultdict(list)
+    for node, reg_nos in enumerate(students):
+        for reg_no in reg_nos:
+            members[("student", reg_no)].append(node)
+    for node, lab_no in enumerate(labs):
+        members[("lab", lab_no)].append(node)
+
+    adjacency = [set() for _ in students]
+    for nodes in members.values():
+        if len(nodes) > 1:
+            for node in nodes:
+                adjacency[node].update(nodes)
+    for node, neighbours in enumerate(adjacency):
+        neighbours.discard(node)
+    return adjacency
+
+
+class _Assignment:
+    """A cell per batch plus the counters the objective needs, updated move by move"""
+
+    def __init__(self, students, adjacency, overlap, cells):
+        self.students = students
+        self.adjacency = adjacency
+        self.overlap = overlap
+        self.cells = list(cells)
+        self.used = Counter(cell for cell in self.cells if cell is not None)
+        self.day_load = Counter()  # (reg_no, date) -> batches that day
+        for node, cell in enumerate(self.cells):
+            if cell is not None:
+                for reg_no in students[node]:
+                    self.day_load[(reg_no, cell[0])] += 1
+
+    def clashes(self, a: Cell, b: Optional[Cell]) -> bool:
+        return b is not None and a[0] == b[0] and b[1] in self.overlap[a[1]]
+
+    def conflicts_at(self, node: int, cell: Optional[Cell]) -> int:
+        if cell is None:
+            return 0
+        cells = self.cells
+        return sum(1 for other in self.adjacency[node] if self.clashes(cell, cells[other]))
+
+    def delta(self, node: int, target: Cell, conflicts: bool = True) -> int:
+        """Change in cost if `node` moved to `target`; skip the conflict term when it is known to be zero"""
+        current = self.cells[node]
+        if current == target:
+            return 0
+
+        change = 0
+        if conflicts:
+            change += CONFLICT_WEIGHT * (self.conflicts_at(node, target) - self.conflicts_at(node, current))
+        if current is None:
+            change -= UNASSIGNED_WEIGHT
+        elif self.used[current] == 1:
+            change -= CELL_WEIGHT
+        if not self.used[target]:
+            change += CELL_WEIGHT
+
+        if current is None or current[0] != target[0]:
+            load = self.day_load
+            extra = 0
+            for reg_no in self.students[node]:
+                if current is not None and load[(reg_no, current[0])] > 1:
+                    extra -= 1
+                if load[(reg_no, target[0])] > 0:
+                    extra += 1
+            change += SAME_DAY_WEIGHT * extra
+        return change
+
+    def move(self, node: int, target: Cell):
+        current = self.cells[node]
+        if current is not None:
+            self.used[current] -= 1
+            if not self.used[current]:
+                del self.used[current]
+        self.used[target] += 1
+        if current is None or current[0] != target[0]:
+            for reg_no in self.students[node]:
+                if current is not None:
+                    self.day_load[(reg_no, current[0])] -= 1
+                self.day_load[(reg_no, target[0])] += 1
+        self.cells[node] = target
+
+    def cost(self) -> Dict:
+        conflicts = sum(self.conflicts_at(node, cell) for node, cell in enumerate(self.cells)) // 2
+        unassigned = sum(cell is None for cell in self.cells)
+        same_day = sum(count - 1 for count in self.day_load.values() if count > 1)
+        return {
+            'cost': (CONFLICT_WEIGHT * conflicts + UNASSIGNED_WEIGHT * unassigned
+                     + CELL_WEIGHT * len(self.used) + SAME_DAY_WEIGHT * same_day),
+            'conflicts': conflicts,
+            'unassigned': unassigned,
+            'cells_used': len(self.used),
+            'same_day_extra': same_day,
+        }
+
+
+def dsatur(domains: Sequence[List[Cell]], students: Sequence[Set[str]], adjacency: List[Set[int]],
+           overlap: List[Set[int]]) -> List[Optional[Cell]]:
+    """
+    Colour batches most-constrained first: the batch with the fewest cells still free of its
+    coloured neighbours (ties: most neighbours) takes its cheapest free cell
+    Batches left with no free cell stay None
+    """
+    state = _Assignment(students, adjacency, overlap, [None] * len(domains))
+    domain_sets = [set(domain) for domain in domains]
+    blocked = [Counter() for _ in domains]
+    free = [len(domain) for domain in domains]
+
+    heap = [(free[node], -len(adjacency[node]), node) for node in range(len(domains)) if domains[node]]
+    heapq.heapify(heap)
+    done = set()
+
+    while heap:
+        remaining, _, node = heapq.heappop(heap)
+        if node in done or remaining != free[node]:
+            continue  # stale entry
+        done.add(node)
+
+        options = [cell for cell in domains[node] if not blocked[node][cell]]
+        if not options:
+            continue
+        # Same weights as the annealer, so the start point already favours shared cells;
+        # unblocked cells have no conflicts by construction
+        cell = min(options, key=lambda option: state.delta(node, option, conflicts=False))
+        state.move(node, cell)
+
+        day, slot = cell
+        for other in adjacency[node]:
+            if other in done:
+                continue
+            for neighbour_slot in overlap[slot]:
+                target = (day, neighbour_slot)
+                if target in domain_sets[other]:
+                    blocked[other][target] += 1
+                    if blocked[other][target] == 1:
+                        free[other] -= 1
+            heapq.heappush(heap, (free[other], -len(adjacency[other]), other))
+
+    return state.cells
+
+
+def anneal(start: List[Optional[Cell]], domains: Sequence[List[Cell]], students: Sequence[Set[str]],
+           adjacency: List[Set[int]], overlap: List[Set[int]], time_budget: float, seed: int,
+           max_iterations: Optional[int] = None) -> Tuple[List[Optional[Cell]], int]:
+    """
+    Simulated annealing over single-batch moves; returns the best assignment seen and the
+    number of iterations run
+    The run ends after `time_budget` seconds, or after exactly `max_iterations` iterations when
+    that is set (the time budget is then ignored), which makes a run reproducible for a given seed
+    """
+    rng = random.Random(seed)
+    state = _Assignment(students, adjacency, overlap, start)
+    movable = [node for node, domain in enumerate(domains) if len(domain) > 1 or start[node] is None and domain]
+    if not movable:
+        return list(start), 0
+
+    current = state.cost()['cost']
+    best, best_cells = current, list(state.cells)
+    hot, cold = 2.0 * CELL_WEIGHT, 0.05
+    began = time.perf_counter()
+    iterations = 0
+
+    while max_iterations is None or iterations < max_iterations:
+        if iterations % 256 == 0:
+            if max_iterations is None:
+                elapsed = time.perf_counter() - began
+                if elapsed >= time_budget:
+                    break
+                fraction = elapsed / time_budget
+            else:
+                fraction = iterations / max_iterations
+            temperature = hot * (cold / hot) ** fraction
+        iterations += 1
+
+        node = rng.choice(movable)
+        target = rng.choice(domains[node])
+        change = state.delta(node, target)
+        if change <= 0 or rng.random() < math.exp(-change / temperature):
+            state.move(node, target)
+            current += change
+            if current < best:
+                best, best_cells = current, list(state.cells)
+
+    return best_cells, iterations
+
+
+def optimize(domains: Sequence[List[Cell]], students: Sequence[Set[str]], labs: Sequence[str],
+             neighbours: Sequence[Sequence[int]], method: str = "anneal",
+             time_budget: float = DEFAULT_TIME_BUDGET, seed: int = 0,
+             max_iterations: Optional[int] = None) -> Tuple[List[Optional[Cell]], Dict]:
+    """
+    Pick a cell for every batch
+    `domains[i]` lists the cells batch i may use, `students[i]` its reg_nos, `labs[i]` its lab
+    and `neighbours[slot]` the slot indexes overlapping that slot. Returns the cells (None where
+    no cell could be found) and a summary of the objective before and after refinement.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown optimizer '{method}'; expected one of {', '.join(METHODS)}")
+
+    overlap = [set(slots) for slots in neighbours]
+    adjacency = conflict_graph(students, labs)
+
+    cells = dsatur(domains, students, adjacency, overlap)
+    initial = _Assignment(students, adjacency, overlap, cells).cost()
+    iterations = 0
+    if method == "anneal":
+        cells, iterations = anneal(cells, domains, students, adjacency, overlap, time_budget, seed, max_iterations)
+
+    final = _Assignment(students, adjacency, overlap, cells).cost()
+    return cells, {
+        'method': method,
+        'seed': seed,
+        'iterations': iterations,
+        'edges': sum(len(neighbours) for neighbours in adjacency) // 2,
+        'initial': initial,
+        'final': final,
+    }
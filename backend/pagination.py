@@ -0,0 +1,79 @@
+"""
+Keyset pagination and field projection for list endpoints
+Pages are cut with a WHERE on the sort key instead of OFFSET, so a deep page costs the same as
+the first. The cursor handed back is the last row's sort key, JSON in URL-safe base64.
+"""
+
+import json
+import base64
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MAX_LIMIT = 1000
+MAX_SCHEDULE_LIMIT = 500  # schedule pages carry every batch's roster
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List:
+    """The sort key in a cursor token; ValueError if it is not one of ours"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    # Sort keys are scalars; anything else would only fail later, inside the query
+    if not all(value is None or isinstance(value, (str, int, float)) and not isinstance(value, bool)
+               for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_clause(columns: Sequence[str], cursor: Optional[str]) -> Tuple[str, List]:
+    """' AND (a, b) > (?, ?)' for rows after the cursor, or nothing for the first page"""
+    if not cursor:
+        return "", []
+    values = decode_cursor(cursor, len(columns))
+    placeholders = ", ".join("?" * len(columns))
+    return f" AND ({', '.join(columns)}) > ({placeholders})", values
+
+
+def prefix_range(column: str, prefix: str, dialect: str = "sqlite") -> Tuple[str, List]:
+    """
+    ' AND column >= ? AND column < ?' matching values that start with `prefix`
+    A range rather than LIKE, so the column's index is used (SQLite's LIKE is case-insensitive
+    and skips ordinary indexes). On PostgreSQL a range is only right under the C collation,
+    so it is a LIKE there, served by the text_pattern_ops indexes of migration 7
+    """
+    if dialect == "postgresql":
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f" AND {column} LIKE ? ESCAPE '\\'", [escaped + "%"]
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return f" AND {column} >= ? AND {column} < ?", [prefix, upper]
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """Requested fields from a comma-separated list (None: all of them); ValueError on unknown names"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}; expected any of {', '.join(allowed)}")
+    return names
+
+
+def project(rows: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    if fields is None:
+        return rows
+    return [{name: row[name] for name in fields} for row in rows]
+
+
+def page_envelope(items: List[Dict], next_key: Optional[Sequence], total: Optional[int] = None) -> Dict:
+    envelope = {"items": items, "next_cursor": encode_cursor(next_key) if next_key is not None else None}
+    if total is not None:
+        envelope["total"] = total
+    return envelope
@@ -0,0 +1,152 @@
+"""
+PDF export rendering
+Kept free of app and database imports so it can run in render worker processes
+
+The schedule is laid out as one table per date and time slot, with the header row repeated
+on every page the table spans and the full roster of every batch. Each date starts a new page,
+so a run of dates can be rendered on its own and the parts concatenated with pypdf (optional)
+into the same document a single pass would produce.
+"""
+
+import io
+import os
+from itertools import groupby
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import simpleSplit
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # parallel rendering is skipped without it
+    PdfWriter = None
+
+# Exports with fewer rows than this are rendered in one process
+PARALLEL_MIN_ROWS = int(os.getenv("PDF_PARALLEL_MIN_ROWS", "300"))
+
+# Built once per process and shared by every export
+STYLES = getSampleStyleSheet()
+SECTION_STYLE = ParagraphStyle('Section', parent=STYLES['Heading3'], spaceBefore=12, spaceAfter=6, keepWithNext=1)
+CELL_FONT, CELL_FONT_SIZE = 'Helvetica', 8
+CELL_PADDING = 12  # left and right padding of a table cell, with a little slack
+MAX_CELL_LINES = 30  # well under a landscape A4 frame at this font size
+TABLE_CHUNK_ROWS = 100
+HEADER = ['Subject', 'Lab', 'Branch/Sem', 'Students', 'Total']
+COLUMN_WIDTHS = [140, 45, 65, 400, 40]
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+
+def group_sections(rows: List[dict]) -> List[Dict]:
+    """Consecutive export rows (ordered by date and slot) as one section per date and time slot"""
+    return [
+        {'date': date, 'time_slot': time_slot, 'rows': list(section_rows)}
+        for (date, time_slot), section_rows in groupby(rows, key=lambda row: (row['date'], row['time_slot']))
+    ]
+
+
+def _lines(text: str, column: int) -> List[str]:
+    """
+    Break a cell into lines that fit its column
+    Plain multi-line strings lay out far faster than a Paragraph per cell
+    """
+    return simpleSplit(text, CELL_FONT, CELL_FONT_SIZE, COLUMN_WIDTHS[column] - CELL_PADDING)
+
+
+def _section_tables(section: Dict) -> List[Table]:
+    """
+    The section's rows as consecutive tables of at most TABLE_CHUNK_ROWS rows each
+    ReportLab re-measures the unplaced rest of a table at every page break, so one table of
+    thousands of rows renders in quadratic time
+    """
+    data = []
+    for row in section['rows']:
+        # A long roster continues over extra rows, since a single row cannot break across pages
+        roster = _lines(row['students'] or '', 3) or ['']
+        for start in range(0, len(roster), MAX_CELL_LINES):
+            students = "\n".join(roster[start:start + MAX_CELL_LINES])
+            if start:
+                data.append(['', '', '', students, ''])
+                continue
+            data.append([
+                "\n".join(_lines(f"{row['subject_code']} {row['subject_name']}", 0)),
+                row['lab_no'],
+                f"{row['branch']}-{row['semester']}" if row['branch'] else '',
+                students,
+                str(row['total_students']),
+            ])
+    return [
+        Table([HEADER] + data[start:start + TABLE_CHUNK_ROWS], colWidths=COLUMN_WIDTHS,
+              style=TABLE_STYLE, repeatRows=1)
+        for start in range(0, len(data), TABLE_CHUNK_ROWS)
+    ]
+
+
+def render_sections(sections: List[Dict], title: bool = True) -> bytes:
+    """Render sections into a PDF; `title` is only wanted on the document's first part"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4))
+    elements = []
+
+    if title:
+        elements.append(Paragraph("<b>Lab Exam Schedule</b>", STYLES['Title']))
+        elements.append(Spacer(1, 20))
+    if not sections:
+        elements.append(Paragraph("No schedules found", STYLES['BodyText']))
+
+    for index, section in enumerate(sections):
+        if index and section['date'] != sections[index - 1]['date']:
+            elements.append(PageBreak())
+        elements.append(Paragraph(f"{escape(section['date'])} &nbsp; {escape(section['time_slot'])}", SECTION_STYLE))
+        elements.extend(_section_tables(section))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def plan_parts(rows: List[dict], workers: int) -> List[List[Dict]]:
+    """
+    Sections split into up to `workers` runs of whole dates with similar amounts of text, to be
+    rendered separately and merged; a single part when the export is small or pypdf is missing
+    """
+    sections = group_sections(rows)
+    if PdfWriter is None or workers <= 1 or len(rows) < PARALLEL_MIN_ROWS:
+        return [sections]
+
+    days = [list(day) for _, day in groupby(sections, key=lambda section: section['date'])]
+    weight = lambda day: sum(len(row['students'] or '') + 100 for section in day for row in section['rows'])
+    target = sum(weight(day) for day in days) / min(workers, len(days))
+
+    parts, current, filled = [], [], 0
+    for day in days:
+        if current and filled >= target and len(parts) < workers - 1:
+            parts.append(current)
+            current, filled = [], 0
+        current.extend(day)
+        filled += weight(day)
+    parts.append(current)
+    return parts
+
+
+def merge_pdfs(parts: List[bytes]) -> bytes:
+    """Concatenate separately rendered parts into one document"""
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(io.BytesIO(part)))
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
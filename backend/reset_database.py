@@ -3,7 +3,8 @@ Reset Database Script
 Run this to completely clear your database and start fresh
 """
 
-from database import get_db_connection
+from database import get_db_connection, reset_ids
+from versions import TABLES, bump_versions
 
 def reset_database():
     print("🗑️  Resetting database to clean state...")
@@ -26,9 +27,12 @@ def reset_database():
             cursor.execute("DELETE FROM students")
             
             # Reset autoincrement counters
-            cursor.execute("DELETE FROM sqlite_sequence WHERE name='exams'")
-            cursor.execute("DELETE FROM sqlite_sequence WHERE name='schedules'")
-            cursor.execute("DELETE FROM sqlite_sequence WHERE name='schedule_students'")
+            reset_ids(cursor, "exams", "exam_id")
+            reset_ids(cursor, "schedules", "schedule_id")
+            reset_ids(cursor, "schedule_students", "id")
+            
+            # Let caches keyed on the old data go
+            bump_versions(cursor, *TABLES)
             
             # Commit the changes
             conn.commit()
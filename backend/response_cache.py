@@ -0,0 +1,191 @@
+"""
+Response cache
+Read-through cache for the list endpoints the frontend polls. Entries are keyed on the endpoint,
+its parameters and the data versions of the tables it reads (versions.py), so a committed write
+to a table retires every cached response built from it, in every server process. TTL and an
+LRU bound only limit how long and how many entries are kept.
+The key doubles as the response ETag for conditional GETs.
+
+Backends: in-process (default) or a Redis-compatible server when RESPONSE_CACHE_REDIS_URL is
+set and the `redis` package is installed.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from database import get_db_connection
+from versions import read_versions, version_key, etag_matches
+
+try:
+    import orjson
+except ImportError:  # bodies are encoded with the standard library instead
+    orjson = None
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "128"))  # 0 disables the cache
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")
+
+logger = logging.getLogger(__name__)
+
+
+def render_json(content) -> bytes:
+    """Compact JSON body bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+class MemoryBackend:
+    """Entries in an OrderedDict, least recently used first"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, body)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, body: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Entries as expiring Redis strings; eviction beyond the TTL is left to the server's maxmemory-policy"""
+
+    name = "redis"
+    prefix = "lab_scheduler:response:"
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, body: bytes, ttl: float):
+        self.client.set(self.prefix + key, body, px=int(ttl * 1000))
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(self.prefix + "*"))
+
+
+def make_backend():
+    if RESPONSE_CACHE_REDIS_URL:
+        try:
+            return RedisBackend(RESPONSE_CACHE_REDIS_URL)
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_REDIS_URL is set but the redis package is missing; using the in-process cache")
+    return MemoryBackend()
+
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl: float = RESPONSE_CACHE_TTL,
+                 enabled: bool = RESPONSE_CACHE_MAX_ENTRIES > 0):
+        self.backend = backend or make_backend()
+        self.ttl = ttl
+        self.enabled = enabled
+        self._counts = {}  # endpoint -> {'hits', 'misses', 'not_modified'}
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(name, {'hits': 0, 'misses': 0, 'not_modified': 0})
+            counts[outcome] += 1
+
+    def _count_error(self):
+        with self._lock:
+            self._errors += 1
+
+    def respond(self, name: str, tables: Tuple[str, ...], load: Callable, if_none_match: Optional[str] = None,
+                variant: str = "json", render: Callable = render_json, **params) -> Tuple[Optional[bytes], str]:
+        """
+        (body, etag) for the endpoint `name`; body is None when `if_none_match` already names the etag
+        `load(**params)` builds the content on a miss and `render` turns it into the body; blocking,
+        so run it on the DB pool. Each `variant` (media type, content coding) is cached separately.
+        """
+        with get_db_connection() as conn:
+            versions = read_versions(conn, *tables)
+        key = version_key(f"{name}:{variant}", versions, **params)
+        etag = f'"{key}"'
+
+        if etag_matches(if_none_match, etag):
+            self._count(name, 'not_modified')
+            return None, etag
+
+        body = None
+        if self.enabled:
+            try:
+                body = self.backend.get(key)
+            except Exception:
+                self._count_error()
+                logger.exception("Response cache read failed")
+        if body is not None:
+            self._count(name, 'hits')
+            return body, etag
+
+        self._count(name, 'misses')
+        body = render(load(**params))
+        if self.enabled:
+            try:
+                self.backend.set(key, body, self.ttl)
+            except Exception:
+                self._count_error()
+                logger.exception("Response cache write failed")
+        return body, etag
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._counts.items()}
+        hits = sum(counts['hits'] + counts['not_modified'] for counts in endpoints.values())
+        lookups = hits + sum(counts['misses'] for counts in endpoints.values())
+        try:
+            entries = self.backend.size()
+        except Exception:
+            entries = None
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "ttl": self.ttl,
+            "entries": entries,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "errors": self._errors,
+            "endpoints": endpoints,
+        }
+
+
+response_cache = ResponseCache()
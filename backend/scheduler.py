@@ -1,127 +1,580 @@
 from datetime import datetime
-from typing import List, Dict
-from database import get_db_connection
+from typing import List, Dict, Callable, Optional, Tuple
+from database import get_db_connection, begin_write, ordered_join, reserve_ids
+from occupancy import occupancy
+from versions import bump_versions
+from timeslots import WHOLE_DAY, parse_time_slot, format_time_slot, slot_interval
+from batching import load_labs, lab_capacity, split_groups
 
-def generate_schedules(exam_id: int, date: str, time_slots: List[Dict], max_students_per_batch: int):
+IN_CHUNK = 500  # values per IN (...) list, below SQLite's parameter limit
+
+def generate_schedules(exam_id: int, date: str, time_slots: List[Dict], max_students_per_batch: int,
+                       progress: Optional[Callable[[float, str], None]] = None):
     """
     Generate schedules for an exam on a specific date
     Groups students by branch/semester and creates batches
+    `progress(fraction, message)` is called between stages; it may raise to abort before commit
     """
+    if progress is None:
+        progress = lambda fraction, message: None
+    
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Get all students grouped by branch and semester
-        cursor.execute("""
-            SELECT reg_no, name, branch, semester 
-            FROM students 
-            ORDER BY branch, semester, reg_no
-        """)
-        students = cursor.fetchall()
+        # Hold the write lock from the collision check until the schedules are written
+        begin_write(conn)
         
-        if not students:
+        snapshot = load_plan_snapshot(conn, exam_id, date)
+        if not snapshot['student_count']:
             return {"error": "No students found"}
         
-        # Group students by branch-semester
-        groups = {}
-        for student in students:
-            key = f"{student['branch']}-{student['semester']}"
-            if key not in groups:
-                groups[key] = []
-            groups[key].append(dict(student))
+        progress(0.2, f"Loaded {snapshot['student_count']} students")
+        progress(0.4, f"Found {len(snapshot['already_taking'])} students already scheduled for this exam")
         
-        # Check for collision - students already scheduled at this date
-        cursor.execute("""
-            SELECT DISTINCT ss.reg_no
-            FROM schedule_students ss
-            JOIN schedules s ON ss.schedule_id = s.schedule_id
-            WHERE s.date = ?
-        """, (date,))
+        plan = plan_schedules(snapshot, time_slots, max_students_per_batch)
+        schedules = plan['schedules']
         
-        scheduled_students = {row['reg_no'] for row in cursor.fetchall()}
+        progress(0.7, f"Writing {len(schedules)} schedules")
         
-        # Create batches from groups
-        batches = []
-        batch_number = 1
+        # Write every schedule and its students with set-based inserts
+        schedule_ids = write_schedules(conn, plan_rows(plan))
+        for schedule_id, schedule in zip(schedule_ids, schedules):
+            schedule['schedule_id'] = schedule_id
         
-        for group_key, group_students in groups.items():
-            # Filter out already scheduled students
-            available_students = [s for s in group_students if s['reg_no'] not in scheduled_students]
-            
-            # Split into batches
-            for i in range(0, len(available_students), max_students_per_batch):
-                batch = available_students[i:i + max_students_per_batch]
-                batches.append({
-                    'batch_number': batch_number,
-                    'group': group_key,
-                    'students': batch
-                })
-                batch_number += 1
-        
-        # Assign batches to time slots
-        schedules = []
-        slot_index = 0
-        
-        for batch in batches:
-            if slot_index >= len(time_slots):
-                slot_index = 0  # Wrap around to first slot if we run out
-            
-            slot = time_slots[slot_index]
-            time_slot_str = f"{slot['start_time']}–{slot['end_time']}"
-            
-            # Insert schedule
-            cursor.execute("""
-                INSERT INTO schedules (exam_id, date, time_slot, total_students)
-                VALUES (?, ?, ?, ?)
-            """, (exam_id, date, time_slot_str, len(batch['students'])))
-            
-            schedule_id = cursor.lastrowid
-            
-            # Insert students for this schedule
-            for student in batch['students']:
-                cursor.execute("""
-                    INSERT INTO schedule_students (schedule_id, reg_no)
-                    VALUES (?, ?)
-                """, (schedule_id, student['reg_no']))
-            
+        return {
+            'exam_id': exam_id,
+            'date': date,
+            'schedules': schedules,
+            'unscheduled': plan['unscheduled']
+        }
+
+def load_plan_snapshot(conn, exam_id: int, date: str) -> Dict:
+    """
+    Everything plan_schedules needs for one exam and date, read once
+    Plain dicts, lists and sets, so one snapshot serves any number of candidate plans
+    """
+    cursor = conn.cursor()
+    
+    # Get all students grouped by branch and semester
+    cursor.execute("""
+        SELECT reg_no, name, branch, semester 
+        FROM students 
+        ORDER BY branch, semester, reg_no
+    """)
+    students = cursor.fetchall()
+    
+    # Group students by branch-semester
+    groups = {}
+    for student in students:
+        key = f"{student['branch']}-{student['semester']}"
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(dict(student))
+    
+    # Students already holding a schedule for this exam take no further batch
+    cursor.execute("""
+        SELECT DISTINCT ss.reg_no
+        FROM schedule_students ss
+        JOIN schedules s ON ss.schedule_id = s.schedule_id
+        WHERE s.exam_id = ?
+    """, (exam_id,))
+    already_taking = {row['reg_no'] for row in cursor.fetchall()}
+    
+    cursor.execute("SELECT lab_no FROM exams WHERE exam_id = ?", (exam_id,))
+    exam = cursor.fetchone()
+    occupancy.sync(conn)
+    
+    return {
+        'exam_id': exam_id,
+        'date': date,
+        'groups': groups,
+        'student_count': len(students),
+        'already_taking': already_taking,
+        'lab': load_labs(conn).get(exam['lab_no']) if exam else None,
+        # Everyone's booked intervals on this date, from the occupancy index
+        'occupied': occupancy.intervals_on(date, conn)
+    }
+
+def plan_schedules(snapshot: Dict, time_slots: List[Dict], max_students_per_batch: int) -> Dict:
+    """
+    Plan an exam's batches and slots from a snapshot without touching the database
+    Returns the schedules (schedule_id None), the students left unscheduled and plan metrics
+    """
+    # Parse each slot into minutes; unparseable slots block the whole day
+    slot_labels = [format_time_slot(slot['start_time'], slot['end_time']) for slot in time_slots]
+    slot_intervals = [parse_time_slot(label) or WHOLE_DAY for label in slot_labels]
+    
+    # Check for collision - students busy during each slot on this date
+    busy = [
+        {
+            reg_no for reg_no, booked in snapshot['occupied'].items()
+            if any(start < interval[1] and interval[0] < end for start, end in booked)
+        }
+        for interval in slot_intervals
+    ]
+    free_somewhere = lambda reg_no: any(reg_no not in slot_busy for slot_busy in busy)
+    
+    # Batch size comes from the exam's lab seats when configured; labs that allow it
+    # share batches between groups' small remainders
+    lab = snapshot['lab']
+    capacity = lab_capacity(max_students_per_batch, lab)
+    
+    # Filter out students already scheduled; those busy in every slot are reported as
+    # unscheduled up front rather than taking a place in a batch
+    available = {}
+    blocked = []
+    for group_key, group_students in snapshot['groups'].items():
+        available[group_key] = []
+        for s in group_students:
+            if s['reg_no'] in snapshot['already_taking']:
+                continue
+            if free_somewhere(s['reg_no']):
+                available[group_key].append(s)
+            else:
+                blocked.append(s)
+    
+    # Create balanced batches from groups
+    batches = [
+        {'batch_number': number, 'group': group_key, 'students': batch}
+        for number, (group_key, batch) in enumerate(
+            split_groups(available, capacity, merge=bool(lab and lab['allow_mixed'])), start=1)
+    ]
+    
+    # Assign batches to time slots, round-robin, skipping slots where members are busy
+    schedules = []
+    unscheduled = blocked
+    slot_index = 0
+    
+    for batch in batches:
+        rotation = [(slot_index + k) % len(time_slots) for k in range(len(time_slots))]
+        conflicts = {
+            index: [s for s in batch['students'] if s['reg_no'] in busy[index]]
+            for index in rotation
+        }
+        
+        # First slot in rotation where nobody clashes, otherwise the least clashing one
+        chosen = next((index for index in rotation if not conflicts[index]), None)
+        if chosen is None:
+            chosen = min(rotation, key=lambda index: len(conflicts[index]))
+        
+        clashing = {s['reg_no'] for s in conflicts[chosen]}
+        members = [s for s in batch['students'] if s['reg_no'] not in clashing]
+        unscheduled.extend(conflicts[chosen])
+        
+        if members:
             schedules.append({
-                'schedule_id': schedule_id,
+                'schedule_id': None,
                 'batch_number': batch['batch_number'],
-                'time_slot': time_slot_str,
+                'time_slot': slot_labels[chosen],
                 'group': batch['group'],
-                'total_students': len(batch['students']),
-                'students': batch['students']
+                'total_students': len(members),
+                'students': members
             })
-            
-            slot_index += 1
         
-        conn.commit()
+        slot_index = chosen + 1
+    
+    plan = {
+        'exam_id': snapshot['exam_id'],
+        'date': snapshot['date'],
+        'schedules': schedules,
+        'unscheduled': unscheduled
+    }
+    plan['metrics'] = plan_metrics(plan, capacity)
+    return plan
+
+def plan_metrics(plan: Dict, capacity: int) -> Dict:
+    """Headline numbers for comparing plans"""
+    sizes = [schedule['total_students'] for schedule in plan['schedules']]
+    per_slot = {}
+    for schedule in plan['schedules']:
+        per_slot[schedule['time_slot']] = per_slot.get(schedule['time_slot'], 0) + schedule['total_students']
+    return {
+        'batches': len(sizes),
+        'students_scheduled': sum(sizes),
+        'students_unscheduled': len(plan['unscheduled']),
+        'slots_used': len(per_slot),
+        'max_slot_load': max(per_slot.values(), default=0),
+        'smallest_batch': min(sizes, default=0),
+        'largest_batch': max(sizes, default=0),
+        'utilisation': round(sum(sizes) / (len(sizes) * capacity), 4) if sizes else 0.0,
+    }
+
+def plan_rows(plan: Dict) -> List[Tuple]:
+    """write_schedules rows for a plan's schedules"""
+    return [
+        (plan['exam_id'], plan['date'], schedule['time_slot'],
+         parse_time_slot(schedule['time_slot']) or WHOLE_DAY,
+         [s['reg_no'] for s in schedule['students']])
+        for schedule in plan['schedules']
+    ]
+
+def commit_plan(plan: Dict) -> Dict:
+    """
+    Persist a plan from plan_schedules in one transaction, after checking it against the
+    current data; nothing is written if any student is gone, already has this exam, appears
+    twice, or now clashes with another schedule
+    """
+    exam_id, date = plan['exam_id'], plan['date']
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        begin_write(cursor)
+        occupancy.sync(conn)
+        
+        cursor.execute("SELECT 1 FROM exams WHERE exam_id = ?", (exam_id,))
+        if not cursor.fetchone():
+            return {"error": "Exam not found"}
+        
+        reg_nos = list(dict.fromkeys(s['reg_no'] for schedule in plan['schedules'] for s in schedule['students']))
+        existing = {student['reg_no'] for student in select_students(cursor, reg_nos)}
+        cursor.execute("""
+            SELECT DISTINCT ss.reg_no
+            FROM schedule_students ss
+            JOIN schedules s ON ss.schedule_id = s.schedule_id
+            WHERE s.exam_id = ?
+        """, (exam_id,))
+        already_taking = {row['reg_no'] for row in cursor.fetchall()}
+        
+        conflicts = []
+        seen = set()
+        for schedule in plan['schedules']:
+            interval = parse_time_slot(schedule['time_slot']) or WHOLE_DAY
+            for student in schedule['students']:
+                reg_no = student['reg_no']
+                if reg_no not in existing:
+                    reason = "Student not found"
+                elif reg_no in seen:
+                    reason = "Student appears in more than one batch"
+                elif reg_no in already_taking:
+                    reason = "Student already scheduled for this exam"
+                elif occupancy.overlaps(reg_no, date, interval, conn=conn):
+                    reason = "Student has another schedule in this slot"
+                else:
+                    reason = None
+                seen.add(reg_no)
+                if reason:
+                    conflicts.append({'reg_no': reg_no, 'time_slot': schedule['time_slot'], 'reason': reason})
+        
+        if conflicts:
+            conn.rollback()
+            return {"error": "Plan no longer fits the current schedules", "conflicts": conflicts}
+        
+        schedules = [dict(schedule) for schedule in plan['schedules']]
+        schedule_ids = write_schedules(conn, plan_rows(plan))
+        for schedule_id, schedule in zip(schedule_ids, schedules):
+            schedule['schedule_id'] = schedule_id
         
         return {
             'exam_id': exam_id,
             'date': date,
-            'schedules': schedules
+            'schedules': schedules,
+            'unscheduled': plan.get('unscheduled', [])
         }
 
-def check_collision(reg_no: str, date: str, exclude_schedule_id: int = None) -> bool:
+def reschedule(exam_id: int, date: str, max_students_per_batch: int, time_slots: List[Dict] = None,
+               reg_nos: List[str] = None, add: List[str] = None, remove: List[str] = None,
+               dry_run: bool = False):
     """
-    Check if a student is already scheduled on a particular date
+    Bring an exam's schedules on a date in line with its roster, moving nobody already placed
+    Pass the changes as `add`/`remove`, or a full roster as `reg_nos` (every student when all
+    three are omitted) to have the diff computed. Students leaving drop out of their batch
+    (emptied batches are deleted); new students join a batch of their group with a free seat
+    and no clash, and only the rest get new batches in `time_slots` (the date's existing slots
+    by default). The diff is applied in one transaction; `dry_run` only returns it.
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        begin_write(cursor)
+        occupancy.sync(conn)
         
-        query = """
-            SELECT COUNT(*) as count
-            FROM schedule_students ss
-            JOIN schedules s ON ss.schedule_id = s.schedule_id
-            WHERE ss.reg_no = ? AND s.date = ?
-        """
-        params = [reg_no, date]
+        cursor.execute("SELECT lab_no FROM exams WHERE exam_id = ?", (exam_id,))
+        exam = cursor.fetchone()
+        if not exam:
+            return {"error": "Exam not found"}
+        lab = load_labs(conn).get(exam['lab_no'])
+        capacity = lab_capacity(max_students_per_batch, lab)
+        mixed = bool(lab and lab['allow_mixed'])
+        
+        # Current batches for this exam and date; total_students is their member count
+        cursor.execute("""
+            SELECT schedule_id, time_slot, start_minute, end_minute, total_students
+            FROM schedules
+            WHERE exam_id = ? AND date = ?
+            ORDER BY schedule_id
+        """, (exam_id, date))
+        batches = {
+            row['schedule_id']: {
+                'schedule_id': row['schedule_id'],
+                'time_slot': row['time_slot'],
+                'interval': slot_interval(row['start_minute'], row['end_minute']),
+                'count': row['total_students'],
+                'group': None  # set below when the batch holds a single arriving group
+            }
+            for row in cursor.fetchall()
+        }
+        
+        if add is not None or remove is not None:
+            # Explicit changes: only the named students are read (ordered_join keeps SQLite
+            # driving the lookup from their reg_nos rather than the whole date)
+            removed = []
+            for chunk in chunks(list(dict.fromkeys(remove or []))):
+                cursor.execute("""
+                    SELECT ss.reg_no, ss.schedule_id
+                    FROM schedule_students ss
+                    {join} schedules s ON ss.schedule_id = s.schedule_id
+                    WHERE s.exam_id = ? AND s.date = ? AND ss.reg_no IN ({placeholders})
+                """.format(join=ordered_join(cursor), placeholders=",".join("?" * len(chunk))),
+                    [exam_id, date, *chunk])
+                removed.extend({'reg_no': row['reg_no'], 'schedule_id': row['schedule_id']} for row in cursor.fetchall())
+            
+            wanted = list(dict.fromkeys(add or []))
+            arrivals = select_students(cursor, wanted)
+            taking = set()
+            for chunk in chunks(wanted):
+                cursor.execute("""
+                    SELECT DISTINCT ss.reg_no
+                    FROM schedule_students ss
+                    JOIN schedules s ON ss.schedule_id = s.schedule_id
+                    WHERE s.exam_id = ? AND ss.reg_no IN ({placeholders})
+                """.format(placeholders=",".join("?" * len(chunk))), [exam_id, *chunk])
+                taking.update(row['reg_no'] for row in cursor.fetchall())
+            found = {student['reg_no'] for student in arrivals}
+            unknown = [reg_no for reg_no in wanted if reg_no not in found]
+            arrivals = [student for student in arrivals if student['reg_no'] not in taking]
+        elif reg_nos is None:
+            # Diff against the students table in SQL, so a small change never reads the whole roster
+            cursor.execute("""
+                SELECT ss.reg_no, ss.schedule_id
+                FROM schedule_students ss
+                JOIN schedules s ON ss.schedule_id = s.schedule_id
+                WHERE s.exam_id = ? AND s.date = ?
+                  AND NOT EXISTS (SELECT 1 FROM students st WHERE st.reg_no = ss.reg_no)
+            """, (exam_id, date))
+            removed = [{'reg_no': row['reg_no'], 'schedule_id': row['schedule_id']} for row in cursor.fetchall()]
+            
+            cursor.execute("""
+                SELECT reg_no, name, branch, semester
+                FROM students
+                WHERE reg_no IN (
+                    SELECT reg_no FROM students
+                    EXCEPT
+                    SELECT ss.reg_no
+                    FROM schedule_students ss
+                    JOIN schedules s ON ss.schedule_id = s.schedule_id
+                    WHERE s.exam_id = ?
+                )
+            """, (exam_id,))
+            arrivals = [dict(row) for row in cursor.fetchall()]
+            unknown = []
+        else:
+            wanted = list(dict.fromkeys(reg_nos))
+            roster = {student['reg_no']: student for student in select_students(cursor, wanted)}
+            unknown = [reg_no for reg_no in wanted if reg_no not in roster]
+            
+            # Students taking this exam on any date, and where they sit on this one
+            cursor.execute("""
+                SELECT ss.reg_no, ss.schedule_id, s.date
+                FROM schedule_students ss
+                JOIN schedules s ON ss.schedule_id = s.schedule_id
+                WHERE s.exam_id = ?
+            """, (exam_id,))
+            taking = set()
+            removed = []
+            for row in cursor.fetchall():
+                taking.add(row['reg_no'])
+                if row['date'] == date and row['reg_no'] not in roster:
+                    removed.append({'reg_no': row['reg_no'], 'schedule_id': row['schedule_id']})
+            arrivals = [student for reg_no, student in roster.items() if reg_no not in taking]
+        
+        for change in removed:
+            batches[change['schedule_id']]['count'] -= 1
+        arrivals.sort(key=lambda s: (s['branch'], s['semester'], s['reg_no']))
+        
+        if arrivals and not mixed:
+            # Batches made up of one arriving group, found through that group's students so
+            # only their rows are read
+            for branch, semester in {(s['branch'], s['semester']) for s in arrivals}:
+                cursor.execute("""
+                    SELECT DISTINCT ss.schedule_id
+                    FROM students st
+                    JOIN schedule_students ss ON ss.reg_no = st.reg_no
+                    JOIN schedules s ON s.schedule_id = ss.schedule_id
+                    WHERE st.branch = ? AND st.semester = ? AND s.exam_id = ? AND s.date = ?
+                """, (branch, semester, exam_id, date))
+                holding = [row['schedule_id'] for row in cursor.fetchall()]
+                if not holding:
+                    continue
+                cursor.execute(f"""
+                    SELECT DISTINCT ss.schedule_id
+                    FROM schedule_students ss
+                    JOIN students st ON st.reg_no = ss.reg_no
+                    WHERE ss.schedule_id IN ({",".join("?" * len(holding))})
+                      AND (st.branch != ? OR st.semester != ?)
+                """, (*holding, branch, semester))
+                shared = {row['schedule_id'] for row in cursor.fetchall()}
+                for schedule_id in holding:
+                    if schedule_id not in shared:
+                        batches[schedule_id]['group'] = f"{branch}-{semester}"
+        
+        # Fill free seats first: a batch of the student's group (any batch in mixed labs),
+        # the emptiest one, and only where the student has no clash
+        added = []
+        leftover = {}
+        for student in arrivals:
+            group_key = f"{student['branch']}-{student['semester']}"
+            candidates = [
+                batch for batch in batches.values()
+                if 0 < batch['count'] < capacity
+                and (mixed or batch['group'] == group_key)
+                and not occupancy.overlaps(student['reg_no'], date, batch['interval'], conn=conn)
+            ]
+            if candidates:
+                batch = min(candidates, key=lambda b: (b['count'], b['schedule_id']))
+                batch['count'] += 1
+                added.append({'reg_no': student['reg_no'], 'schedule_id': batch['schedule_id']})
+            else:
+                leftover.setdefault(group_key, []).append(student)
+        
+        # Everyone else gets new batches, each in its least clashing slot
+        if time_slots:
+            slot_labels = [format_time_slot(slot['start_time'], slot['end_time']) for slot in time_slots]
+            slots = [(label, parse_time_slot(label) or WHOLE_DAY) for label in slot_labels]
+        else:
+            slots = list(dict.fromkeys((batch['time_slot'], batch['interval']) for batch in batches.values()))
         
-        if exclude_schedule_id:
-            query += " AND s.schedule_id != ?"
-            params.append(exclude_schedule_id)
+        new_schedules = []
+        unscheduled = []
+        if leftover and not slots:
+            unscheduled = [s for group in leftover.values() for s in group]
+        elif leftover:
+            busy = [occupancy.busy_during(date, interval, conn) for _, interval in slots]
+            for group_key, students in split_groups(leftover, capacity, merge=mixed):
+                chosen = min(range(len(slots)), key=lambda index: sum(s['reg_no'] in busy[index] for s in students))
+                members = [s for s in students if s['reg_no'] not in busy[chosen]]
+                unscheduled.extend(s for s in students if s['reg_no'] in busy[chosen])
+                if members:
+                    new_schedules.append({
+                        'schedule_id': None,
+                        'time_slot': slots[chosen][0],
+                        'interval': slots[chosen][1],
+                        'group': group_key,
+                        'total_students': len(members),
+                        'students': members
+                    })
         
-        cursor.execute(query, params)
-        result = cursor.fetchone()
+        emptied = [batch['schedule_id'] for batch in batches.values() if batch['count'] <= 0]
+        result = {
+            'exam_id': exam_id,
+            'date': date,
+            'removed': removed,
+            'added': added,
+            'new_schedules': new_schedules,
+            'deleted_schedules': emptied,
+            'unscheduled': unscheduled,
+            'unknown': unknown,
+            'dry_run': dry_run
+        }
+        if dry_run:
+            conn.rollback()
+            for schedule in new_schedules:
+                del schedule['interval']
+            return result
         
-        return result['count'] > 0
+        cursor.executemany("DELETE FROM schedule_students WHERE schedule_id = ? AND reg_no = ?",
+                           [(c['schedule_id'], c['reg_no']) for c in removed])
+        cursor.executemany("INSERT INTO schedule_students (schedule_id, reg_no) VALUES (?, ?)",
+                           [(c['schedule_id'], c['reg_no']) for c in added])
+        touched = {c['schedule_id'] for c in removed + added} - set(emptied)
+        cursor.executemany("UPDATE schedules SET total_students = ? WHERE schedule_id = ?",
+                           [(batches[schedule_id]['count'], schedule_id) for schedule_id in touched])
+        cursor.executemany("DELETE FROM schedules WHERE schedule_id = ?", [(schedule_id,) for schedule_id in emptied])
+        
+        rows = [
+            (exam_id, date, schedule['time_slot'], schedule['interval'], [s['reg_no'] for s in schedule['students']])
+            for schedule in new_schedules
+        ]
+        schedule_ids = insert_schedules(cursor, rows)
+        bump_versions(cursor, "schedules")
+        
+        with occupancy.committing(conn):
+            for change in removed:
+                occupancy.remove_student(change['reg_no'], change['schedule_id'])
+            for change in added:
+                batch = batches[change['schedule_id']]
+                occupancy.add_student(change['reg_no'], batch['schedule_id'], date, batch['interval'])
+            for schedule_id in emptied:
+                occupancy.remove_schedule(schedule_id)
+            for schedule_id, row in zip(schedule_ids, rows):
+                occupancy.add_schedule(schedule_id, date, row[3], row[4])
+        
+        for schedule_id, schedule in zip(schedule_ids, new_schedules):
+            schedule['schedule_id'] = schedule_id
+            del schedule['interval']
+        return result
+
+def chunks(items: List, size: int = IN_CHUNK) -> List[List]:
+    """`items` in lists of at most `size`; none at all for an empty list, which IN () would need"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def select_students(cursor, reg_nos: List[str]) -> List[Dict]:
+    """Student rows for the given reg_nos, queried in chunks below SQLite's parameter limit"""
+    students = []
+    for chunk in chunks(reg_nos):
+        cursor.execute(f"""
+            SELECT reg_no, name, branch, semester FROM students
+            WHERE reg_no IN ({",".join("?" * len(chunk))})
+        """, chunk)
+        students.extend(dict(row) for row in cursor.fetchall())
+    return students
+
+def write_schedules(conn, rows: List[Tuple]) -> List[int]:
+    """
+    Bulk-insert schedules and their students, then commit and update the occupancy index
+    Each row is (exam_id, date, time_slot, (start_minute, end_minute), reg_nos)
+    Must run inside a write transaction (begin_write); returns the new schedule ids in order
+    """
+    schedule_ids = insert_schedules(conn.cursor(), rows)
+    bump_versions(conn, "schedules")
+    
+    with occupancy.committing(conn):
+        for schedule_id, (exam_id, date, time_slot, interval, reg_nos) in zip(schedule_ids, rows):
+            occupancy.add_schedule(schedule_id, date, interval, reg_nos)
+    
+    return schedule_ids
+
+def insert_schedules(cursor, rows: List[Tuple]) -> List[int]:
+    """Insert schedule rows (see write_schedules) without committing; returns the new ids"""
+    schedule_ids = list(allocate_schedule_ids(cursor, len(rows)))
+    
+    schedule_rows = []
+    student_rows = []
+    for schedule_id, (exam_id, date, time_slot, (start_minute, end_minute), reg_nos) in zip(schedule_ids, rows):
+        schedule_rows.append((schedule_id, exam_id, date, time_slot, start_minute, end_minute, len(reg_nos)))
+        student_rows.extend((schedule_id, reg_no) for reg_no in reg_nos)
+    
+    cursor.executemany("""
+        INSERT INTO schedules (schedule_id, exam_id, date, time_slot,
+                               start_minute, end_minute, total_students)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, schedule_rows)
+    cursor.executemany("""
+        INSERT INTO schedule_students (schedule_id, reg_no)
+        VALUES (?, ?)
+    """, student_rows)
+    
+    return schedule_ids
+
+def allocate_schedule_ids(cursor, count: int) -> range:
+    """
+    Reserve `count` consecutive schedule ids above every id handed out so far
+    Must be called inside a write transaction so no other writer can take them
+    """
+    return reserve_ids(cursor, "schedules", "schedule_id", count)
+
+def check_collision(reg_no: str, date: str, exclude_schedule_id: int = None, conn=None,
+                    interval: Tuple[int, int] = WHOLE_DAY) -> bool:
+    """
+    Check if a student is already scheduled on a particular date during `interval`
+    (minutes since midnight; the whole day by default)
+    Answered from the occupancy index; pass `conn` to load an unseen date on that connection,
+    after occupancy.sync(conn) once in the request
+    """
+    return occupancy.overlaps(reg_no, date, interval, exclude_schedule_id, conn)
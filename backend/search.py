@@ -0,0 +1,149 @@
+"""
+Student search
+Lookup by partial reg_no or name for the search box, ranked in tiers, each one an index walk
+that stops at the result limit:
+1. reg_no prefixes ('MES23CS0'), from the primary key
+2. name prefixes, case-insensitive, from idx_students_name (migration 7)
+3. substrings of reg_no or name ('nair' in 'Priya Nair'), from the students_fts trigram index
+4. only when nothing else matched, names sharing most of the query's trigrams (typos)
+Tiers 3 and 4 need terms of at least three characters. Without FTS5, tier 3 is a LIKE scan and
+tier 4 is skipped. On PostgreSQL, tier 3 is an ILIKE that the pg_trgm indexes serve when the
+extension is installed, and the prefix tiers use the text_pattern_ops indexes.
+"""
+
+from typing import Dict, List
+
+from database import dialect
+from pagination import prefix_range
+
+DEFAULT_RESULTS = 20
+MAX_RESULTS = 50
+TRIGRAM = 3
+FUZZY_MIN_LENGTH = 5  # fewer characters have too few trigrams to tell a typo from chance
+FUZZY_MIN_SHARED = 0.5  # fraction of the query's trigrams a near miss must contain
+
+STUDENT_COLUMNS = "s.reg_no, s.name, s.branch, s.semester"
+
+
+def has_search_index(conn) -> bool:
+    if dialect(conn) == "postgresql":
+        return False
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'"
+    ).fetchone() is not None
+
+
+def _phrase(text: str) -> str:
+    """An FTS5 string literal matching `text` as typed"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _trigrams(terms: List[str]) -> List[str]:
+    grams = []
+    for term in terms:
+        for start in range(len(term) - TRIGRAM + 1):
+            gram = term[start:start + TRIGRAM].lower()
+            if gram not in grams:
+                grams.append(gram)
+    return grams
+
+
+def _prefix_matches(conn, term: str, limit: int):
+    clause, params = prefix_range("s.reg_no", term.upper(), dialect(conn))
+    return conn.execute(f"""
+        SELECT {STUDENT_COLUMNS} FROM students s
+        WHERE 1=1 {clause}
+        ORDER BY s.reg_no
+        LIMIT ?
+    """, params + [limit]).fetchall()
+
+
+def _name_prefix_matches(conn, terms: List[str], limit: int):
+    if dialect(conn) == "postgresql":
+        name = "lower(s.name)"
+        clause, params = prefix_range(name, " ".join(terms).lower(), "postgresql")
+    else:
+        name = "s.name COLLATE NOCASE"
+        clause, params = prefix_range(name, " ".join(terms))
+    return conn.execute(f"""
+        SELECT {STUDENT_COLUMNS} FROM students s
+        WHERE 1=1 {clause}
+        ORDER BY {name}
+        LIMIT ?
+    """, params + [limit]).fetchall()
+
+
+def _substring_matches(conn, terms: List[str], indexed: bool, limit: int):
+    # In rowid order rather than by bm25: ranking would score every hit before the LIMIT applies
+    if indexed:
+        return conn.execute(f"""
+            SELECT {STUDENT_COLUMNS} FROM students_fts
+            JOIN students s ON s.rowid = students_fts.rowid
+            WHERE students_fts MATCH ?
+            LIMIT ?
+        """, (" ".join(_phrase(term) for term in terms), limit)).fetchall()
+
+    like = "ILIKE" if dialect(conn) == "postgresql" else "LIKE"
+    filters = " AND ".join(f"(s.reg_no {like} ? ESCAPE '\\' OR s.name {like} ? ESCAPE '\\')" for _ in terms)
+    params = [pattern for term in terms for pattern in (_like_pattern(term),) * 2]
+    return conn.execute(f"""
+        SELECT {STUDENT_COLUMNS} FROM students s
+        WHERE {filters}
+        ORDER BY s.name, s.reg_no
+        LIMIT ?
+    """, params + [limit]).fetchall()
+
+
+def _fuzzy_matches(conn, terms: List[str], limit: int):
+    """Names containing at least FUZZY_MIN_SHARED of the query's trigrams, most shared first"""
+    grams = _trigrams(terms)
+    needed = max(2, int(len(grams) * FUZZY_MIN_SHARED + 0.5))
+    postings = " UNION ALL ".join("SELECT rowid FROM students_fts WHERE students_fts MATCH ?" for _ in grams)
+    return conn.execute(f"""
+        SELECT {STUDENT_COLUMNS} FROM (
+            SELECT rowid, COUNT(*) AS shared FROM ({postings})
+            GROUP BY rowid
+            HAVING COUNT(*) >= ?
+        ) hits
+        JOIN students s ON s.rowid = hits.rowid
+        ORDER BY hits.shared DESC, length(s.name), s.name
+        LIMIT ?
+    """, ["name : " + _phrase(gram) for gram in grams] + [needed, limit]).fetchall()
+
+
+def search_students(conn, query: str, limit: int = DEFAULT_RESULTS) -> List[Dict]:
+    """
+    Up to `limit` students matching `query`, best first
+    Each result carries `match`: 'reg_no_prefix', 'name_prefix', 'substring' or 'fuzzy'
+    """
+    terms = query.split()
+    if not terms:
+        return []
+
+    results = {}
+
+    def add(rows, match):
+        for row in rows:
+            if len(results) >= limit:
+                return
+            if row[0] not in results:
+                results[row[0]] = {"reg_no": row[0], "name": row[1], "branch": row[2],
+                                   "semester": row[3], "match": match}
+
+    if len(terms) == 1:
+        add(_prefix_matches(conn, terms[0], limit), "reg_no_prefix")
+    if len(results) < limit:
+        add(_name_prefix_matches(conn, terms, limit + len(results)), "name_prefix")
+    if all(len(term) >= TRIGRAM for term in terms):
+        indexed = has_search_index(conn)
+        if len(results) < limit:
+            add(_substring_matches(conn, terms, indexed, limit + len(results)), "substring")
+        if not results and indexed and len("".join(terms)) >= FUZZY_MIN_LENGTH:
+            add(_fuzzy_matches(conn, terms, limit), "fuzzy")
+
+    return list(results.values())
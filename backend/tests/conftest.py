@@ -0,0 +1,111 @@
+"""
+Shared fixtures: one app client for the session and a fresh database per test, on SQLite and,
+when a server is available (a PostgreSQL DATABASE_URL, or pgserver installed), PostgreSQL
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import helpers
+from helpers import roster_csv, use_temporary_database
+
+BACKENDS = ("sqlite", "postgresql")
+
+
+@pytest.fixture(scope="session")
+def postgres_url():
+    url = helpers.postgres_url()
+    if url is None:
+        pytest.skip("needs a PostgreSQL DATABASE_URL or the pgserver package")
+    return url
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+    from export_cache import export_cache
+
+    # Startup initialises whatever database is current; keep it out of the working directory
+    use_temporary_database()
+    export_cache.directory = tempfile.mkdtemp(prefix="lab_scheduler_exports_")
+    # The app's executors shut down with the client, so one client serves every test
+    with TestClient(app) as client:
+        yield client
+    database.close_pool()
+
+
+def use_backend(backend: str, url: str = None):
+    """Point the app at an empty database on `backend` and forget cached state"""
+    from occupancy import occupancy
+    from response_cache import response_cache
+
+    if backend == "sqlite":
+        database.DATABASE_URL = ""
+        use_temporary_database()
+    else:
+        import psycopg2
+        database.close_pool()
+        with psycopg2.connect(url) as conn, conn.cursor() as cursor:
+            cursor.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+        database.DATABASE_URL = url
+        database.init_database()
+    occupancy.invalidate()
+    response_cache.clear()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, client):
+    url = request.getfixturevalue("postgres_url") if request.param == "postgresql" else None
+    use_backend(request.param, url)
+    yield request.param
+    database.DATABASE_URL = ""
+
+
+def run_job(client, response, timeout: float = 60):
+    """Wait for the job a 202 response queued and return its result"""
+    assert response.status_code == 202, response.text
+    job_id = response.json()["job_id"]
+    deadline = time.monotonic() + timeout
+    while client.get(f"/api/jobs/{job_id}").json()["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline, f"job {job_id} did not finish"
+        time.sleep(0.05)
+    result = client.get(f"/api/jobs/{job_id}/result")
+    assert result.status_code == 200, result.text
+    return result.json()
+
+
+SLOTS = [
+    {"slot_name": "FN", "start_time": "09:00", "end_time": "12:00"},
+    {"slot_name": "AN", "start_time": "13:00", "end_time": "16:00"},
+]
+
+
+def add_exam(client, lab_no, date):
+    response = client.post("/api/exams", json={
+        "subject_code": f"CS{lab_no}", "subject_name": f"Lab {lab_no}", "lab_no": lab_no,
+        "date_start": date, "date_end": date, "examiner_internal": "A", "examiner_external": "B"})
+    assert response.status_code == 200, response.text
+    return response.json()["exam_id"]
+
+
+def generate(client, exam_id, date, slots=SLOTS):
+    return run_job(client, client.post("/api/schedules/generate", json={
+        "exam_id": exam_id, "date": date, "time_slots": slots, "max_students_per_batch": 30}))
+
+
+def seed(client, students=120):
+    response = client.post("/api/students/upload",
+                           files={"file": ("students.csv", roster_csv(students), "text/csv")})
+    assert response.status_code == 200, response.text
+
+
+def scheduled(result):
+    return sum(schedule["total_students"] for schedule in result["schedules"])
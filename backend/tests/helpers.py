@@ -0,0 +1,188 @@
+"""
+Test helpers shared with benchmark.py: throwaway databases, synthetic rosters and an API
+scenario that touches every kind of endpoint
+"""
+
+import os
+import time
+import tempfile
+
+import database
+
+BRANCHES = ["CSE-A", "CSE-B", "ECE", "EEE", "ME", "CE"]
+
+
+def use_temporary_database():
+    """Point the app at a fresh database file in a temporary directory"""
+    directory = tempfile.mkdtemp(prefix="lab_scheduler_bench_")
+    database.DATABASE_NAME = os.path.join(directory, "bench.db")
+    database.init_database()
+    return database.DATABASE_NAME
+
+
+def seed_students(conn, count):
+    """Insert `count` synthetic students spread over branches and semesters"""
+    rows = [
+        (f"MES23X{i:06d}", f"Student {i}", BRANCHES[i % len(BRANCHES)], 1 + (i // 7) % 8)
+        for i in range(count)
+    ]
+    conn.executemany("INSERT INTO students (reg_no, name, branch, semester) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    return [row[0] for row in rows]
+
+
+def seed_schedules(conn, schedule_count, students_per_schedule, reg_nos):
+    """Insert an exam and `schedule_count` schedules, each with its own students"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO exams (subject_code, subject_name, lab_no, date_start, date_end,
+                           examiner_internal, examiner_external)
+        VALUES ('CS301', 'Bench Lab', 'L1', '2025-11-01', '2025-11-30', 'Internal', 'External')
+    """)
+    exam_id = cursor.lastrowid
+
+    for i in range(schedule_count):
+        date = f"2025-11-{1 + i % 28:02d}"
+        cursor.execute("""
+            INSERT INTO schedules (exam_id, date, time_slot, start_minute, end_minute, total_students)
+            VALUES (?, ?, '09:30–12:30', 570, 750, ?)
+        """, (exam_id, date, students_per_schedule))
+        schedule_id = cursor.lastrowid
+        start = (i * students_per_schedule) % len(reg_nos)
+        members = reg_nos[start:start + students_per_schedule]
+        cursor.executemany(
+            "INSERT INTO schedule_students (schedule_id, reg_no) VALUES (?, ?)",
+            [(schedule_id, reg_no) for reg_no in members]
+        )
+
+    conn.commit()
+    return exam_id
+
+
+def postgres_url():
+    """DATABASE_URL if it names a PostgreSQL server, else a throwaway one from pgserver, else None"""
+    if database.DATABASE_URL.startswith("postgresql"):
+        return database.DATABASE_URL
+    try:
+        import pgserver
+    except ImportError:
+        return None
+    return pgserver.get_server(tempfile.mkdtemp(prefix="lab_scheduler_pg_"), cleanup_mode="stop").get_uri()
+
+
+def roster_csv(count):
+    """Build an in-memory students CSV with `count` rows"""
+    lines = ["reg_no,name,branch,semester"]
+    lines.extend(
+        f"MES23X{i:06d},Student {i},{BRANCHES[i % len(BRANCHES)]},{1 + (i // 7) % 8}"
+        for i in range(count)
+    )
+    return ("\n".join(lines) + "\n").encode()
+
+
+# Hot queries and the index each one must use
+INDEXED_QUERIES = [
+    ("collision check", """
+        SELECT COUNT(*) FROM schedule_students ss
+        JOIN schedules s ON ss.schedule_id = s.schedule_id
+        WHERE ss.reg_no = ? AND s.date = ?
+    """, ("MES23X000001", "2025-11-01"), "idx_schedule_students_reg_no"),
+    ("per-date scan", """
+        SELECT DISTINCT ss.reg_no FROM schedule_students ss
+        JOIN schedules s ON ss.schedule_id = s.schedule_id
+        WHERE s.date = ?
+    """, ("2025-11-01",), "idx_schedules_date"),
+    ("schedule students", """
+        SELECT ss.schedule_id, st.reg_no FROM schedule_students ss
+        JOIN schedules s ON ss.schedule_id = s.schedule_id
+        JOIN students st ON st.reg_no = ss.reg_no
+        WHERE s.exam_id = ?
+    """, (1,), "idx_schedules_exam_id"),
+    ("export join", """
+        SELECT s.schedule_id, ss.reg_no FROM schedules s
+        LEFT JOIN schedule_students ss ON s.schedule_id = ss.schedule_id
+        WHERE s.date = ?
+    """, ("2025-11-01",), "idx_schedule_students_schedule_id"),
+    ("student name prefix", """
+        SELECT reg_no FROM students
+        WHERE name COLLATE NOCASE >= ? AND name COLLATE NOCASE < ?
+        ORDER BY name COLLATE NOCASE LIMIT 20
+    """, ("stu", "stv"), "idx_students_name"),
+]
+
+
+def backend_scenario(client):
+    """Drive every kind of endpoint once; returns [(step, ms, comparable result)]"""
+    import compact
+
+    steps = []
+
+    def step(name, call, result=lambda response: response.json()):
+        start = time.perf_counter()
+        response = call()
+        elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code < 300, f"{name}: {response.status_code} {response.text[:200]}"
+        steps.append((name, elapsed, result(response)))
+        return response
+
+    def wait(response):
+        job_id = response.json()["job_id"]
+        while client.get(f"/api/jobs/{job_id}").json()["status"] in ("queued", "running"):
+            time.sleep(0.05)
+        return client.get(f"/api/jobs/{job_id}/result")
+
+    step("upload students", lambda: client.post(
+        "/api/students/upload", files={"file": ("students.csv", roster_csv(2000), "text/csv")}))
+    step("add student", lambda: client.post("/api/students", json={
+        "reg_no": "MES23Y000001", "name": "Priya Nair", "branch": "CSE-A", "semester": 1}))
+    for lab_no, date in (("L1", "2025-12-01"), ("L2", "2025-12-02")):
+        step(f"add exam {lab_no}", lambda: client.post("/api/exams", json={
+            "subject_code": f"CS{lab_no}", "subject_name": f"Lab {lab_no}", "lab_no": lab_no,
+            "date_start": date, "date_end": date, "examiner_internal": "A", "examiner_external": "B"}))
+    step("save lab", lambda: client.put("/api/labs", json={"lab_no": "L1", "seats": 30, "allow_mixed": False}))
+    for exam_id, date in ((1, "2025-12-01"), (2, "2025-12-02")):
+        step(f"generate exam {exam_id}", lambda: wait(client.post("/api/schedules/generate", json={
+            "exam_id": exam_id, "date": date, "max_students_per_batch": 30, "time_slots": [
+                {"slot_name": "FN", "start_time": "09:00", "end_time": "12:00"},
+                {"slot_name": "AN", "start_time": "13:00", "end_time": "16:00"}]})))
+
+    step("list students", lambda: client.get("/api/students"))
+    page = step("students page 1", lambda: client.get("/api/students", params={"limit": 100, "branch": "ECE"})).json()
+    step("students page 2", lambda: client.get("/api/students", params={
+        "limit": 100, "branch": "ECE", "cursor": page["next_cursor"]}))
+    step("reg_no prefix", lambda: client.get("/api/students", params={"reg_no_prefix": "MES23X0001"}))
+    # Substring hits come in index order, which differs between backends; compare them as sets
+    for query in ("MES23X00012", "student 19", "nair", "tudent 199"):
+        step(f"search {query!r}", lambda: client.get("/api/students/search", params={"q": query}),
+             lambda response: sorted(response.json(), key=lambda student: student["reg_no"]))
+    step("list exams", lambda: client.get("/api/exams"))
+    step("list labs", lambda: client.get("/api/labs"))
+    schedules = step("list schedules", lambda: client.get("/api/schedules")).json()
+    step("schedules compact", lambda: client.get("/api/schedules", headers={"Accept": compact.COMPACT_JSON}))
+    step("schedules page", lambda: client.get("/api/schedules", params={"limit": 5}))
+    step("export csv", lambda: client.get("/api/export/csv"), lambda response: response.text)
+    step("export pdf", lambda: client.get("/api/export/pdf"), lambda response: response.content[:4])
+
+    source, target = schedules[0], schedules[-1]
+    step("move student", lambda: client.put("/api/schedules/move-student", json={
+        "student_reg_no": source["students"][0]["reg_no"],
+        "from_schedule_id": source["schedule_id"], "to_schedule_id": target["schedule_id"]}))
+    step("delete schedule", lambda: client.delete(f"/api/schedules/{schedules[1]['schedule_id']}"))
+    step("delete student", lambda: client.delete(f"/api/students/{source['students'][1]['reg_no']}"))
+    step("add late student", lambda: client.post("/api/students", json={
+        "reg_no": "MES23Y000002", "name": "Late Joiner", "branch": "ECE", "semester": 2}))
+    for change in ("add", "remove"):
+        step(f"reschedule {change} only", lambda: client.post("/api/schedules/reschedule", json={
+            "exam_id": 1, "date": "2025-12-01", "max_students_per_batch": 30, change: ["MES23Y000002"]}))
+
+    step("delete exam", lambda: client.delete("/api/exams/2"))
+    step("add exam L3", lambda: client.post("/api/exams", json={
+        "subject_code": "CSL3", "subject_name": "Lab L3", "lab_no": "L3", "date_start": "2025-12-02",
+        "date_end": "2025-12-02", "examiner_internal": "A", "examiner_external": "B"}))
+    # Exam 2's bookings went with it, so nobody clashes on its date any more
+    step("generate exam 3", lambda: wait(client.post("/api/schedules/generate", json={
+        "exam_id": 3, "date": "2025-12-02", "max_students_per_batch": 30, "time_slots": [
+            {"slot_name": "FN", "start_time": "09:00", "end_time": "12:00"}]})))
+    step("schedules after", lambda: client.get("/api/schedules"))
+    step("students after", lambda: client.get("/api/students", params={"limit": 5}))
+    return steps
@@ -0,0 +1,70 @@
+"""
+The API on SQLite and PostgreSQL: the same calls must succeed and return the same results
+"""
+
+from helpers import backend_scenario
+from conftest import BACKENDS, SLOTS, add_exam, generate, scheduled, seed, use_backend
+
+def test_scenario(client, backend):
+    # Every step asserts its own status code
+    steps = backend_scenario(client)
+    assert [name for name, _, _ in steps][-2:] == ["schedules after", "students after"]
+
+
+def test_backends_agree(client, postgres_url):
+    runs = {}
+    for backend in BACKENDS:
+        use_backend(backend, postgres_url)
+        runs[backend] = backend_scenario(client)
+    use_backend("sqlite")
+
+    for (name, _, expected), (_, _, actual) in zip(runs["sqlite"], runs["postgresql"]):
+        assert actual == expected, name
+
+
+def test_reschedule_add_only_and_remove_only(client, backend):
+    seed(client)
+    exam_id = add_exam(client, "L1", "2025-12-01")
+    generate(client, exam_id, "2025-12-01")
+    client.post("/api/students", json={"reg_no": "R001", "name": "Late", "branch": "ECE", "semester": 1})
+
+    body = {"exam_id": exam_id, "date": "2025-12-01", "max_students_per_batch": 30}
+    added = client.post("/api/schedules/reschedule", json={**body, "add": ["R001"]})
+    assert added.status_code == 200, added.text
+    assert [change["reg_no"] for change in added.json()["added"]] + \
+        [s["reg_no"] for schedule in added.json()["new_schedules"] for s in schedule["students"]] == ["R001"]
+
+    removed = client.post("/api/schedules/reschedule", json={**body, "remove": ["R001"]})
+    assert removed.status_code == 200, removed.text
+    assert [change["reg_no"] for change in removed.json()["removed"]] == ["R001"]
+
+    rosters = [s["reg_no"] for schedule in client.get("/api/schedules").json() for s in schedule["students"]]
+    assert "R001" not in rosters and len(rosters) == 120
+
+
+def test_delete_exam_then_regenerate(client, backend):
+    seed(client)
+    first = add_exam(client, "L1", "2025-12-01")
+    # One slot, so a leftover booking would leave its student nowhere to go
+    assert scheduled(generate(client, first, "2025-12-01", SLOTS[:1])) == 120
+
+    assert client.delete(f"/api/exams/{first}").status_code == 200
+    assert client.get("/api/schedules").json() == []
+
+    # The deleted exam's bookings must not block the date
+    second = add_exam(client, "L2", "2025-12-01")
+    result = generate(client, second, "2025-12-01", SLOTS[:1])
+    assert scheduled(result) == 120
+    assert result["unscheduled"] == []
+
+
+def test_delete_student_leaves_their_schedules(client, backend):
+    seed(client)
+    exam_id = add_exam(client, "L1", "2025-12-01")
+    schedule = generate(client, exam_id, "2025-12-01")["schedules"][0]
+    reg_no = schedule["students"][0]["reg_no"]
+
+    assert client.delete(f"/api/students/{reg_no}").status_code == 200
+    after = {s["schedule_id"]: s for s in client.get("/api/schedules").json()}[schedule["schedule_id"]]
+    assert reg_no not in [s["reg_no"] for s in after["students"]]
+    assert after["total_students"] == schedule["total_students"] - 1
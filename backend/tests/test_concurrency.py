@@ -0,0 +1,122 @@
+"""
+Execution pools: PDF exports and database writes running concurrently must not stall the event loop
+"""
+
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+from conftest import add_exam, generate, seed, use_backend
+
+
+@pytest.fixture
+def live_server(client, monkeypatch):
+    from main import app
+    from export_cache import export_cache
+    from executors import RENDER_WORKERS, render_executor
+    from pdf_export import render_sections
+
+    # Every export renders, as the first download of fresh data does
+    monkeypatch.setattr(export_cache, "max_bytes", 0)
+    use_backend("sqlite")
+    seed(client, students=8000)
+    for day in (1, 2, 3):
+        generate(client, add_exam(client, f"L{day}", f"2025-12-0{day}"), f"2025-12-0{day}")
+    # Spawn every render worker and load ReportLab in it up front; that start-up is not measured
+    list(render_executor.map(render_sections, [[]] * RENDER_WORKERS))
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    # No lifespan: startup and shutdown belong to the session's client, which shares the pools
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(server.serve(),), daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}", loop
+    server.should_exit = True
+    thread.join()
+    loop.close()
+
+
+async def loop_stalls(stop: threading.Event, interval: float = 0.005) -> list:
+    """How late each short sleep on the event loop woke up, until `stop` is set"""
+    stalls = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+    return stalls
+
+
+def test_event_loop_stays_free_under_exports_and_writes(live_server):
+    base_url, loop = live_server
+    stop = threading.Event()
+    sampled = threading.Event()
+    failures = []
+    written = []
+    exported = []
+
+    def exports():
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            while not stop.is_set():
+                started = time.perf_counter()
+                if client.get("/api/export/pdf").status_code != 200:
+                    failures.append("export")
+                elif not sampled.is_set():
+                    exported.append(started)
+
+    def writes(worker):
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            index = 0
+            while not stop.is_set():
+                response = client.post("/api/students", json={
+                    "reg_no": f"MES23W{worker}{index:05d}", "name": f"Writer {worker}", "branch": "ECE", "semester": 1})
+                if response.status_code != 200:
+                    failures.append(response.text)
+                index += 1
+                time.sleep(0.02)
+            written.append(index)
+
+    threads = [threading.Thread(target=exports) for _ in range(2)]
+    threads += [threading.Thread(target=writes, args=(worker,)) for worker in range(2)]
+    for thread in threads:
+        thread.start()
+    # Let the exports and writes get going before measuring
+    time.sleep(1)
+
+    # Measure until two exports have run from start to finish inside the window
+    began = time.perf_counter()
+    stalls = asyncio.run_coroutine_threadsafe(loop_stalls(sampled), loop)
+    samples = []
+    with httpx.Client(base_url=base_url, timeout=10) as client:
+        deadline = time.monotonic() + 60
+        while len([started for started in exported if started > began]) < 2:
+            assert time.monotonic() < deadline, "exports did not finish"
+            start = time.perf_counter()
+            assert client.get("/api/health").status_code == 200
+            samples.append(time.perf_counter() - start)
+            time.sleep(0.005)
+    sampled.set()
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+    # Rendering one of these PDFs on the event loop stalls it for 0.7 s or more; health checks
+    # also queue behind the writes for the DB pool, so only their median is bounded
+    assert max(stalls.result()) < 0.25
+    assert statistics.median(samples) < 0.1
+
+    with httpx.Client(base_url=base_url) as client:
+        writers = [s for s in client.get("/api/students").json() if s["name"].startswith("Writer")]
+    assert len(writers) == sum(written)
@@ -0,0 +1,47 @@
+"""
+CSV export streaming: paused downloads must not hold pooled connections
+"""
+
+import database
+from csv_export import iter_schedule_csv
+from conftest import add_exam, generate, seed
+
+
+def test_paused_exports_hold_no_connections(client, backend):
+    seed(client)
+    generate(client, add_exam(client, "L1", "2025-12-01"), "2025-12-01")
+    whole = b"".join(iter_schedule_csv(format="long"))
+
+    # More streams than the pool has connections, each stopped after its first piece
+    streams = [iter_schedule_csv(format="long", page_batches=1, chunk_rows=5) for _ in range(12)]
+    pieces = [[next(stream)] for stream in streams]
+    assert database.get_pool_stats()["in_use"] == 0
+
+    for stream, received in zip(streams, pieces):
+        received.extend(stream)
+        assert b"".join(received) == whole
+
+
+def test_pdf_rosters_follow_schedule_order(client, backend):
+    from main import fetch_pdf_rows
+
+    seed(client)
+    exam_id = add_exam(client, "L1", "2025-12-01")
+    generate(client, exam_id, "2025-12-01")
+    # Late joiners whose reg_nos sort first, written after the rest of their batch
+    for reg_no in ("AAA0002", "AAA0001"):
+        client.post("/api/students", json={"reg_no": reg_no, "name": "Late", "branch": "ECE", "semester": 1})
+    response = client.post("/api/schedules/reschedule", json={
+        "exam_id": exam_id, "date": "2025-12-01", "max_students_per_batch": 30, "add": ["AAA0002", "AAA0001"]})
+    assert response.status_code == 200, response.text
+
+    expected = [
+        (schedule["schedule_id"], [s["reg_no"] for s in schedule["students"]])
+        for schedule in client.get("/api/schedules").json()
+    ]
+    actual = {}
+    for row in fetch_pdf_rows():
+        actual.setdefault(row["schedule_id"], []).extend(row["students"].split(", "))
+    assert sorted(expected) == sorted(actual.items())
+    late = next(students for students in actual.values() if "AAA0001" in students)
+    assert late[:2] == ["AAA0001", "AAA0002"]
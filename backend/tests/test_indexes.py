@@ -0,0 +1,27 @@
+"""
+Query plans: each hot lookup uses the index added for it (SQLite's EXPLAIN QUERY PLAN)
+"""
+
+import sqlite3
+
+import pytest
+
+import database
+from conftest import use_backend
+from helpers import INDEXED_QUERIES, seed_schedules, seed_students
+
+
+@pytest.fixture(scope="module")
+def seeded(client):
+    use_backend("sqlite")
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    seed_schedules(conn, 200, 13, seed_students(conn, 3000))
+    conn.execute("ANALYZE")
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("label, query, params, index", INDEXED_QUERIES, ids=[q[0] for q in INDEXED_QUERIES])
+def test_hot_query_uses_its_index(seeded, label, query, params, index):
+    plan = [row[-1] for row in seeded.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    assert any(index in step for step in plan), plan
@@ -0,0 +1,32 @@
+"""
+Roster ingestion: paused uploads hold no pooled connections, and rejected ones leave nothing written
+"""
+
+import io
+
+import database
+from helpers import roster_csv
+from ingest import STUDENT_COLUMNS, ingest_chunks, prepare_student_rows, read_upload_chunks, write_student_rows
+
+
+def test_paused_ingests_hold_no_connections(client, backend):
+    # More uploads than the pool has connections, each stopped after its first chunk
+    streams = [
+        ingest_chunks(read_upload_chunks(io.BytesIO(roster_csv(50)), "students.csv", STUDENT_COLUMNS,
+                                         chunk_rows=10),
+                      prepare_student_rows, write_student_rows, "students")
+        for _ in range(12)
+    ]
+    assert [next(stream)["rows_processed"] for stream in streams] == [10] * 12
+    assert database.get_pool_stats()["in_use"] == 0
+
+    for stream in streams:
+        assert list(stream)[-1]["message"] == "Successfully uploaded 50 students"
+    assert len(client.get("/api/students").json()) == 50
+
+
+def test_upload_missing_columns_is_rejected(client, backend):
+    response = client.post("/api/students/upload",
+                           files={"file": ("students.csv", b"reg_no,name\nMES23X000001,A\n", "text/csv")})
+    assert response.status_code == 400
+    assert client.get("/api/students").json() == []
@@ -0,0 +1,74 @@
+"""
+Occupancy index: its collision answers match the SQL overlap query through generate, move and delete
+"""
+
+import random
+
+from conftest import SLOTS, add_exam, generate, seed
+
+DATES = ("2025-12-01", "2025-12-02")
+INTERVALS = [(0, 1440), (540, 720), (780, 960), (700, 800), (1000, 1100)]
+
+
+def query_collision(conn, reg_no, date, exclude_schedule_id, interval):
+    """The query the index replaces"""
+    query = """
+        SELECT COUNT(*) FROM schedule_students ss
+        JOIN schedules s ON ss.schedule_id = s.schedule_id
+        WHERE ss.reg_no = ? AND s.date = ?
+          AND COALESCE(s.start_minute, 0) < ? AND COALESCE(s.end_minute, 1440) > ?
+    """
+    params = [reg_no, date, interval[1], interval[0]]
+    if exclude_schedule_id is not None:
+        query += " AND s.schedule_id != ?"
+        params.append(exclude_schedule_id)
+    return conn.execute(query, params).fetchone()[0] > 0
+
+
+def assert_index_matches_query(rng, reg_nos, schedule_ids):
+    from database import get_db_connection
+    from occupancy import occupancy
+    from scheduler import check_collision
+
+    with get_db_connection() as conn:
+        occupancy.sync(conn)
+        for _ in range(200):
+            reg_no, date, interval = rng.choice(reg_nos), rng.choice(DATES), rng.choice(INTERVALS)
+            exclude = rng.choice(schedule_ids + [None])
+            expected = query_collision(conn, reg_no, date, exclude, interval)
+            assert check_collision(reg_no, date, exclude, conn, interval) == expected, \
+                (reg_no, date, exclude, interval)
+            # Lookups without a connection take and sync their own
+            assert check_collision(reg_no, date, exclude, interval=interval) == expected
+        assert occupancy.verify(conn) == []
+
+
+def test_index_matches_the_overlap_query(client, backend):
+    from database import get_db_connection
+
+    rng = random.Random(11)
+    seed(client, students=90)
+    for index, date in enumerate(DATES):
+        generate(client, add_exam(client, f"L{index}", date), date)
+    generate(client, add_exam(client, "L9", DATES[0]), DATES[0], SLOTS[1:])
+
+    with get_db_connection() as conn:
+        reg_nos = [row[0] for row in conn.execute("SELECT reg_no FROM students").fetchall()]
+
+    for step in range(12):
+        with get_db_connection() as conn:
+            schedule_ids = [row[0] for row in conn.execute("SELECT schedule_id FROM schedules").fetchall()]
+        assert_index_matches_query(rng, reg_nos, schedule_ids)
+
+        if step % 4 == 3:
+            response = client.delete(f"/api/schedules/{rng.choice(schedule_ids)}")
+            assert response.status_code == 200, response.text
+            continue
+        from_id, to_id = rng.sample(schedule_ids, 2)
+        with get_db_connection() as conn:
+            member = conn.execute("SELECT reg_no FROM schedule_students WHERE schedule_id = ?",
+                                  (from_id,)).fetchone()
+        if member:
+            # Refused moves (a clash at the target) must leave the index alone too
+            client.put("/api/schedules/move-student", json={
+                "student_reg_no": member[0], "from_schedule_id": from_id, "to_schedule_id": to_id})
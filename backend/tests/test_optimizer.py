@@ -0,0 +1,34 @@
+"""
+Optimizer: annealing with an iteration count is bounded by that count alone
+"""
+
+import pytest
+
+
+def batches(count=12, size=8):
+    """Overlapping rosters across two days of two overlapping slots"""
+    students = [{f"S{(index * 5 + member) % 40}" for member in range(size)} for index in range(count)]
+    domains = [[(day, slot) for day in range(2) for slot in range(2)] for _ in range(count)]
+    return domains, students, [f"L{index % 3}" for index in range(count)], [{0, 1}, {0, 1}]
+
+
+def test_max_iterations_ignores_the_time_budget(client):
+    from optimizer import optimize
+
+    domains, students, labs, neighbours = batches()
+    runs = [optimize(domains, students, labs, neighbours, time_budget=0.0, seed=3, max_iterations=5000)
+            for _ in range(2)]
+    assert [stats["iterations"] for _, stats in runs] == [5000, 5000]
+    assert runs[0] == runs[1]
+
+    _, stats = optimize(domains, students, labs, neighbours, time_budget=0.0, seed=3)
+    assert stats["iterations"] == 0
+
+
+@pytest.mark.parametrize("limits", [{"max_iterations": 0}, {"max_iterations": 10 ** 12},
+                                    {"time_budget": -1}, {"time_budget": 10 ** 6}])
+def test_annealing_limits_are_bounded(client, limits):
+    response = client.post("/api/schedules/generate-all", json={
+        "time_slots": [{"slot_name": "FN", "start_time": "09:00", "end_time": "12:00"}],
+        "max_students_per_batch": 30, "optimizer": "anneal", **limits})
+    assert response.status_code == 422
@@ -0,0 +1,22 @@
+"""
+Keyset pagination: cursors that are not ours are rejected before they reach a query
+"""
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(["2025-12-01", 3, 1.5, None]), 4) == ["2025-12-01", 3, 1.5, None]
+
+
+@pytest.mark.parametrize("values", [[["nested"], 1], [{"a": 1}, 1], [True, 1]])
+def test_non_scalar_cursor_elements_are_rejected(values):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(encode_cursor(values), 2)
+
+
+def test_non_scalar_cursor_is_a_bad_request(client, backend):
+    response = client.get("/api/students", params={"limit": 10, "cursor": encode_cursor([["CSE-A"], 1, "x"])})
+    assert response.status_code == 400
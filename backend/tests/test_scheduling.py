@@ -0,0 +1,52 @@
+"""
+Schedule generation: every eligible student is accounted for, whoever else writes schedules
+"""
+
+from conftest import SLOTS, add_exam, generate, scheduled, seed
+
+
+def test_students_busy_in_every_slot_are_reported(client, backend):
+    seed(client)
+    first = add_exam(client, "L1", "2025-12-01")
+    assert scheduled(generate(client, first, "2025-12-01", SLOTS[:1])) == 120
+
+    # Everyone already sits exam 1 in the only slot offered
+    second = add_exam(client, "L2", "2025-12-01")
+    result = generate(client, second, "2025-12-01", SLOTS[:1])
+    assert scheduled(result) == 0
+    assert len(result["unscheduled"]) == 120
+
+
+def test_outside_writes_reach_the_occupancy_index(client, backend):
+    import reset_database
+
+    seed(client)
+    exam_id = add_exam(client, "L1", "2025-12-01")
+    assert scheduled(generate(client, exam_id, "2025-12-01", SLOTS[:1])) == 120
+
+    # Clears every table behind the API's back, as a script or another worker would
+    reset_database.reset_database()
+    seed(client)
+    exam_id = add_exam(client, "L1", "2025-12-01")
+    result = generate(client, exam_id, "2025-12-01", SLOTS[:1])
+    assert scheduled(result) == 120
+    assert result["unscheduled"] == []
+
+
+def test_generate_all_plans_without_the_write_lock(client, backend):
+    from engine import generate_all
+
+    seed(client)
+    add_exam(client, "L1", "2025-12-01")
+    added = []
+
+    def progress(fraction, message):
+        # A write landing while the snapshot is being planned; it must neither wait nor be lost
+        if message.startswith("Loaded") and not added:
+            added.append(add_exam(client, "L2", "2025-12-01"))
+
+    result = generate_all(None, SLOTS, 30, progress=progress)
+    assert {placement["exam_id"] for placement in result["schedules"]} == {1, added[0]}
+    stats = result["stats"]
+    assert stats["exams"] == 2
+    assert stats["students_placed"] + stats["students_unplaceable"] == 240
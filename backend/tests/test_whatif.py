@@ -0,0 +1,26 @@
+"""
+What-if grids: parallel runs reuse one worker pool and rank exactly as a run in this process
+"""
+
+from conftest import SLOTS, add_exam, seed
+
+
+def test_parallel_runs_share_the_pool_and_match(client, backend):
+    import whatif
+    from database import get_db_connection
+    from engine import load_snapshot
+
+    seed(client)
+    for lab_no in ("L1", "L2"):
+        add_exam(client, lab_no, "2025-12-01")
+    with get_db_connection() as conn:
+        snapshot = load_snapshot(conn)
+    variants = whatif.expand_grid([20, 30], [SLOTS, SLOTS[:1]], seeds=[1, 2])
+    options = {"optimizer": "anneal", "max_iterations": 2000}
+
+    sequential = whatif.evaluate_grid(snapshot, variants, options, workers=1)
+    first = whatif.evaluate_grid(snapshot, variants, options, workers=2)
+    pool = whatif._pool
+    second = whatif.evaluate_grid(snapshot, variants, options, workers=2)
+    assert pool is not None and whatif._pool is pool
+    assert first == second == sequential
@@ -0,0 +1,57 @@
+"""
+Time slot parsing
+Schedules store their slot as text ("09:30–12:30"); these helpers turn it into minutes
+since midnight so overlapping slots can be compared numerically
+"""
+
+import re
+from typing import Optional, Tuple
+
+DAY_START = 0
+DAY_END = 24 * 60
+
+# Whole day: used when a slot cannot be parsed, so it conflicts with everything that day
+WHOLE_DAY = (DAY_START, DAY_END)
+
+_CLOCK = re.compile(r"^\s*(\d{1,2})(?:[:.](\d{2}))?\s*([ap]\.?m\.?)?\s*$", re.IGNORECASE)
+_SEPARATOR = re.compile(r"\s*(?:–|—|-|\bto\b)\s*", re.IGNORECASE)
+
+
+def parse_clock(text: str) -> Optional[int]:
+    """'09:30', '9.30', '2 pm' or '2:00 PM' -> minutes since midnight"""
+    match = _CLOCK.match(text or "")
+    if not match:
+        return None
+
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if meridiem.lower().startswith("p") else 0)
+
+    if hours > 24 or minutes > 59 or hours * 60 + minutes > DAY_END:
+        return None
+    return hours * 60 + minutes
+
+
+def parse_time_slot(time_slot: str) -> Optional[Tuple[int, int]]:
+    """'09:30–12:30' -> (570, 750); None if the text is not a start–end range"""
+    parts = _SEPARATOR.split(time_slot or "", maxsplit=1)
+    if len(parts) != 2:
+        return None
+
+    start, end = parse_clock(parts[0]), parse_clock(parts[1])
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+def slot_interval(start_minute: Optional[int], end_minute: Optional[int]) -> Tuple[int, int]:
+    """Stored minutes -> interval, treating unparsed slots as the whole day"""
+    if start_minute is None or end_minute is None:
+        return WHOLE_DAY
+    return start_minute, end_minute
+
+
+def format_time_slot(start_time: str, end_time: str) -> str:
+    return f"{start_time}–{end_time}"
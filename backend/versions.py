@@ -0,0 +1,46 @@
+"""
+Data versions
+One counter per table (schedule_students counts as schedules), bumped inside the same
+transaction as every write to that table. Caches key on the versions of what they read, so a
+committed write makes every older entry unreachable without any cross-process signalling.
+The 'epoch' row holds a random value chosen when the table is created, so a recreated database
+never hands out keys that a cache still holds from its predecessor.
+"""
+
+import hashlib
+from typing import Optional, Tuple
+
+TABLES = ("students", "exams", "schedules", "labs")
+
+
+def bump_versions(conn, *tables: str):
+    """Advance the versions of `tables`; call before the write's commit"""
+    conn.execute(
+        f"UPDATE data_versions SET version = version + 1 WHERE name IN ({','.join('?' * len(tables))})",
+        tables
+    )
+
+
+def read_versions(conn, *tables: str) -> Tuple[int, ...]:
+    """The database's epoch followed by the current versions of `tables`, in the order given"""
+    names = ("epoch",) + tables
+    rows = dict(conn.execute(
+        f"SELECT name, version FROM data_versions WHERE name IN ({','.join('?' * len(names))})",
+        names
+    ).fetchall())
+    return tuple(rows.get(name, 0) for name in names)
+
+
+def version_key(name: str, versions: Tuple[int, ...], **params) -> str:
+    """Cache key (and ETag) for `name` with `params`, built from data at `versions`"""
+    parts = [name] + [f"{key}={params[key]}" for key in sorted(params)]
+    parts.append("v=" + ".".join(map(str, versions)))
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names `etag` (weak comparison, as for GET)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
@@ -0,0 +1,238 @@
+"""
+What-if evaluation
+Plans a grid of global-engine configurations (batch sizes, slot sets, lab assignments,
+optimizer seeds) in parallel worker processes and ranks them by cost, without writing.
+Every job shares one pool of spawned workers. A job writes its read-only snapshot to a temporary
+file once; each task carries only that file's path and its own small set of parameters, and
+a worker loads the snapshot on its first task from the job.
+Annealing runs a fixed number of iterations unless the request sets one, so a ranking does not
+depend on how busy the workers were.
+"""
+
+import os
+import pickle
+import tempfile
+import itertools
+import threading
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from database import get_db_connection
+from engine import load_snapshot, plan
+
+WHATIF_WORKERS = int(os.getenv("WHATIF_WORKERS", str(os.cpu_count() or 2)))
+MAX_VARIANTS = int(os.getenv("WHATIF_MAX_VARIANTS", "200"))
+# Annealing iterations per variant when the request does not give max_iterations
+WHATIF_ITERATIONS = int(os.getenv("WHATIF_MAX_ITERATIONS", "50000"))
+
+# Cost = sum of weight * metric; lower is better
+DEFAULT_WEIGHTS = {
+    "students_unplaceable": 100.0,
+    "cells_used": 10.0,
+    "max_day_load": 1.0,
+    "imbalance": 500.0,  # coefficient of variation of students per day
+}
+
+# Created on the first parallel evaluation and kept for the next ones
+_pool = None
+_pool_lock = threading.Lock()
+
+# The snapshot each worker loaded last, and the file it came from
+_snapshot_path = None
+_snapshot = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WHATIF_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Forget a pool whose worker died, so the next evaluation starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _shared_snapshot(path: str) -> Dict:
+    """The snapshot written to `path`, read once per worker per job"""
+    global _snapshot_path, _snapshot
+    if path != _snapshot_path:
+        with open(path, "rb") as file:
+            _snapshot = pickle.load(file)
+        _snapshot_path = path
+    return _snapshot
+
+
+def expand_grid(batch_sizes: List[int], slot_sets: List[List[Dict]],
+                lab_assignments: Optional[List[Dict[int, str]]] = None,
+                seeds: Optional[List[int]] = None) -> List[Dict]:
+    """Every combination of the parameter lists, as variant dicts"""
+    return [
+        {
+            "max_students_per_batch": batch_size,
+            "slot_set": slot_index,
+            "time_slots": slot_sets[slot_index],
+            "lab_assignment": lab_assignment,
+            "seed": seed,
+        }
+        for batch_size, slot_index, lab_assignment, seed in itertools.product(
+            batch_sizes, range(len(slot_sets)), lab_assignments or [{}], seeds or [0])
+    ]
+
+
+def variant_metrics(result: Dict) -> Dict:
+    """Slots used, per-day load and balance of one planned variant"""
+    per_day = {}
+    for placement in result["schedules"]:
+        per_day[placement["date"]] = per_day.get(placement["date"], 0) + placement["total_students"]
+    loads = list(per_day.values())
+    mean = statistics.mean(loads) if loads else 0
+    stats = result["stats"]
+    return {
+        "students_placed": stats["students_placed"],
+        "students_unplaceable": stats["students_unplaceable"],
+        "schedules": stats["schedules"],
+        "cells_used": stats["cells_used"],
+        "days_used": len(per_day),
+        "max_day_load": max(loads, default=0),
+        "imbalance": round(statistics.pstdev(loads) / mean, 4) if mean else 0.0,
+    }
+
+
+def variant_cost(metrics: Dict, weights: Dict[str, float]) -> float:
+    return round(sum(weight * metrics.get(name, 0) for name, weight in weights.items()), 3)
+
+
+def evaluate_variant(variant: Dict, options: Dict, snapshot: Dict) -> Dict:
+    """Plan one variant against `snapshot` and measure it"""
+    if variant["lab_assignment"]:
+        # Shallow copies only: the shared snapshot is never modified
+        exams = [
+            {**exam, "lab_no": variant["lab_assignment"].get(exam["exam_id"], exam["lab_no"])}
+            for exam in snapshot["exams"]
+        ]
+        snapshot = {**snapshot, "exams": exams}
+
+    result = plan(snapshot, variant["time_slots"], variant["max_students_per_batch"],
+                  options.get("lab_capacities"), options.get("exam_groups"),
+                  options.get("optimizer", "greedy"), options.get("time_budget"), variant["seed"],
+                  options.get("max_iterations"))
+    return variant_metrics(result)
+
+
+def _evaluate_shared(variant: Dict, options: Dict, snapshot_path: str) -> Dict:
+    """evaluate_variant in a pool worker, against the snapshot its job shared"""
+    return evaluate_variant(variant, options, _shared_snapshot(snapshot_path))
+
+
+def evaluate_grid(snapshot: Dict, variants: List[Dict], options: Dict,
+                  weights: Optional[Dict[str, float]] = None, workers: int = WHATIF_WORKERS,
+                  progress: Optional[Callable[[float, str], None]] = None) -> List[Dict]:
+    """
+    Evaluate every variant and return them ranked by cost, cheapest first
+    workers=1 evaluates in this process, which is also the fallback for a single variant;
+    otherwise the variants go to the shared pool of WHATIF_WORKERS processes
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    if progress is None:
+        progress = lambda fraction, message: None
+
+    def ranked(metrics_by_index):
+        results = [
+            {**variant, "metrics": metrics, "cost": variant_cost(metrics, weights)}
+            for variant, metrics in zip(variants, metrics_by_index)
+        ]
+        return sorted(results, key=lambda item: item["cost"])
+
+    if workers <= 1 or len(variants) <= 1:
+        metrics = []
+        for done, variant in enumerate(variants, start=1):
+            metrics.append(evaluate_variant(variant, options, snapshot))
+            progress(done / len(variants), f"Evaluated {done} of {len(variants)} variants")
+        return ranked(metrics)
+
+    metrics = [None] * len(variants)
+    descriptor, snapshot_path = tempfile.mkstemp(prefix="whatif_", suffix=".pickle")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        pool = _get_pool()
+        futures = {
+            pool.submit(_evaluate_shared, variant, options, snapshot_path): index
+            for index, variant in enumerate(variants)
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                metrics[futures[future]] = future.result()
+                progress(done / len(variants), f"Evaluated {done} of {len(variants)} variants")
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    finally:
+        os.remove(snapshot_path)
+    return ranked(metrics)
+
+
+def run_what_if(exam_ids: Optional[List[int]], batch_sizes: List[int], slot_sets: List[List[Dict]],
+                lab_assignments: Optional[List[Dict]] = None, seeds: Optional[List[int]] = None,
+                optimizer: str = "greedy", time_budget: Optional[float] = None,
+                max_iterations: Optional[int] = None,
+                lab_capacities: Optional[Dict[str, int]] = None,
+                exam_groups: Optional[Dict[int, List[str]]] = None,
+                weights: Optional[Dict[str, float]] = None,
+                progress: Optional[Callable[[float, str], None]] = None) -> Dict:
+    """Job entry point: snapshot the exams once, evaluate the grid, return the ranking"""
+    if progress is None:
+        progress = lambda fraction, message: None
+    # JSON job params carry mapping keys as strings
+    lab_assignments = [
+        {int(exam_id): lab_no for exam_id, lab_no in assignment.items()}
+        for assignment in (lab_assignments or [{}])
+    ]
+    exam_groups = {int(exam_id): keys for exam_id, keys in (exam_groups or {}).items()}
+
+    variants = expand_grid(batch_sizes, slot_sets, lab_assignments, seeds)
+    if len(variants) > MAX_VARIANTS:
+        raise ValueError(f"{len(variants)} variants requested; the limit is {MAX_VARIANTS}")
+
+    with get_db_connection() as conn:
+        snapshot = load_snapshot(conn, exam_ids)
+    progress(0.05, f"Loaded {len(snapshot['exams'])} exams; evaluating {len(variants)} variants")
+
+    options = {
+        "lab_capacities": lab_capacities,
+        "exam_groups": exam_groups,
+        "optimizer": optimizer,
+        "time_budget": time_budget,
+        "max_iterations": WHATIF_ITERATIONS if max_iterations is None else max_iterations,
+    }
+    ranking = evaluate_grid(snapshot, variants, options, weights,
+                            progress=lambda fraction, message: progress(0.05 + 0.95 * fraction, message))
+    return {
+        "variants": len(variants),
+        "weights": {**DEFAULT_WEIGHTS, **(weights or {})},
+        "errors": snapshot["errors"],
+        "ranking": ranking,
+    }
@@ -7,7 +7,8 @@ const api = axios.create({
 });
 
 // Students
-export const getStudents = () => api.get('/students');
+export const getStudents = (params) => api.get('/students', { params });
+export const searchStudents = (q) => api.get('/students/search', { params: { q } });
 export const addStudent = (student) => api.post('/students', student);
 export const uploadStudents = (file) => {
   const formData = new FormData();
@@ -32,10 +33,60 @@ export const deleteExam = (examId) => api.delete(`/exams/${examId}`);
 
 // Schedules
 export const generateSchedule = (data) => api.post('/schedules/generate', data);
-export const getSchedules = (params) => api.get('/schedules', { params });
+// Columnar schedules (backend/compact.py): rosters are indexes into one shared students table
+const COMPACT_SCHEDULES = 'application/vnd.lab-scheduler.compact+json';
+
+const expandSchedules = (data) => {
+  if (Array.isArray(data)) return data;
+  if (data.items) return { ...data, items: expandSchedules(data.items) };
+  const { schedules, students } = data;
+  const columns = Object.keys(schedules);
+  const count = columns.length ? schedules[columns[0]].length : 0;
+  return Array.from({ length: count }, (_, i) => {
+    const schedule = {};
+    columns.forEach((column) => {
+      schedule[column] = column === 'students'
+        ? schedules.students[i].map((j) => ({
+            reg_no: students.reg_no[j],
+            name: students.name[j],
+            branch: students.branch[j],
+            semester: students.semester[j],
+          }))
+        : schedules[column][i];
+    });
+    return schedule;
+  });
+};
+
+export const getSchedules = (params) =>
+  api.get('/schedules', { params, headers: { Accept: COMPACT_SCHEDULES } })
+    .then((response) => ({ ...response, data: expandSchedules(response.data) }));
 export const moveStudent = (data) => api.put('/schedules/move-student', data);
 export const deleteSchedule = (scheduleId) => api.delete(`/schedules/${scheduleId}`);
 
+// Background jobs
+export const getJob = (jobId) => api.get(`/jobs/${jobId}`);
+export const getJobResult = (jobId) => api.get(`/jobs/${jobId}/result`);
+export const cancelJob = (jobId) => api.post(`/jobs/${jobId}/cancel`);
+
+// Poll a job until it finishes, then resolve with its result
+export const waitForJob = async (jobId, onProgress, intervalMs = 500) => {
+  for (;;) {
+    const { data: job } = await getJob(jobId);
+    if (onProgress) onProgress(job);
+
+    if (job.status === 'completed') {
+      return getJobResult(jobId);
+    }
+    if (job.status === 'failed' || job.status === 'cancelled') {
+      const error = new Error(job.message || `Job ${job.status}`);
+      error.response = { data: { detail: job.message || `Schedule generation ${job.status}` } };
+      throw error;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 // Export
 export const exportCSV = (params) => {
   const queryString = new URLSearchParams(params).toString();
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Calendar, Clock, Users, Plus, Trash2, Sparkles } from 'lucide-react';
-import { getExams, generateSchedule } from '../api';
+import { getExams, generateSchedule, waitForJob } from '../api';
 
 function ScheduleGenerator() {
   const [exams, setExams] = useState([]);
@@ -61,12 +61,13 @@ function ScheduleGenerator() {
 
     try {
       setLoading(true);
-      const response = await generateSchedule({
+      const { data: job } = await generateSchedule({
         exam_id: parseInt(selectedExam),
         date: date,
         time_slots: timeSlots,
         max_students_per_batch: maxStudents
       });
+      const response = await waitForJob(job.job_id);
       
       setResult(response.data);
       showMessage('success', `Generated ${response.data.schedules?.length || 0} schedule batches successfully!`);
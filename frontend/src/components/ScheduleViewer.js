@@ -77,8 +77,8 @@ function ScheduleViewer() {
     showMessage('success', 'Batch updated successfully');
   };
 
-  const handleExportCSV = () => {
-    const params = {};
+  const handleExportCSV = (format = 'grouped') => {
+    const params = { format };
     if (filterDate) params.date = filterDate;
     if (filterExam) params.exam_id = filterExam;
     window.open(exportCSV(params), '_blank');
@@ -214,12 +214,19 @@ function ScheduleViewer() {
         {/* Export Buttons */}
         <div className="mt-6 flex space-x-3">
           <button
-            onClick={handleExportCSV}
+            onClick={() => handleExportCSV('grouped')}
             className="flex items-center space-x-2 px-5 py-3 bg-gradient-to-r from-green-500 to-emerald-600 text-white font-semibold rounded-xl hover:from-green-600 hover:to-emerald-700 transition-all duration-300 transform hover:scale-105 shadow-lg ripple"
           >
             <FileText className="h-5 w-5" />
             <span>Export CSV</span>
           </button>
+          <button
+            onClick={() => handleExportCSV('long')}
+            className="flex items-center space-x-2 px-5 py-3 bg-gradient-to-r from-green-500 to-emerald-600 text-white font-semibold rounded-xl hover:from-green-600 hover:to-emerald-700 transition-all duration-300 transform hover:scale-105 shadow-lg ripple"
+          >
+            <FileText className="h-5 w-5" />
+            <span>Export CSV (per student)</span>
+          </button>
           <button
             onClick={handleExportPDF}
             className="flex items-center space-x-2 px-5 py-3 bg-gradient-to-r from-red-500 to-pink-600 text-white font-semibold rounded-xl hover:from-red-600 hover:to-pink-700 transition-all duration-300 transform hover:scale-105 shadow-lg ripple"
@@ -1,21 +1,52 @@
 import React, { useState, useEffect } from 'react';
-import { Upload, UserPlus, Trash2, RefreshCw, Download, Users } from 'lucide-react';
-import { getStudents, uploadStudents, deleteStudent } from '../api';
+import { Upload, UserPlus, Trash2, RefreshCw, Download, Users, Search } from 'lucide-react';
+import { getStudents, searchStudents, uploadStudents, deleteStudent } from '../api';
+
+const PAGE_SIZE = 200;
+const SEARCH_DELAY_MS = 200;
 
 function StudentManager() {
   const [students, setStudents] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState({ type: '', text: '' });
+  const [query, setQuery] = useState('');
+  const [searchResults, setSearchResults] = useState(null);
 
   useEffect(() => {
     fetchStudents();
   }, []);
 
-  const fetchStudents = async () => {
+  useEffect(() => {
+    if (!query.trim()) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await searchStudents(query);
+        if (!cancelled) setSearchResults(response.data);
+      } catch (error) {
+        if (!cancelled) showMessage('error', 'Search failed');
+      }
+    }, SEARCH_DELAY_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query]);
+
+  const fetchStudents = async (cursor = null) => {
     try {
       setLoading(true);
-      const response = await getStudents();
-      setStudents(response.data);
+      const params = { limit: PAGE_SIZE, include_total: true };
+      if (cursor) params.cursor = cursor;
+      const response = await getStudents(params);
+      setStudents(previous => cursor ? [...previous, ...response.data.items] : response.data.items);
+      setNextCursor(response.data.next_cursor);
+      setTotal(response.data.total);
     } catch (error) {
       showMessage('error', 'Failed to fetch students');
     } finally {
@@ -67,7 +98,9 @@ function StudentManager() {
     a.click();
   };
 
-  const groupedStudents = students.reduce((acc, student) => {
+  const shownStudents = searchResults ?? students;
+
+  const groupedStudents = shownStudents.reduce((acc, student) => {
     const key = `${student.branch}-Sem${student.semester}`;
     if (!acc[key]) acc[key] = [];
     acc[key].push(student);
@@ -100,7 +133,7 @@ function StudentManager() {
               <span className="font-semibold">Template</span>
             </button>
             <button
-              onClick={fetchStudents}
+              onClick={() => fetchStudents()}
               disabled={loading}
               className="flex items-center space-x-2 px-5 py-3 bg-gradient-to-r from-blue-500 to-purple-600 text-white rounded-xl hover:from-blue-600 hover:to-purple-700 transition-all duration-300 transform hover:scale-105 disabled:opacity-50 shadow-lg ripple pulse-btn"
             >
@@ -150,8 +183,18 @@ function StudentManager() {
         <div className="flex items-center justify-between mb-6">
           <h3 className="text-2xl font-bold gradient-text flex items-center gap-2">
             <Users className="h-6 w-6 text-blue-600" />
-            Students List ({students.length})
+            Students List ({searchResults ? searchResults.length : total})
           </h3>
+          <div className="relative w-72">
+            <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-4 w-4 text-gray-400" />
+            <input
+              type="text"
+              value={query}
+              onChange={(e) => setQuery(e.target.value)}
+              placeholder="Search reg no or name"
+              className="w-full pl-9 pr-4 py-2 border-2 border-gray-200 rounded-xl focus:outline-none focus:border-blue-500 bg-white/80"
+            />
+          </div>
         </div>
 
         {Object.entries(groupedStudents).map(([group, groupStudents], idx) => (
@@ -225,7 +268,23 @@ function StudentManager() {
           </div>
         ))}
 
-        {students.length === 0 && !loading && (
+        {nextCursor && !searchResults && (
+          <div className="text-center">
+            <button
+              onClick={() => fetchStudents(nextCursor)}
+              disabled={loading}
+              className="px-6 py-3 bg-gradient-to-r from-blue-500 to-purple-600 text-white rounded-xl hover:from-blue-600 hover:to-purple-700 transition-all duration-300 disabled:opacity-50 shadow-lg font-semibold"
+            >
+              {loading ? 'Loading...' : `Load more (${students.length} of ${total})`}
+            </button>
+          </div>
+        )}
+
+        {searchResults && searchResults.length === 0 && (
+          <p className="text-center py-8 text-gray-500">No students match "{query}"</p>
+        )}
+
+        {students.length === 0 && !loading && !searchResults && (
           <div className="text-center py-16 scale-in">
             <div className="float-animation inline-block">
               <UserPlus className="h-20 w-20 text-blue-400 mx-auto mb-4" />